@@ -1,111 +1,110 @@
 from AlbionIsland import *
-from SimulatedAnnealingSolver import *
-import sys
+from RegionSolver import *
+from EliteArchive import EliteArchive
+from LocalizationIndex import LocalizationIndex, localize_islands
+from ScoreCache import ScoreCache
+from Engines import add_engine_arguments, check_engine_arguments, solve
+import argparse
+import concurrent.futures
+import contextlib
+import io
 
 ###########################################################################################
 #
 #
-class AlbionSolver(SimulatedAnnealingSolver):
+class AlbionSolver(RegionSolver):
     """
     Solver for Albion Islands.
-    Find an optimum set of Albion Islands which provides all Albion fertilities
+    Find an optimum set of Albion Islands which provides all Albion fertilities, or one population's, see set_coverage()
+    the weights and population coverages are in regions/albion.toml
     """
-    def __init__(self):
-        # call parent ctor
-        super().__init__()
 
-        # input file
-        self.filename = ''
+    island_class = AlbionIsland
 
-        # use this to target All, Celtic or Roman fertilities in the solution
-        self.starting_fertilities = AlbionFertility.all_fertilities()
-
-        # solution tuning factors
-        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
-        self.max_trials = 1000      # max trials per annealing temperature
-        self.temperature = 1000.0    # black art = pick this to be ~150% of a typical score change
-        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
-
-        self.extra_island_reduction_rate = 0.9
-        self.extra_island_penalty = 100
-
-    def set_filename(self, filename: str):
-        # set up a basic array of islands
-        self.filename = filename
-        self.load_islands()
-
-    def load_islands(self):
+    def report_alternatives(self, label: str):
         """
-        load island info from a CSV file
-        # todo - read this info from a savegame file rather than a CSV file
-        ideally this function should be replaced to read the island info
-        directly from a save file
+        write the contents of the elite archive, if there is one, to stdout
         """
+        super().report_alternatives(label)
 
-        # ensure list starts empty
-        self.the_list = []
-
-        # walk the input file list
-        with open(self.filename, 'r') as file:
-            for line in file:
-                # Process each line here
-                if line[0] != '#':
-                    island = AlbionIsland.from_string(line.strip())
-                    self.the_list.append(island)
-                    # island.dump()
-                    # print(f"Island: [{island.island_name}]")
-                    # print(f"    Celtic Score: [{island.calculate_score(AlbionFertility.celtic())}]")
-                    # print(f"    Roman Score:  [{island.calculate_score(AlbionFertility.roman())}]")
+        # start the next solve with an empty archive
+        if self.elite_archive is not None:
+            self.elite_archive = EliteArchive(self.elite_archive.max_size, self.elite_archive.min_difference)
 
-    def set_coverage(self, starting_fertilities: AlbionFertility):
-        self.starting_fertilities = starting_fertilities
 
-    # define the virtual score() function
-    def score(self, candidate_list: list) -> float:
 
-        # determine a score for the first N islands, where N is the number of islands required
-        # to provide one of every fertility
 
-        # walk the list until we have gotten all the fertilities
-        # order matters, so reduce the score in subsequent islands by 'extra_island_reduction_rate'
-        # also, we only want the minimum number of islands to cover all fertilities, so
-        # add a penalty for every island beyond the first
-        rv = 0.0
-        covered_fertilities: AlbionFertility = self.starting_fertilities
-        island: AlbionIsland
-        for ndx, island in enumerate(candidate_list):
-            rv += (self.extra_island_reduction_rate ** ndx) * island.calculate_score(covered_fertilities)
-            rv -= ndx * self.extra_island_penalty
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-            if covered_fertilities == AlbionFertility.no_fertilities():
-                break
-        # print(f"highest index to cover all ferts = {ndx}")
 
-        return rv
-
-    def report(self) -> list:
-        rv = list()
-        covered_fertilities: AlbionFertility = self.starting_fertilities
-
-        print(f"Islands: [", end = '')
-        island: AlbionIsland
-        for ndx, island in enumerate(self.the_list):
-            rv.append(island)
-            print(f"{island.island_name}", end = '')
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-            if covered_fertilities == AlbionFertility.no_fertilities():
-                break
-            print(", ", end = '')
-
-        print(f"] (Score = {self.score(self.the_list):.0f})")
+#
+###########################################################################################
+#
+#   The two population orders, Celtic then Roman and Roman then Celtic, don't depend on each other,
+#   so they are solved at the same time in separate processes, each from its own copy of the parsed islands
+#
 
-        # return a list of the solution islands
-        return rv
+# targeted fertilities, and report label, for each population
+POPULATIONS = {
+    'celtic': (AlbionFertility.celtic, '     Celtic '),
+    'roman': (AlbionFertility.roman, '      Roman '),
+}
 
 
+def solve_order(islands: list, first: str, second: str, pins: dict, args: argparse.Namespace) -> dict:
+    """
+    solve for the first population, then for the second population from the islands left over
+    runs in a worker process, so everything it reports is captured and handed back rather than printed
+    :param islands: list of parsed islands
+    :param first: population solved first, 'celtic' or 'roman'
+    :param second: population solved second
+    :param pins: population -> list of names of the islands pinned for it
+    :param args: command line options
+    :return: dictionary of the order, the captured report, and (score, island names) for each population
+    """
+    rv = {'order': f"{first.capitalize()} then {second.capitalize()}"}
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        alb_solver = AlbionSolver()
+        remaining = list(islands)
+        if args.score_cache > 0:
+            alb_solver.score_cache = ScoreCache(args.score_cache)
+        if args.top > 0:
+            alb_solver.elite_archive = EliteArchive(args.top, args.min_difference)
+
+        print(f"Optimized Island Set, Albion Islands, {rv['order']}:")
+        for population, other in ((first, second), (second, first)):
+            coverage, label = POPULATIONS[population]
+            alb_solver.the_list = remaining
+            alb_solver.set_coverage(coverage())
+            alb_solver.pin(pins[population], exclude=pins[other])
+            solve(alb_solver, args, f"{first}_first_{population}")
+            print(label, end = '')
+            solution_islands = alb_solver.report()
+            rv[population] = (alb_solver.score(alb_solver.the_list), [island.island_name for island in solution_islands])
+            alb_solver.report_alternatives(population.capitalize())
+
+            # islands used by this population are not available for the next one
+            remaining = [island for island in remaining if island not in solution_islands]
+
+    rv['report'] = output.getvalue()
+    return rv
+
+
+def report_comparison(results: list):
+    """
+    write the population orders side by side to stdout, and recommend the one with the best total score
+    :param results: list of solve_order() results
+    """
+    print("Comparison:")
+    print(f"            " + ''.join(f"{result['order']:>20}" for result in results))
+    for population, (coverage, label) in POPULATIONS.items():
+        print(label + ''.join(f"{result[population][0]:>20.0f}" for result in results))
+        print(f"            " + ''.join(f"{'[' + ','.join(result[population][1]) + ']':>20}" for result in results))
+    totals = [result['celtic'][0] + result['roman'][0] for result in results]
+    print(f"      Total " + ''.join(f"{total:>20.0f}" for total in totals))
 
+    best = max(range(len(results)), key=lambda ndx: totals[ndx])
+    others = ', '.join(f"{results[ndx]['order']} {totals[ndx]:.0f}" for ndx in range(len(results)) if ndx != best)
+    print(f"Recommended order: {results[best]['order']} (total {totals[best]:.0f}, vs {others})")
 
 
 #
@@ -114,18 +113,52 @@ class AlbionSolver(SimulatedAnnealingSolver):
 def main():
 
     # command line
-    #       python AlbionSolver.py inputfile.csv
-    if len(sys.argv) != 2:
-        print("Usage:")
-        print("     python AlbionSolver.py inputfile.csv")
-        exit(-1)
+    #       python AlbionSolver.py inputfile.csv [--top K] [--min-difference D] [--score-cache SIZE] [--pin-celtic A,B] [--pin-roman C,D] [--names INDEX] [--engine E] [--telemetry] [--checkpoint FILE [--resume]]
+    parser = argparse.ArgumentParser(description='Find an optimum set of Albion Islands')
+    parser.add_argument('filename', help='island .csv file')
+    parser.add_argument('--top', type=int, default=0,
+                        help='also report the best K distinct island sets found during each solve')
+    parser.add_argument('--min-difference', type=int, default=1,
+                        help='min number of islands which must differ between any two of the --top island sets')
+    parser.add_argument('--score-cache', type=int, default=0, metavar='SIZE',
+                        help='number of covering-prefix scores to cache, 0 to disable (default 0)')
+    parser.add_argument('--pin-celtic', default='', metavar='A,B',
+                        help='comma separated islands already settled by Celts, which are kept first, in this order')
+    parser.add_argument('--pin-roman', default='', metavar='C,D',
+                        help='comma separated islands already settled by Romans, which are kept first, in this order')
+    parser.add_argument('--names', metavar='INDEX',
+                        help='LineId index from LocalizationIndex.py, to show islands named by LineId with their in-game names')
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+    check_engine_arguments(parser, args)
 
     # Albion solver
     alb_solver = AlbionSolver()
-    alb_solver.set_filename(sys.argv[1])
+    alb_solver.set_filename(args.filename)
+    if args.names:
+        try:
+            localize_islands(alb_solver.the_list, LocalizationIndex.open(args.names))
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    if args.score_cache > 0:
+        alb_solver.score_cache = ScoreCache(args.score_cache)
     print('')
     print(f"Region map: [{alb_solver.filename}]")
 
+    # islands pinned for one population aren't available to the other
+    celtic_pins = [name for name in args.pin_celtic.split(',') if name]
+    roman_pins = [name for name in args.pin_roman.split(',') if name]
+    island_names = {island.island_name for island in alb_solver.the_list}
+    for name in celtic_pins + roman_pins:
+        if name not in island_names:
+            parser.error(f"can't pin [{name}], it isn't in the list")
+    if set(celtic_pins) & set(roman_pins):
+        parser.error("an island can't be pinned for both Celts and Romans")
+    if celtic_pins:
+        print(f"Pinned Celtic Islands: [{', '.join(celtic_pins)}]")
+    if roman_pins:
+        print(f"Pinned Roman Islands: [{', '.join(roman_pins)}]")
+
 
     # show initial guesses - score the list as initially read in
     # useful if wish to evaluate choices already made, by putting those choices first in the input list
@@ -138,44 +171,18 @@ def main():
     print("      Roman ", end = '')
     alb_solver.report()
 
-    print("Optimized Island Set, Albion Islands, Celtic then Roman:")
-    alb_solver.set_coverage(AlbionFertility.celtic())
-    alb_solver.solve()
-    print("     Celtic ", end = '')
-    solution_islands = alb_solver.report()
-
-    # remove islands used in first population as not available for second population
-    new_list = [island for island in alb_solver.the_list if island not in solution_islands]
-    alb_solver.the_list = new_list
-    # print(f"num islands = {len(alb_solver.the_list)}")
-
-    # solve for islands for second population
-    alb_solver.set_coverage(AlbionFertility.roman())
-    alb_solver.solve()
-    print("      Roman ", end = '')
-    alb_solver.report()
-
-    # reload islands, and do it in the reverse order
-    alb_solver.load_islands()
-
-    # solve for islands for first population
-    # print(f"num islands = {len(alb_solver.the_list)}")
-    print("Optimized Island Set, Albion Islands, Roman then Celtic:")
-    alb_solver.set_coverage(AlbionFertility.roman())
-    alb_solver.solve()
-    print("      Roman ", end = '')
-    solution_islands = alb_solver.report()
-
-    # remove islands used in first population as not available for second population
-    new_list = [island for island in alb_solver.the_list if island not in solution_islands]
-    alb_solver.the_list = new_list
-    # print(f"num islands = {len(alb_solver.the_list)}")
-
-    # solve for islands for second population
-    alb_solver.set_coverage(AlbionFertility.celtic())
-    alb_solver.solve()
-    print("     Celtic ", end = '')
-    alb_solver.report()
+    # solve both population orders at once
+    # (worker processes from concurrent.futures may start processes of their own, e.g. for --engine tempering)
+    pins = {'celtic': celtic_pins, 'roman': roman_pins}
+    orders = (('celtic', 'roman'), ('roman', 'celtic'))
+    with concurrent.futures.ProcessPoolExecutor(len(orders)) as executor:
+        futures = [executor.submit(solve_order, alb_solver.the_list, first, second, pins, args)
+                   for first, second in orders]
+        results = [future.result() for future in futures]
+
+    for result in results:
+        print(result['report'], end = '')
+    report_comparison(results)
 
     print('')
     print("Done")
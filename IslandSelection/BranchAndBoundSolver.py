@@ -0,0 +1,150 @@
+from SearchEngine import SearchEngine
+from SelectionProblem import SelectionProblem
+
+
+###########################################################################################
+#
+#   Exact Branch and Bound solver
+#
+class BranchAndBoundSolver(SearchEngine):
+    """
+    Exact search engine, for problems with a bound (see SelectionProblem.make_bound())
+        - builds covering prefixes one island at a time, depth first, trying the islands with the best
+          maximum score first
+        - a partial prefix is abandoned as soon as its score plus the best possible score of any extension
+          can't beat the best complete prefix found so far
+        - the first best is found greedily, so there is something to prune against from the start
+    If the search finishes within the evaluation budget, the answer is optimal.  If the budget runs out first,
+    the answer is the best found so far, as with the other engines.
+    """
+
+    name = 'exact'
+
+    def __init__(self, problem: SelectionProblem):
+        super().__init__(problem)
+
+        # True if the last solve searched the whole tree
+        self.optimal = False
+
+        # score of the greedy first solution
+        self.greedy_score = -float('inf')
+
+    def solve(self) -> list:
+        """
+        Branch and Bound basic algorithm
+            - find a good first solution greedily
+            -   depth first over the next island in the prefix
+            -       if the prefix covers everything, it's a complete solution
+            -       otherwise, carry on down only if the bound says it could still beat the best so far
+        :return: optimized list
+        """
+        problem = self.problem
+        self.start()
+        self.optimal = False
+
+        bound = problem.make_bound()
+        if bound is None:
+            raise ValueError(f"the {self.name} engine needs a problem with a bound, see SelectionProblem.make_bound()")
+
+        pinned = problem.the_list[:problem.pinned]
+        free = sorted(problem.the_list[problem.pinned:], key=bound.max_score, reverse=True)
+
+        greedy_list = self.greedy(bound, pinned, free)
+        self.greedy_score = problem.score(greedy_list)
+        self.evaluations += 1
+        self.record(greedy_list, self.greedy_score)
+
+        self.optimal = self.branch(bound, pinned, free)
+        return self.finish()
+
+    def greedy(self, bound, prefix: list, free: list) -> list:
+        """
+        build a prefix by adding whichever island scores best next, until everything is covered
+        :return: the prefix, followed by the unused islands
+        """
+        problem = self.problem
+        prefix = list(prefix)
+        free = list(free)
+
+        while free and (not prefix or bound.needed_after(prefix) != 0):
+            best_item = None
+            best_score = -float('inf')
+            for item in free:
+                item_score = problem.score(prefix + [item])
+                self.evaluations += 1
+                if item_score > best_score:
+                    best_item = item
+                    best_score = item_score
+            prefix.append(best_item)
+            free.remove(best_item)
+
+        return prefix + free
+
+    def branch(self, bound, prefix: list, free: list) -> bool:
+        """
+        search every extension of the prefix
+        :param prefix: partial prefix, which doesn't cover everything yet
+        :param free: islands not in the prefix, best max score first
+        :return: False if the evaluation budget ran out
+        """
+        problem = self.problem
+        depth = len(prefix)
+
+        for ndx, item in enumerate(free):
+            if self.evaluations >= self.max_evaluations:
+                return False
+
+            new_prefix = prefix + [item]
+            rest = free[:ndx] + free[ndx + 1:]
+
+            # until the prefix covers everything, score() just adds up the whole list
+            new_score = problem.score(new_prefix)
+            self.evaluations += 1
+
+            if not rest or bound.needed_after(new_prefix) == 0:
+                if new_score > self.best_score or problem.elite_archive is not None:
+                    self.record(new_prefix + rest, new_score)
+                continue
+
+            if new_score + bound.completion_bound(depth + 1, rest) > self.best_score:
+                if not self.branch(bound, new_prefix, rest):
+                    return False
+
+        if depth <= problem.pinned + 1:
+            self.report_progress()
+        return True
+
+    def telemetry(self) -> dict:
+        rv = super().telemetry()
+        rv['optimal'] = self.optimal
+        return rv
+
+    def report_telemetry(self):
+        super().report_telemetry()
+        print(f"        Search {'finished, solution is optimal' if self.optimal else 'stopped at the evaluation budget'}")
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # the simple array problem has no bound, so use one of the bundled island maps
+    from LatiumSolver import LatiumSolver
+
+    lat_solver = LatiumSolver()
+    lat_solver.set_filename('corners_seed7324_latium.csv')
+    print("Initial ", end='')
+    lat_solver.report()
+
+    exact = BranchAndBoundSolver(lat_solver)
+    exact.solve()
+    print("Final   ", end='')
+    lat_solver.report()
+    exact.report_telemetry()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+###########################################################################################
+#
+#   Optimistic upper bound on the score of an island ordering
+#
+class CoverageBound:
+    """
+    Upper bound for the island scores used by LatiumSolver and AlbionSolver, i.e.
+        score = sum over the covering prefix of (reduction_rate ** ndx) * island score - ndx * penalty
+
+    An island never scores more than it would if every one of its fertilities was still wanted, so each island's
+    maximum score is computed once, up front.  The bound for an ordering then just walks the coverage bitmasks,
+    adding up the maximum scores, which is much cheaper than the full score() since no island scores are calculated.
+
+    The global bound is the best any ordering could possibly do: the k best islands, best first, less the
+    penalties for k islands, for the best k
+    """
+
+    def __init__(self, islands: list, max_scores: list, needed: int,
+                 reduction_rate: float, penalty: float, readd_after_first: int = 0):
+        """
+        :param islands: list of islands
+        :param max_scores: each island's maximum possible score, same order as islands
+        :param needed: bitmask of the fertilities which must be covered
+        :param reduction_rate: the problem's extra_island_reduction_rate
+        :param penalty: the problem's extra_island_penalty
+        :param readd_after_first: fertilities which are wanted again after the first island, even if it had them
+        """
+        self.needed = int(needed)
+        self.reduction_rate = reduction_rate
+        self.penalty = penalty
+        self.readd_after_first = int(readd_after_first)
+
+        # id(island) -> (max score, fertility bitmask)
+        self.islands = {id(island): (max_score, int(island.fertilities))
+                        for island, max_score in zip(islands, max_scores)}
+
+        self.global_bound = self.calculate_global_bound(max_scores, [int(island.fertilities) for island in islands])
+
+    def upper_bound(self, candidate_list: list) -> float:
+        """
+        optimistic score for this ordering, never less than the problem's score()
+        the arithmetic follows the problem's score() step for step, so rounding can't push the bound below the score
+        """
+        rv = 0.0
+        needed = self.needed
+        for ndx, island in enumerate(candidate_list):
+            max_score, fertilities = self.islands[id(island)]
+            rv += (self.reduction_rate ** ndx) * max_score
+            rv -= ndx * self.penalty
+
+            needed &= ~fertilities
+            if ndx == 0:
+                needed |= self.readd_after_first
+            if needed == 0:
+                break
+
+        return rv
+
+    def needed_after(self, candidate_list: list) -> int:
+        """
+        :return: bitmask of the fertilities still needed after the whole of candidate_list
+        """
+        needed = self.needed
+        for ndx, island in enumerate(candidate_list):
+            needed &= ~self.islands[id(island)][1]
+            if ndx == 0:
+                needed |= self.readd_after_first
+        return needed
+
+    def completion_bound(self, depth: int, remaining: list) -> float:
+        """
+        best possible score for extending a prefix of 'depth' islands, which doesn't yet cover everything,
+        with one or more of the remaining islands
+        :param depth: number of islands already in the prefix
+        :param remaining: islands which could be added, sorted best max score first
+        """
+        # each extra island adds at most (reduction_rate ** ndx) * max score - ndx * penalty, and these terms only
+        # get smaller, so the best is the first term plus any more which are still positive
+        rv = 0.0
+        for ndx, island in enumerate(remaining, start=depth):
+            term = (self.reduction_rate ** ndx) * self.islands[id(island)][0] - ndx * self.penalty
+            if ndx > depth and term <= 0.0:
+                break
+            rv += term
+        return rv
+
+    def max_score(self, island) -> float:
+        return self.islands[id(island)][0]
+
+    def calculate_global_bound(self, max_scores: list, masks: list) -> float:
+        """
+        best possible score for any ordering
+            - k islands can't score more than the k best max scores, with the best one first
+            - k must be at least big enough that the k islands with the most wanted fertilities could cover them all,
+              unless it's the whole list, which is scored even if it doesn't cover everything
+        """
+        needed_count = bin(self.needed).count('1')
+        counts = sorted((bin(mask & self.needed).count('1') for mask in masks), reverse=True)
+        ranked = sorted(max_scores, reverse=True)
+
+        rv = -float('inf')
+        total = 0.0
+        covered_count = 0
+        for k, max_score in enumerate(ranked, start=1):
+            total += (self.reduction_rate ** (k - 1)) * max_score
+            covered_count += counts[k - 1]
+            if covered_count >= needed_count or k == len(ranked):
+                rv = max(rv, total - self.penalty * k * (k - 1) / 2)
+
+        return rv
@@ -0,0 +1,81 @@
+from InPlaceMoves import InPlaceMoves
+from RandomStream import RandomStream
+
+
+###########################################################################################
+#
+#   Move generator which concentrates on the islands that actually contribute to the score
+#
+class CoverageMoves(InPlaceMoves):
+    """
+    In-place moves for the island problems, which know where the covering prefix ends
+        - only the islands up to the point where every fertility is covered contribute to the score,
+          typically 3 or 4 islands out of 17 to 19, so most uniformly random moves only shuffle the tail,
+          and leave the score unchanged
+        - with probability 'focus_rate', swap a random prefix island with a tail island which carries
+          a fertility the rest of the prefix doesn't cover, so the swap keeps the coverage complete
+        - otherwise, make one of the general purpose moves from InPlaceMoves
+    """
+
+    def __init__(self, islands: list, needed: int, readd_after_first: int = 0, focus_rate: float = 0.5,
+                 rng: RandomStream = None):
+        """
+        :param islands: list of islands
+        :param needed: bitmask of the fertilities which must be covered
+        :param readd_after_first: fertilities which are wanted again after the first island, even if it had them
+        :param focus_rate: fraction of moves which are prefix / tail swaps
+        :param rng: source of random numbers, normally the problem's
+        """
+        super().__init__(rng)
+        self.needed = int(needed)
+        self.readd_after_first = int(readd_after_first)
+        self.focus_rate = focus_rate
+
+        # id(island) -> fertility bitmask
+        self.masks = {id(island): int(island.fertilities) for island in islands}
+
+    def cutoff(self, the_list: list) -> int:
+        """
+        :return: number of islands in the covering prefix
+        """
+        needed = self.needed
+        for ndx, island in enumerate(the_list):
+            needed &= ~self.masks[id(island)]
+            if ndx == 0:
+                needed |= self.readd_after_first
+            if needed == 0:
+                return ndx + 1
+        return len(the_list)
+
+    def apply(self, the_list: list, start: int = 0):
+        """
+        apply a random move to the list, in place
+        :param the_list: the working list
+        :param start: members before this position are left alone
+        """
+        if self.rng.random() >= self.focus_rate:
+            super().apply(the_list, start)
+            return
+
+        cutoff = self.cutoff(the_list)
+        if cutoff <= start or cutoff >= len(the_list):
+            super().apply(the_list, start)
+            return
+
+        # pick a prefix island to swap out, and find what goes missing without it
+        a = self.rng.integers(start, cutoff)
+        others = 0
+        for ndx in range(cutoff):
+            if ndx != a:
+                others |= self.masks[id(the_list[ndx])]
+        missing = self.needed & ~others
+
+        # tail islands which would fill the gap, or any tail island if the prefix island wasn't needed
+        candidates = [ndx for ndx in range(cutoff, len(the_list)) if self.masks[id(the_list[ndx])] & missing]
+        if missing == 0 or not candidates:
+            b = self.rng.integers(cutoff, len(the_list))
+        else:
+            b = candidates[self.rng.integers(0, len(candidates))]
+
+        the_list[a], the_list[b] = the_list[b], the_list[a]
+        self.last_move = (self.SWAP, a, b, 0)
@@ -0,0 +1,65 @@
+###########################################################################################
+#
+#   Dominance test between islands
+#
+#   island B dominates island A when B is at least as good as A in every way that counts towards the score:
+#       - B has every wanted fertility that A has, i.e. a bitmask subset test
+#       - B has at least as many of each kind of slot (river, marsh, mountain)
+#       - B is at least as large
+#   so B scores at least as much as A wherever A could go, and covers at least as much.
+#
+#   Note this is a heuristic rather than a proof of optimality: since each island also scores for its
+#   slots and size regardless of fertilities, a dominated island can occasionally still earn its place
+#   in a prefix alongside its dominator.  In practice these are weak islands which the search spends
+#   time considering and then rejects.
+#
+
+def dominates(island_b, island_a, needed: int, slot_attributes: tuple) -> bool:
+    """
+    :return: True if island_b is at least as good as island_a in every respect
+    """
+    fertilities_a = int(island_a.fertilities) & needed
+    fertilities_b = int(island_b.fertilities) & needed
+    if fertilities_a & ~fertilities_b:
+        return False
+    for attribute in slot_attributes:
+        if getattr(island_b, attribute) < getattr(island_a, attribute):
+            return False
+    # lower IslandSize values are larger islands
+    return island_b.island_size <= island_a.island_size
+
+
+def find_dominated(islands: list, needed: int, slot_attributes: tuple) -> list:
+    """
+    find the islands which are dominated by another island in the list
+    islands which are identical in every respect dominate each other, in which case the first one in the list is kept
+    :param islands: list of islands
+    :param needed: bitmask of the wanted fertilities, other fertilities are ignored
+    :param slot_attributes: names of the island's slot count attributes, e.g. ('river_slots', 'mountain_slots')
+    :return: list of (dominated island, dominating island) tuples, where the dominating island is never itself dominated
+    """
+    needed = int(needed)
+
+    def beats(b: int, a: int) -> bool:
+        if a == b or not dominates(islands[b], islands[a], needed, slot_attributes):
+            return False
+        return b < a or not dominates(islands[a], islands[b], needed, slot_attributes)
+
+    dominated = {a for a in range(len(islands)) if any(beats(b, a) for b in range(len(islands)))}
+
+    rv = []
+    for a in sorted(dominated):
+        # dominance is transitive, so one of the survivors always dominates a dominated island
+        b = next(b for b in range(len(islands)) if b not in dominated and beats(b, a))
+        rv.append((islands[a], islands[b]))
+    return rv
+
+
+def explain(island_a, island_b, slot_attributes: tuple) -> str:
+    """
+    :return: description of why island_a is dominated by island_b
+    """
+    slots = ', '.join(f"{attribute.replace('_', ' ')} {getattr(island_b, attribute)} >= {getattr(island_a, attribute)}"
+                      for attribute in slot_attributes)
+    return (f"[{island_a.island_name}] is dominated by [{island_b.island_name}]: "
+            f"has every wanted fertility, {slots}, size {island_b.island_size.name} >= {island_a.island_size.name}")
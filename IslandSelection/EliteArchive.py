@@ -0,0 +1,124 @@
+import heapq
+
+
+###########################################################################################
+#
+#   Bounded archive of the best distinct solutions seen during a solve
+#
+class EliteArchive:
+    """
+    Keeps the best K distinct solutions seen while a solver is running.
+        - solutions are identified by their covering prefix, i.e. the items which actually contribute to the score,
+          since items beyond the point where coverage is complete don't change the score
+        - two solutions are considered distinct only if their prefixes differ by at least 'min_difference' items,
+          regardless of order.  When two solutions are too similar, only the higher scoring one is kept
+        - entries live in a min-heap keyed on score, so the weakest member is always at heap[0],
+          and insertion into a full archive is O(log K)
+    """
+
+    def __init__(self, max_size: int = 5, min_difference: int = 1):
+        # max number of solutions to keep
+        self.max_size = max_size
+
+        # min number of prefix items which must differ between any two archive members
+        self.min_difference = min_difference
+
+        # min-heap of [score, sequence, key, members, solution] entries
+        # sequence is an insertion counter, used as a tie breaker so the heap never compares lists
+        self._heap = []
+        self._sequence = 0
+
+        # set of prefix keys currently in the archive, for a fast exact-duplicate check
+        self._keys = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def threshold(self) -> float:
+        """
+        :return: score a new solution must beat to enter the archive
+        """
+        if len(self._heap) < self.max_size:
+            return -float('inf')
+        return self._heap[0][0]
+
+    @staticmethod
+    def difference(members_a: set, members_b: set) -> int:
+        """
+        number of items which would need to be swapped to turn one prefix into the other
+        """
+        return max(len(members_a - members_b), len(members_b - members_a))
+
+    def offer(self, score: float, prefix: list, solution: list) -> bool:
+        """
+        offer a solution to the archive
+        :param score: solution score
+        :param prefix: the covering prefix of the solution
+        :param solution: the full solution list, which is copied if the solution is accepted
+        :return: True if the solution was added to the archive
+        """
+        # quick reject, cheaper than anything below, and by far the most common case
+        if score <= self.threshold():
+            return False
+
+        key = tuple(prefix)
+        if key in self._keys:
+            return False
+
+        # find any archive members which are too similar to this one
+        members = set(prefix)
+        similar = [entry for entry in self._heap if self.difference(entry[3], members) < self.min_difference]
+        for entry in similar:
+            if entry[0] >= score:
+                return False
+
+        # this solution beats every similar member, so those are evicted
+        if similar:
+            for entry in similar:
+                self._keys.discard(entry[2])
+            similar_ids = {id(entry) for entry in similar}
+            self._heap = [entry for entry in self._heap if id(entry) not in similar_ids]
+            heapq.heapify(self._heap)
+
+        new_entry = [score, self._sequence, key, members, solution.copy()]
+        self._sequence += 1
+        self._keys.add(key)
+
+        if len(self._heap) < self.max_size:
+            heapq.heappush(self._heap, new_entry)
+        else:
+            evicted = heapq.heapreplace(self._heap, new_entry)
+            self._keys.discard(evicted[2])
+
+        return True
+
+    def solutions(self) -> list:
+        """
+        :return: list of (score, solution) tuples, best first
+        """
+        return [(entry[0], entry[4]) for entry in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+
+
+###########################################################################################
+#
+#
+def main():
+
+    archive = EliteArchive(max_size=3, min_difference=1)
+
+    print(f"Offer [a, b, c] = 10   : {archive.offer(10, ['a', 'b', 'c'], ['a', 'b', 'c', 'd'])}")
+    print(f"Offer [b, a, c] = 12   : {archive.offer(12, ['b', 'a', 'c'], ['b', 'a', 'c', 'd'])}")
+    print(f"Offer [b, a, c] = 12   : {archive.offer(12, ['b', 'a', 'c'], ['b', 'a', 'c', 'd'])}")
+    print(f"Offer [a, b, d] = 8    : {archive.offer(8, ['a', 'b', 'd'], ['a', 'b', 'd', 'c'])}")
+    print(f"Offer [c, d] = 9       : {archive.offer(9, ['c', 'd'], ['c', 'd', 'a', 'b'])}")
+    print(f"Offer [d, a] = 7       : {archive.offer(7, ['d', 'a'], ['d', 'a', 'b', 'c'])}")
+    print(f"Offer [d, b] = 11      : {archive.offer(11, ['d', 'b'], ['d', 'b', 'a', 'c'])}")
+
+    for score, solution in archive.solutions():
+        print(f"    {score}    {solution}")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
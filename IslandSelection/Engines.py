@@ -0,0 +1,107 @@
+import argparse
+import os
+
+from RandomStream import RandomStream
+from SearchEngine import SearchEngine
+from SelectionProblem import SelectionProblem
+from SimulatedAnnealingSolver import SimulatedAnnealingSolver
+from ParallelTemperingSolver import ParallelTemperingSolver
+from TabuSearchSolver import TabuSearchSolver
+from GeneticSolver import GeneticSolver
+from BranchAndBoundSolver import BranchAndBoundSolver
+
+
+###########################################################################################
+#
+#   Registry of the available search engines, and command line support for choosing one
+#
+ENGINES = {
+    SimulatedAnnealingSolver.name: SimulatedAnnealingSolver,
+    ParallelTemperingSolver.name: ParallelTemperingSolver,
+    TabuSearchSolver.name: TabuSearchSolver,
+    GeneticSolver.name: GeneticSolver,
+    BranchAndBoundSolver.name: BranchAndBoundSolver,
+}
+
+
+def add_engine_arguments(parser: argparse.ArgumentParser):
+    """
+    add the search engine command line options to a solver's argument parser
+    """
+    parser.add_argument('--engine', choices=list(ENGINES.keys()), default=SimulatedAnnealingSolver.name,
+                        help='search engine used to solve (default: anneal)')
+    parser.add_argument('--replicas', type=int, default=4,
+                        help='number of parallel tempering replicas, each runs in its own process')
+    parser.add_argument('--prune-dominated', action='store_true',
+                        help='leave out of the search any island which another island beats in every respect')
+    parser.add_argument('--seed', type=int, metavar='N',
+                        help='seed the random numbers, so the same command gives the same answer (default: unseeded)')
+    parser.add_argument('--telemetry', action='store_true',
+                        help='report evaluations, run time and time-to-best after each solve')
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help='periodically save the annealing state to FILE (anneal engine only)')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0, metavar='SECONDS',
+                        help='seconds between checkpoints (default 60)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the --checkpoint file, if it exists, rather than starting over')
+
+
+def check_engine_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    reject search engine options which don't go together
+    """
+    if args.checkpoint and args.engine != SimulatedAnnealingSolver.name:
+        parser.error(f"--checkpoint is only supported by the {SimulatedAnnealingSolver.name} engine")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+
+
+def make_engine(problem: SelectionProblem, args: argparse.Namespace, phase: str = '') -> SearchEngine:
+    """
+    create the search engine chosen on the command line
+    :param phase: name of this solve, for programs which solve more than once, keeps their checkpoint files apart
+        and gives each its own random number stream
+    """
+    if args.seed is not None:
+        problem.rng = RandomStream(args.seed, phase)
+
+    if args.engine == ParallelTemperingSolver.name:
+        return ParallelTemperingSolver(problem, args.replicas)
+
+    engine = ENGINES[args.engine](problem)
+    if args.checkpoint:
+        root, ext = os.path.splitext(args.checkpoint)
+        engine.checkpoint_file = f"{root}.{phase}{ext}" if phase else args.checkpoint
+        engine.checkpoint_interval = args.checkpoint_interval
+    return engine
+
+
+def solve(problem: SelectionProblem, args: argparse.Namespace, phase: str = '') -> SearchEngine:
+    """
+    solve the problem using the search engine and options chosen on the command line
+    :param phase: name of this solve, for programs which solve more than once
+    :return: the engine, for access to its telemetry
+    """
+    # dominated items sit out the search, and are put back at the end of the list afterwards
+    # pinned items always stay
+    dominated = problem.dominated_items() if args.prune_dominated else []
+    pinned = {id(item) for item in problem.the_list[:problem.pinned]}
+    dominated = [(item, reason) for item, reason in dominated if id(item) not in pinned]
+    if dominated:
+        for item, reason in dominated:
+            print(f"        Pruned {reason}")
+        pruned = {id(item) for item, reason in dominated}
+        problem.the_list = [item for item in problem.the_list if id(item) not in pruned]
+
+    engine = make_engine(problem, args, phase)
+    if args.checkpoint:
+        engine.solve(resume=args.resume)
+    else:
+        engine.solve()
+
+    if dominated:
+        problem.the_list = problem.the_list + [item for item, reason in dominated]
+
+    if args.telemetry:
+        engine.report_telemetry()
+    return engine
@@ -0,0 +1,124 @@
+from SearchEngine import SearchEngine
+from SelectionProblem import SelectionProblem, SimpleArraySolver
+
+
+###########################################################################################
+#
+#   Genetic Algorithm solver
+#
+class GeneticSolver(SearchEngine):
+    """
+    Genetic Algorithm search engine
+        - solves any SelectionProblem, using its score() and perturb() functions
+        - keeps a population of orderings, seeded from perturbations of the problem's initial list
+        - each generation, children are bred from tournament-selected parents using order crossover,
+          then mutated with perturb()
+        - pinned items stay where they are, only the rest of each list is crossed over and mutated
+        - the best 'elite_count' members always survive into the next generation
+    """
+
+    name = 'genetic'
+
+    def __init__(self, problem: SelectionProblem, population_size: int = 50, tournament_size: int = 3,
+                 mutation_rate: float = 0.3, elite_count: int = 2):
+        super().__init__(problem)
+        self.population_size = population_size
+        self.tournament_size = tournament_size
+        self.mutation_rate = mutation_rate
+        self.elite_count = elite_count
+
+        # number of generations, so the whole search fits in the evaluation budget
+        children_per_generation = self.population_size - self.elite_count
+        self.max_generations = max((self.max_evaluations - self.population_size) // children_per_generation, 1)
+
+    def order_crossover(self, parent_a: list, parent_b: list) -> list:
+        """
+        Order crossover (OX)
+            - copy a random slice of parent_a into the child, in the same positions
+            - fill the remaining positions with the remaining members, in the order they appear in parent_b
+        :return: the child list
+        """
+        n = len(parent_a)
+        rng = self.problem.rng
+        start, end = sorted((rng.integers(0, n + 1), rng.integers(0, n + 1)))
+        segment = parent_a[start:end]
+        in_segment = set(segment)
+        remaining = [item for item in parent_b if item not in in_segment]
+        return remaining[:start] + segment + remaining[start:]
+
+    def tournament(self, population: list, scores: list) -> list:
+        """
+        pick 'tournament_size' random members, and return the best of them
+        """
+        contestants = [self.problem.rng.integers(0, len(population)) for _ in range(self.tournament_size)]
+        winner = max(contestants, key=lambda ndx: scores[ndx])
+        return population[winner]
+
+    def solve(self) -> list:
+        """
+        Genetic Algorithm basic algorithm
+            - create an initial population
+            -   generation loop
+            -       keep the elite members
+            -       fill the rest of the next generation with children of tournament winners, via crossover and mutation
+        :return: optimized list
+        """
+        problem = self.problem
+        pinned = problem.pinned
+        self.start()
+
+        population = [problem.the_list.copy()]
+        while len(population) < self.population_size:
+            population.append(problem.perturb(problem.the_list.copy()))
+        scores = [problem.score(member) for member in population]
+        self.evaluations += len(population)
+        for member, member_score in zip(population, scores):
+            self.record(member, member_score)
+
+        for generation in range(self.max_generations):
+
+            ranked = sorted(range(len(population)), key=lambda ndx: scores[ndx], reverse=True)
+            next_population = [population[ndx] for ndx in ranked[:self.elite_count]]
+            next_scores = [scores[ndx] for ndx in ranked[:self.elite_count]]
+
+            while len(next_population) < self.population_size:
+                parent_a = self.tournament(population, scores)
+                parent_b = self.tournament(population, scores)
+                child = parent_a[:pinned] + self.order_crossover(parent_a[pinned:], parent_b[pinned:])
+                if problem.rng.random() < self.mutation_rate:
+                    child = problem.perturb(child)
+                child_score = problem.score(child)
+                self.evaluations += 1
+                if child_score > self.best_score or problem.elite_archive is not None:
+                    self.record(child, child_score)
+
+                next_population.append(child)
+                next_scores.append(child_score)
+
+            population = next_population
+            scores = next_scores
+            if generation % 20 == 0:
+                self.report_progress()
+
+        return self.finish()
+
+
+###########################################################################################
+#
+#
+def main():
+
+    simple_solver = SimpleArraySolver()
+    my_list = simple_solver.the_list
+    print(f"Initial List   [{len(my_list)}]    : {my_list}")
+
+    genetic = GeneticSolver(simple_solver)
+    my_list = genetic.solve()
+    print(f"Final List     [{len(my_list)}]    : {my_list}")
+    genetic.report_telemetry()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
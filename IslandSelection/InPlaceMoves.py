@@ -0,0 +1,128 @@
+from RandomStream import RandomStream
+
+
+###########################################################################################
+#
+#   Perturbation moves which change a list in place, and can be undone
+#
+class InPlaceMoves:
+    """
+    Move generator for the annealing engine, an in-place alternative to SelectionProblem.perturb_list()
+        - perturb_list() works on a copy of the list, and rebuilds it from slices, i.e. several whole-list
+          allocations for every trial, most of which are thrown away when the trial is rejected
+        - these moves change the working list directly, touching only the part of the list that moves,
+          and remember how to put it back, so a rejected trial is rolled back with undo()
+    Three kinds of move:
+        - relocate:     take a segment and insert it somewhere else, the same move as perturb_list()
+        - swap:         swap two list members
+        - reverse:      reverse the order of a segment
+    """
+
+    RELOCATE = 0
+    SWAP = 1
+    REVERSE = 2
+
+    def __init__(self, rng: RandomStream = None, relocate_rate: float = 0.5, swap_rate: float = 0.25):
+        # source of random numbers, normally the problem's
+        self.rng = rng if rng is not None else RandomStream()
+
+        # probability of each kind of move, the remainder are reversals
+        self.relocate_rate = relocate_rate
+        self.swap_rate = swap_rate
+
+        # the most recent move, (kind, a, b, c), for undo()
+        self.last_move = None
+
+    @staticmethod
+    def rotate(the_list: list, lo: int, mid: int, hi: int):
+        """
+        rotate the_list[lo:hi] in place, so the member at mid ends up at lo
+        """
+        the_list[lo:hi] = the_list[mid:hi] + the_list[lo:mid]
+
+    @staticmethod
+    def reverse(the_list: list, lo: int, hi: int):
+        """
+        reverse the_list[lo:hi] in place
+        """
+        the_list[lo:hi] = the_list[lo:hi][::-1]
+
+    def apply(self, the_list: list, start: int = 0):
+        """
+        apply a random move to the list, in place
+        :param the_list: the working list
+        :param start: members before this position are left alone
+        """
+        n = len(the_list) - start
+        if n < 2:
+            # nothing to move
+            self.last_move = (self.REVERSE, start, start, 0)
+            return
+
+        rng = self.rng
+        kind = rng.random()
+
+        if kind < self.relocate_rate:
+            # segment [segment_start, segment_start+segment_length) moves to new_segment_start,
+            # counted in the list as it would be with the segment removed
+            segment_start = rng.integers(0, n)
+            segment_length = rng.integers(1, n - segment_start + 1)
+            new_segment_start = rng.integers(0, n - segment_length + 1)
+
+            segment_start += start
+            new_segment_start += start
+            if new_segment_start < segment_start:
+                # segment moves towards the front
+                lo, mid, hi = new_segment_start, segment_start, segment_start + segment_length
+            else:
+                # segment moves towards the back
+                lo, mid, hi = segment_start, segment_start + segment_length, new_segment_start + segment_length
+            self.rotate(the_list, lo, mid, hi)
+            self.last_move = (self.RELOCATE, lo, mid, hi)
+
+        elif kind < self.relocate_rate + self.swap_rate:
+            a = rng.integers(start, start + n)
+            b = rng.integers(start, start + n)
+            the_list[a], the_list[b] = the_list[b], the_list[a]
+            self.last_move = (self.SWAP, a, b, 0)
+
+        else:
+            lo, hi = sorted((rng.integers(start, start + n + 1), rng.integers(start, start + n + 1)))
+            self.reverse(the_list, lo, hi)
+            self.last_move = (self.REVERSE, lo, hi, 0)
+
+    def undo(self, the_list: list):
+        """
+        roll back the most recent move
+        """
+        kind, a, b, c = self.last_move
+        if kind == self.RELOCATE:
+            # rotating the other way puts the segment back
+            self.rotate(the_list, a, a + c - b, c)
+        elif kind == self.SWAP:
+            the_list[a], the_list[b] = the_list[b], the_list[a]
+        else:
+            self.reverse(the_list, a, b)
+        self.last_move = None
+
+
+###########################################################################################
+#
+#
+def main():
+
+    moves = InPlaceMoves(RandomStream(1))
+    my_list = list(range(10))
+    print(f"Initial List    : {my_list}")
+
+    for _ in range(5):
+        moves.apply(my_list)
+        print(f"Move {moves.last_move}   : {my_list}")
+        moves.undo(my_list)
+        print(f"Undone          : {my_list}")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,120 +1,22 @@
 from LatiumIsland import *
-from SimulatedAnnealingSolver import *
-import sys
+from RegionSolver import *
+from EliteArchive import EliteArchive
+from LocalizationIndex import LocalizationIndex, localize_islands
+from ScoreCache import ScoreCache
+from Engines import add_engine_arguments, check_engine_arguments, solve
+import argparse
 
 ###########################################################################################
 #
 #
-class LatiumSolver(SimulatedAnnealingSolver):
+class LatiumSolver(RegionSolver):
     """
     Solver for Latium Islands.
     Find an optimum set of Latium Islands which provides all Latium fertilities
+    the weights, and the rule that a gold ore island is still wanted after the main island, are in regions/latium.toml
     """
-    def __init__(self):
-        # call parent ctor
-        super().__init__()
 
-        # input file
-        self.filename = ''
-
-        # solution tuning factors
-        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
-        self.max_trials = 1000      # max trials per annealing temperature
-        self.temperature = 1000.0    # black art = pick this to be ~150% of a typical score change
-        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
-
-        self.extra_island_reduction_rate = 0.9
-        self.extra_island_penalty = 200
-
-    def set_filename(self, filename: str):
-        # set up a basic array of islands
-        self.filename = filename
-        self.load_islands()
-
-    def load_islands(self):
-        """
-        load island info from a CSV file
-        # todo - read this info from a savegame file rather than a CSV file
-        ideally this function should be replaced to read the island info
-        directly from a save file
-        """
-
-        # ensure list starts empty
-        self.the_list = []
-
-        # walk the input file list
-        with open(self.filename, 'r') as file:
-            for line in file:
-                # Process each line here
-                if line[0] != '#':
-                    island = LatiumIsland.from_string(line.strip())
-                    self.the_list.append(island)
-                    # island.dump()
-
-    # define the virtual score() function
-    def score(self, candidate_list: list) -> float:
-
-        # determine a score for the first N islands, where N is the number of islands required
-        # to provide one of every fertility
-
-        # walk the list until we have gotten all the fertilities
-        # order matters, so reduce the score in subsequent islands by 'extra_island_reduction_rate'
-        # also, we only want the minimum number of islands to cover all fertilities, so
-        # add a penalty for every island beyond the first
-        rv = 0.0
-
-        # set the initial set of covered fertilities
-        covered_fertilities: LatiumFertility = LatiumFertility.all_fertilities()
-
-        island: LatiumIsland
-        for ndx, island in enumerate(candidate_list):
-
-            # get island score
-            rv += (self.extra_island_reduction_rate ** ndx) * island.calculate_score(covered_fertilities)
-            rv -= ndx * self.extra_island_penalty
-
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-
-            # ensure we still want a gold fertility, even if the main island had it - want a non-main island with gold
-            if ndx == 0:
-                covered_fertilities = covered_fertilities.add(LatiumFertility.GOLD_ORE)
-
-            if covered_fertilities == LatiumFertility.no_fertilities():
-                break
-        # print(f"highest index to cover all ferts = {ndx}")
-
-        return rv
-
-    def report(self) -> list:
-        """
-        write results of the solve action to stdout
-
-        :return: list of the islands in the solution
-        """
-        rv = list()
-        covered_fertilities = LatiumFertility.all_fertilities()
-
-        print(f"Islands: [", end = '')
-        island: LatiumIsland
-        for ndx, island in enumerate(self.the_list):
-            rv.append(island)
-            print(f"{island.island_name}", end = '')
-            # removed this island's fertilities from the overall list
-            covered_fertilities = covered_fertilities.remove(island.fertilities)
-
-            # ensure we still want a gold fertility, even if the main island had it - want a non-main island with gold
-            if ndx == 0:
-                covered_fertilities = covered_fertilities.add(LatiumFertility.GOLD_ORE)
-
-            if covered_fertilities == LatiumFertility.no_fertilities():
-                break
-            print(", ", end = '')
-
-        print(f"] (Score = {self.score(self.the_list):.0f})")
-
-        # return a list of the solution islands
-        return rv
+    island_class = LatiumIsland
 
 
 #
@@ -123,17 +25,43 @@ class LatiumSolver(SimulatedAnnealingSolver):
 def main():
 
     # command line
-    #       python LatiumSolver.py inputfile.csv
-    if len(sys.argv) != 2:
-        print("Usage:")
-        print("     python LatiumSolver.py inputfile.csv")
-        exit(-1)
+    #       python LatiumSolver.py inputfile.csv [--top K] [--min-difference D] [--score-cache SIZE] [--pin A,B] [--names INDEX] [--engine E] [--telemetry] [--checkpoint FILE [--resume]]
+    parser = argparse.ArgumentParser(description='Find an optimum set of Latium Islands')
+    parser.add_argument('filename', help='island .csv file')
+    parser.add_argument('--top', type=int, default=0,
+                        help='also report the best K distinct island sets found during the solve')
+    parser.add_argument('--min-difference', type=int, default=1,
+                        help='min number of islands which must differ between any two of the --top island sets')
+    parser.add_argument('--score-cache', type=int, default=0, metavar='SIZE',
+                        help='number of covering-prefix scores to cache, 0 to disable (default 0)')
+    parser.add_argument('--pin', default='', metavar='A,B',
+                        help='comma separated islands already settled, which are kept first, in this order')
+    parser.add_argument('--names', metavar='INDEX',
+                        help='LineId index from LocalizationIndex.py, to show islands named by LineId with their in-game names')
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+    check_engine_arguments(parser, args)
 
     # latium solver
     lat_solver = LatiumSolver()
-    lat_solver.set_filename(sys.argv[1])
+    lat_solver.set_filename(args.filename)
+    if args.names:
+        try:
+            localize_islands(lat_solver.the_list, LocalizationIndex.open(args.names))
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    if args.score_cache > 0:
+        lat_solver.score_cache = ScoreCache(args.score_cache)
+    if args.top > 0:
+        lat_solver.elite_archive = EliteArchive(args.top, args.min_difference)
+    try:
+        lat_solver.pin([name for name in args.pin.split(',') if name])
+    except ValueError as error:
+        parser.error(str(error))
     print('')
     print(f"Region map: [{lat_solver.filename}]")
+    if lat_solver.pinned > 0:
+        print(f"Pinned Islands: [{', '.join(island.island_name for island in lat_solver.the_list[:lat_solver.pinned])}]")
     # score = lat_solver.score(lat_solver.the_list)
     # print(f"Score: [{score}]")
     # lat_solver.report()
@@ -145,10 +73,11 @@ def main():
     lat_solver.report()
 
     # solve for an optimized set
-    lat_solver.solve()
+    solve(lat_solver, args)
     print("Optimized Island Set, Latium Islands:")
     print("            ", end = '')
     lat_solver.report()
+    lat_solver.report_alternatives('Latium')
 
 
     print("Done")
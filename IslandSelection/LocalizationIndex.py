@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+
+import numpy
+
+
+###########################################################################################
+#
+#   LineId -> text index, for showing in-game names
+#
+#   Savegames name islands, sessions and cities by 64-bit LineIds, e.g. an island's CityNameGuid, which the game
+#   translates through its texts_<language>.xml files.  Those files are large, so rather than parse them on every
+#   run they're streamed once into a small index file:
+#       - a header, with the size and modification time of every source file, to tell when it's out of date
+#       - the LineIds, sorted, as an int64 array
+#       - the offset of each text in a utf-8 blob, as an int64 array, one longer than the LineIds
+#       - the utf-8 blob of all the texts
+#   The index file is memory mapped, so opening it is immediate whatever its size, and a batch of LineIds
+#   is resolved with one numpy.searchsorted() call.
+#
+#   python LocalizationIndex.py build names.idx "C:/.../Anno 117/data/config/gui" "C:/.../mods" [--language english]
+#   python LocalizationIndex.py lookup names.idx 2000101000 2000101001
+#
+
+MAGIC = b'LIDX0001'
+HEADER_FORMAT = numpy.dtype([('magic', 'S8'), ('count', '<i8'), ('blob_size', '<i8'), ('manifest_size', '<i8')])
+
+COMMENT_START = b'<!--'
+COMMENT_END = b'-->'
+
+LINE_ID = re.compile(r'^-?\d+$')
+
+
+def texts_files(sources: list, language: str = 'english') -> list:
+    """
+    :param sources: texts files, or directories to search for texts_<language>.xml, e.g. the game's
+        extracted data/config/gui folder followed by the mods folder
+    :return: list of file paths, in the order given, so later files override earlier ones
+    """
+    rv = []
+    filename = f"texts_{language}.xml"
+    for source in sources:
+        if os.path.isdir(source):
+            for dirpath, dirnames, filenames in os.walk(source):
+                dirnames.sort()
+                if filename in filenames:
+                    rv.append(os.path.join(dirpath, filename))
+        else:
+            rv.append(source)
+    return rv
+
+
+def without_comments(file, chunk_size: int = 1 << 20):
+    """
+    read a file in chunks, leaving out comments
+    the game tolerates '--' inside comments, which strict XML parsers don't
+    :param file: file opened in binary mode
+    :return: generator of byte strings
+    """
+    pending = b''
+    in_comment = False
+    while True:
+        chunk = file.read(chunk_size)
+        pending += chunk
+        pieces = []
+        position = 0
+        while position < len(pending):
+            if in_comment:
+                end = pending.find(COMMENT_END, position)
+                if end < 0:
+                    # keep enough to spot a '-->' split across chunks
+                    position = max(position, len(pending) - (len(COMMENT_END) - 1))
+                    break
+                position = end + len(COMMENT_END)
+                in_comment = False
+            else:
+                start = pending.find(COMMENT_START, position)
+                if start < 0:
+                    # hold back anything which could be the start of a '<!--' split across chunks
+                    keep = len(COMMENT_START) - 1 if chunk else 0
+                    if len(pending) - position > keep:
+                        pieces.append(pending[position:len(pending) - keep])
+                        position = len(pending) - keep
+                    break
+                pieces.append(pending[position:start])
+                position = start + len(COMMENT_START)
+                in_comment = True
+        pending = pending[position:]
+        if pieces:
+            yield b''.join(pieces)
+        if not chunk:
+            return
+
+
+def read_texts(filename: str):
+    """
+    stream the <Text><LineId/><Text/></Text> pairs out of a game or mod texts file
+    :return: generator of (LineId, text)
+    """
+    parser = ElementTree.XMLPullParser(events=('end',))
+    with open(filename, 'rb') as file:
+        for data in without_comments(file):
+            parser.feed(data)
+            yield from texts_from_events(parser)
+    parser.close()
+    yield from texts_from_events(parser)
+
+
+def texts_from_events(parser: ElementTree.XMLPullParser):
+    for event, element in parser.read_events():
+        # the outer <Text> holds the <LineId>, the inner one the text itself
+        if element.tag != 'Text':
+            continue
+        line_id = element.find('LineId')
+        if line_id is None or line_id.text is None:
+            continue
+        text = element.find('Text')
+        yield int(line_id.text.strip()), (text.text or '') if text is not None else ''
+        element.clear()
+
+
+def manifest_of(filenames: list) -> list:
+    """
+    :return: [path, size, modification time] of each source file, to tell when an index is out of date
+    """
+    rv = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        rv.append([os.path.abspath(filename), stat.st_size, stat.st_mtime_ns])
+    return rv
+
+
+###########################################################################################
+#
+class LocalizationIndex:
+    """
+    Sorted array index of LineId -> text, memory mapped from an index file
+    """
+
+    def __init__(self, ids: numpy.ndarray, offsets: numpy.ndarray, blob, manifest: list = None):
+        # sorted LineIds
+        self.ids = ids
+
+        # text i is blob[offsets[i]:offsets[i+1]]
+        self.offsets = offsets
+        self.blob = blob
+
+        # [path, size, modification time] of the files the index was built from
+        self.manifest = manifest or []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, line_id: int) -> bool:
+        return self.position(line_id) >= 0
+
+    def position(self, line_id: int) -> int:
+        """
+        :return: index of the LineId in the sorted array, or -1 if it isn't there
+        """
+        i = int(numpy.searchsorted(self.ids, line_id))
+        if i < len(self.ids) and self.ids[i] == line_id:
+            return i
+        return -1
+
+    def text(self, i: int) -> str:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def get(self, line_id: int, default: str = None) -> str:
+        """
+        :return: text of a single LineId, or default if there isn't one
+        """
+        i = self.position(line_id)
+        return self.text(i) if i >= 0 else default
+
+    def lookup(self, line_ids) -> list:
+        """
+        resolve a batch of LineIds with one search
+        :param line_ids: iterable of LineIds
+        :return: list of texts, None for any LineId which isn't in the index
+        """
+        wanted = numpy.asarray(list(line_ids), dtype=numpy.int64)
+        if len(self.ids) == 0:
+            return [None] * len(wanted)
+        positions = numpy.minimum(numpy.searchsorted(self.ids, wanted), len(self.ids) - 1)
+        found = self.ids[positions] == wanted
+        return [self.text(i) if hit else None for i, hit in zip(positions.tolist(), found.tolist())]
+
+    def is_current(self, filenames: list) -> bool:
+        """
+        :return: True if the index was built from exactly these files, unchanged since
+        """
+        return self.manifest == manifest_of(filenames)
+
+    @classmethod
+    def from_texts(cls, filenames: list):
+        """
+        build an index in memory by streaming texts files, where a LineId is in several files the last one wins
+        """
+        ids = []
+        texts = []
+        for filename in filenames:
+            for line_id, text in read_texts(filename):
+                ids.append(line_id)
+                texts.append(text)
+
+        ids = numpy.array(ids, dtype=numpy.int64)
+        order = numpy.argsort(ids, kind='stable')
+        ids = ids[order]
+
+        # of each run of equal LineIds keep the last, i.e. the one from the latest file
+        last = numpy.ones(len(ids), dtype=bool)
+        last[:-1] = ids[:-1] != ids[1:]
+        order = order[last]
+        ids = ids[last]
+
+        encoded = [texts[i].encode('utf-8') for i in order.tolist()]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(text) for text in encoded], out=offsets[1:])
+        blob = numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8)
+        return cls(ids, offsets, blob, manifest_of(filenames))
+
+    def save(self, filename: str):
+        """
+        write the index file, replacing it in one step so a reader never sees half of it
+        """
+        manifest = json.dumps(self.manifest).encode('utf-8')
+        # pad so the arrays start on an 8 byte boundary
+        manifest += b' ' * (-len(manifest) % 8)
+
+        header = numpy.zeros(1, dtype=HEADER_FORMAT)
+        header[0] = (MAGIC, len(self.ids), len(self.blob), len(manifest))
+
+        temp_filename = filename + '.tmp'
+        with open(temp_filename, 'wb') as file:
+            file.write(header.tobytes())
+            file.write(manifest)
+            file.write(numpy.ascontiguousarray(self.ids, dtype='<i8').tobytes())
+            file.write(numpy.ascontiguousarray(self.offsets, dtype='<i8').tobytes())
+            file.write(bytes(self.blob))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, filename)
+
+    @classmethod
+    def load(cls, filename: str):
+        """
+        memory map an index file
+        """
+        header = numpy.fromfile(filename, dtype=HEADER_FORMAT, count=1)
+        if len(header) == 0 or header[0]['magic'] != MAGIC:
+            raise ValueError(f"[{filename}] isn't a LineId index")
+        count = int(header[0]['count'])
+        blob_size = int(header[0]['blob_size'])
+        manifest_size = int(header[0]['manifest_size'])
+
+        with open(filename, 'rb') as file:
+            file.seek(HEADER_FORMAT.itemsize)
+            manifest = json.loads(file.read(manifest_size).decode('utf-8'))
+
+        offset = HEADER_FORMAT.itemsize + manifest_size
+        ids = numpy.memmap(filename, dtype='<i8', mode='r', offset=offset, shape=(count,))
+        offset += ids.nbytes
+        offsets = numpy.memmap(filename, dtype='<i8', mode='r', offset=offset, shape=(count + 1,))
+        offset += offsets.nbytes
+        blob = numpy.memmap(filename, dtype=numpy.uint8, mode='r', offset=offset, shape=(blob_size,)) \
+            if blob_size > 0 else numpy.zeros(0, dtype=numpy.uint8)
+        return cls(ids, offsets, blob, manifest)
+
+    @classmethod
+    def open(cls, filename: str, sources: list = (), language: str = 'english'):
+        """
+        load an index file, first building or rebuilding it if any source has changed
+        :param sources: texts files or directories, see texts_files(), or empty to just load the index as it is
+        """
+        filenames = texts_files(sources, language)
+        if os.path.exists(filename):
+            index = cls.load(filename)
+            if not filenames or index.is_current(filenames):
+                return index
+        if not filenames:
+            raise FileNotFoundError(f"no LineId index [{filename}], and no texts files to build it from")
+        index = cls.from_texts(filenames)
+        index.save(filename)
+        return cls.load(filename)
+
+
+def localize_islands(islands: list, index: LocalizationIndex) -> int:
+    """
+    replace island names which are LineIds, e.g. a CityNameGuid read from a savegame, with the in-game name
+    names which don't resolve, or would clash with another island's name, are left alone
+    :return: number of islands renamed
+    """
+    numeric = [island for island in islands if LINE_ID.match(island.island_name)]
+    texts = index.lookup(int(island.island_name) for island in numeric)
+
+    taken = {island.island_name for island in islands}
+    rv = 0
+    for island, text in zip(numeric, texts):
+        if text and text not in taken:
+            taken.add(text)
+            island.island_name = text
+            rv += 1
+    return rv
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python LocalizationIndex.py build INDEX SOURCE [SOURCE ...] [--language L]
+    #       python LocalizationIndex.py lookup INDEX LINEID [LINEID ...]
+    parser = argparse.ArgumentParser(description='Build or query a LineId -> text index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='stream texts files into an index file')
+    build_parser.add_argument('index', help='index file to write')
+    build_parser.add_argument('sources', nargs='+',
+                              help='texts files, or directories to search for texts_<language>.xml, later ones override earlier ones')
+    build_parser.add_argument('--language', default='english', help='which texts files to use (default english)')
+
+    lookup_parser = subparsers.add_parser('lookup', help='show the texts of some LineIds')
+    lookup_parser.add_argument('index', help='index file')
+    lookup_parser.add_argument('line_ids', nargs='+', type=int, metavar='LINEID')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'build':
+            start = time.perf_counter()
+            filenames = texts_files(args.sources, args.language)
+            if not filenames:
+                parser.error(f"no texts_{args.language}.xml files found")
+            index = LocalizationIndex.from_texts(filenames)
+            index.save(args.index)
+            elapsed = time.perf_counter() - start
+            print(f"Indexed {len(index)} LineIds from {len(filenames)} files in {elapsed:.2f}s: [{args.index}]")
+
+        else:
+            index = LocalizationIndex.load(args.index)
+            for line_id, text in zip(args.line_ids, index.lookup(args.line_ids)):
+                print(f"{line_id}: {text if text is not None else '(not found)'}")
+
+    except (OSError, ValueError, ElementTree.ParseError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import glob
+import os
+import numpy
+
+
+###########################################################################################
+#
+#   Synthetic island map generator, for testing the solvers on maps much larger than the real ones
+#
+#   The statistics of the generated maps are fitted to the bundled corners_* and archipelago_* .csv files:
+#       - island size mix
+#       - for each island size, the rate at which each fertility appears
+#       - for each island size, the joint distribution of the two slot counts (mountains and rivers/marshes),
+#         sampled from the real islands of that size, so the two stay correlated
+#   Every fertility is guaranteed to appear at least once, so the generated map can always be fully covered.
+#
+#   Output is the same .csv format as the bundled maps, optionally with X,Y map coordinates as two extra columns,
+#   which the island parsers ignore.
+#
+
+# regions, and the glob pattern of the bundled maps for each
+REGIONS = {
+    'latium': '*_seed*_latium.csv',
+    'albion': '*_seed*_albion.csv',
+}
+
+# sizes with fewer real islands than this use the fertility rates of all sizes combined
+MIN_SIZE_SAMPLES = 5
+
+
+class MapModel:
+    """
+    Island statistics for one region, fitted to a set of real maps
+    """
+
+    def __init__(self, header: list):
+        # .csv header fields: Name, fertilities..., slot count 1, slot count 2, Size
+        self.header = header
+        self.num_fertilities = len(header) - 4
+
+        # island size -> fraction of islands
+        self.size_rates = {}
+
+        # island size -> per-fertility rates, numpy array
+        self.fertility_rates = {}
+
+        # island size -> list of observed (slot count 1, slot count 2)
+        self.slots = {}
+
+    @classmethod
+    def fit(cls, filenames: list):
+        """
+        fit a model to a list of real island .csv files, all from the same region
+        """
+        header = None
+        rows = []
+        for filename in filenames:
+            with open(filename, 'r') as file:
+                for line in file:
+                    fields = line.strip().split(',')
+                    if line[0] == '#':
+                        header = header or fields
+                    elif len(fields) >= 4:
+                        rows.append(fields)
+        if header is None or not rows:
+            raise ValueError(f"no islands found in {filenames}")
+
+        model = cls(header)
+        n = model.num_fertilities
+        sizes = [row[n + 3] for row in rows]
+        fertilities = numpy.array([[field != '' for field in row[1:n + 1]] for row in rows], dtype=float)
+        all_rates = fertilities.mean(axis=0)
+
+        for size in sorted(set(sizes)):
+            members = [ndx for ndx, row_size in enumerate(sizes) if row_size == size]
+            model.size_rates[size] = len(members) / len(rows)
+            if len(members) >= MIN_SIZE_SAMPLES:
+                model.fertility_rates[size] = fertilities[members].mean(axis=0)
+            else:
+                model.fertility_rates[size] = all_rates
+            model.slots[size] = [(int(rows[ndx][n + 1]), int(rows[ndx][n + 2])) for ndx in members]
+
+        return model
+
+    def generate(self, num_islands: int, rng: numpy.random.Generator,
+                 coordinates: bool = False, map_size: float = 0.0) -> list:
+        """
+        :param num_islands: number of islands
+        :param rng: random number generator
+        :param coordinates: add X,Y columns
+        :param map_size: width and height of the map, for the coordinates, default scales with the number of islands
+        :return: list of .csv lines, header first
+        """
+        size_names = list(self.size_rates.keys())
+        size_probabilities = numpy.array([self.size_rates[size] for size in size_names])
+        sizes = rng.choice(size_names, size=num_islands, p=size_probabilities / size_probabilities.sum())
+
+        has_fertility = numpy.zeros((num_islands, self.num_fertilities), dtype=bool)
+        for ndx, size in enumerate(sizes):
+            has_fertility[ndx] = rng.random(self.num_fertilities) < self.fertility_rates[size]
+
+        # make sure every fertility can be covered
+        for f in range(self.num_fertilities):
+            if not has_fertility[:, f].any():
+                has_fertility[rng.integers(num_islands), f] = True
+
+        if map_size <= 0.0:
+            map_size = 2000.0 * numpy.sqrt(num_islands / 16.0)
+
+        header = self.header + (['X', 'Y'] if coordinates else [])
+        rv = [','.join(header)]
+        for ndx, size in enumerate(sizes):
+            slot_1, slot_2 = self.slots[size][rng.integers(len(self.slots[size]))]
+            fields = [f"G{ndx:04d}"]
+            fields += ['1' if has else '' for has in has_fertility[ndx]]
+            fields += [str(slot_1), str(slot_2), str(size)]
+            if coordinates:
+                x, y = rng.random(2) * map_size
+                fields += [f"{x:.0f}", f"{y:.0f}"]
+            rv.append(','.join(fields))
+
+        return rv
+
+
+def fit_region(region: str, directory: str = None) -> MapModel:
+    """
+    fit a model to the bundled maps for a region
+    """
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+    filenames = sorted(glob.glob(os.path.join(directory, REGIONS[region])))
+    return MapModel.fit(filenames)
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python MapGenerator.py latium 200 [--seed N] [--coordinates] [--output FILE]
+    parser = argparse.ArgumentParser(description='Generate a synthetic island map, fitted to the bundled maps')
+    parser.add_argument('region', choices=list(REGIONS.keys()))
+    parser.add_argument('num_islands', type=int)
+    parser.add_argument('--seed', type=int, default=None, help='random seed, for a repeatable map')
+    parser.add_argument('--coordinates', action='store_true', help='add X,Y map coordinates to each island')
+    parser.add_argument('--output', metavar='FILE', help='output .csv file (default: stdout)')
+    args = parser.parse_args()
+
+    model = fit_region(args.region)
+    lines = model.generate(args.num_islands, numpy.random.default_rng(args.seed), args.coordinates)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+    else:
+        print('\n'.join(lines))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import math
+import multiprocessing
+import os
+
+from SearchEngine import SearchEngine
+from SelectionProblem import SelectionProblem, SimpleArraySolver
+from SimulatedAnnealingSolver import SimulatedAnnealingSolver
+
+
+###########################################################################################
+#
+#   worker process side of the replica exchange
+#
+#   each worker gets its own copy of the problem once, when the pool starts, and from then on
+#   replicas are passed back and forth as lists of indices into the problem's original list
+#
+
+# annealing engine for the problem being solved, one copy per worker process
+_worker_engine = None
+
+# map of id(list member) -> index in the problem's original list
+_worker_index = None
+
+
+def _init_worker(problem: SelectionProblem):
+    global _worker_engine, _worker_index
+    _worker_engine = SimulatedAnnealingSolver(problem)
+    _worker_engine.start()
+    _worker_index = {id(item): ndx for ndx, item in enumerate(problem.the_list)}
+
+
+def _run_replica(task: tuple) -> tuple:
+    """
+    run one replica for a fixed number of trials at its own temperature
+    each replica has its own random number stream, which travels with it, so a replica's moves don't depend
+    on which worker process happens to run it
+    :param task: tuple of (list of indices, score, temperature, trials, the replica's RandomStream)
+    :return: tuple of (list of indices, score, number of accepted trials, the replica's RandomStream,
+             number of trials actually scored, i.e. not ruled out by the bound)
+    """
+    indices, current_score, temperature, trials, rng = task
+    _worker_engine.rng = rng
+    _worker_engine.moves.rng = rng
+
+    base_list = _worker_engine.problem.the_list
+    candidate_list = [base_list[ndx] for ndx in indices]
+    evaluations = _worker_engine.evaluations
+    candidate_list, current_score, accepted = _worker_engine.metropolis(candidate_list, current_score,
+                                                                        temperature, trials)
+
+    return ([_worker_index[id(item)] for item in candidate_list], current_score, accepted, rng,
+            _worker_engine.evaluations - evaluations)
+
+
+###########################################################################################
+#
+#   Parallel Tempering (replica exchange) solver
+#
+class ParallelTemperingSolver(SearchEngine):
+    """
+    Parallel Tempering search engine, an alternative to plain simulated annealing.
+    Uses the score() function and move generator of any SelectionProblem.
+        - run several replicas of the problem, each at a fixed temperature on a ladder from hot to cold
+        - replicas run in parallel, across worker processes
+        - every 'sweep_trials' trials, attempt to swap states between neighboring replicas,
+          with probability P = exp((S_hot - S_cold) * (1/T_cold - 1/T_hot))
+        - good states found by the hot replicas drift down the ladder towards the cold replicas,
+          while the hot replicas keep exploring, so the search doesn't get stuck in one local maxima
+    By default the total number of trials matches the annealing budget of the problem, i.e. max_anneals * max_trials,
+    spread across all replicas.
+    """
+
+    name = 'tempering'
+
+    def __init__(self, problem: SelectionProblem, num_replicas: int = 4, num_processes: int = None):
+        super().__init__(problem)
+        self.num_replicas = max(num_replicas, 2)
+        self.num_processes = num_processes if num_processes else min(self.num_replicas, os.cpu_count())
+
+        # temperature ladder, coldest first, geometric between the final and initial annealing temperatures
+        max_temperature = problem.temperature
+        min_temperature = problem.temperature * (problem.cooling_rate ** problem.max_anneals)
+        ratio = (max_temperature / min_temperature) ** (1.0 / (self.num_replicas - 1))
+        self.temperatures = [min_temperature * (ratio ** ndx) for ndx in range(self.num_replicas)]
+
+        # trials per replica between exchange attempts, and number of exchange attempts
+        self.sweep_trials = 250
+        self.max_exchanges = max(self.max_evaluations // (self.num_replicas * self.sweep_trials), 1)
+
+        # swap statistics for each neighboring pair of replicas, [ndx] = pair (ndx, ndx+1)
+        self.swap_attempts = [0] * (self.num_replicas - 1)
+        self.swap_accepts = [0] * (self.num_replicas - 1)
+
+    def solve(self) -> list:
+        """
+        Parallel Tempering basic algorithm
+            - start every replica from the problem's initial list
+            -   exchange_counter loop
+            -       each replica runs 'sweep_trials' trials at its own temperature, in parallel
+            -       attempt swaps between neighboring replicas, alternating even and odd pairs
+        :return: optimized list, which is also stored back into the problem's the_list
+        """
+        problem = self.problem
+        base_list = problem.the_list
+        self.start()
+        self.swap_attempts = [0] * (self.num_replicas - 1)
+        self.swap_accepts = [0] * (self.num_replicas - 1)
+
+        initial_score = problem.score(base_list)
+        self.evaluations += 1
+        replicas = [(list(range(len(base_list))), initial_score) for _ in range(self.num_replicas)]
+        self.record(base_list, initial_score)
+
+        # one independent stream per replica, derived from the problem's, which is kept for the swaps
+        rng = problem.rng
+        streams = rng.spawn(self.num_replicas)
+
+        pool = None
+        if self.num_processes > 1:
+            pool = multiprocessing.Pool(self.num_processes, initializer=_init_worker, initargs=(problem,))
+        else:
+            _init_worker(problem)
+
+        try:
+            for exchange_counter in range(self.max_exchanges):
+
+                # run every replica at its own temperature
+                # the streams stay with their temperature rung, the states are what get swapped
+                tasks = [(indices, score, self.temperatures[ndx], self.sweep_trials, streams[ndx])
+                         for ndx, (indices, score) in enumerate(replicas)]
+                if pool is not None:
+                    results = pool.map(_run_replica, tasks)
+                else:
+                    results = [_run_replica(task) for task in tasks]
+                replicas = [(indices, score) for indices, score, accepted, stream, scored in results]
+                streams = [stream for indices, score, accepted, stream, scored in results]
+                self.evaluations += sum(scored for indices, score, accepted, stream, scored in results)
+
+                for indices, score in replicas:
+                    if score > self.best_score or problem.elite_archive is not None:
+                        self.record([base_list[ndx] for ndx in indices], score)
+                self.report_progress()
+
+                # attempt swaps between neighbors, alternating even and odd pairs so every pair gets a turn
+                for ndx in range(exchange_counter % 2, self.num_replicas - 1, 2):
+                    cold_score = replicas[ndx][1]
+                    hot_score = replicas[ndx + 1][1]
+                    delta = (hot_score - cold_score) * (1.0 / self.temperatures[ndx] - 1.0 / self.temperatures[ndx + 1])
+
+                    self.swap_attempts[ndx] += 1
+                    if delta >= 0.0 or rng.random() < math.exp(delta):
+                        self.swap_accepts[ndx] += 1
+                        replicas[ndx], replicas[ndx + 1] = replicas[ndx + 1], replicas[ndx]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return self.finish()
+
+    def telemetry(self) -> dict:
+        rv = super().telemetry()
+        rv['swap_acceptance_rates'] = self.swap_acceptance_rates()
+        return rv
+
+    def swap_acceptance_rates(self) -> list:
+        """
+        :return: fraction of accepted swaps for each neighboring pair of replicas, coldest pair first
+        """
+        return [accepts / attempts if attempts else 0.0
+                for accepts, attempts in zip(self.swap_accepts, self.swap_attempts)]
+
+    def report_telemetry(self):
+        """
+        write statistics from the most recent solve, including swap statistics, to stdout
+        swap rates near 0 mean the ladder rungs are too far apart, rates near 1 mean replicas are being wasted
+        """
+        super().report_telemetry()
+        print(f"        Replica exchanges ({self.num_replicas} replicas, {self.max_exchanges} rounds):")
+        for ndx, rate in enumerate(self.swap_acceptance_rates()):
+            print(f"            T [{self.temperatures[ndx]:10.3f}] <-> [{self.temperatures[ndx + 1]:10.3f}]: "
+                  f"{rate:6.1%} of {self.swap_attempts[ndx]} swaps accepted")
+
+
+###########################################################################################
+#
+#
+def main():
+
+    simple_solver = SimpleArraySolver()
+    my_list = simple_solver.the_list
+    print(f"Initial List   [{len(my_list)}]    : {my_list}")
+
+    tempering = ParallelTemperingSolver(simple_solver, num_replicas=4)
+    my_list = tempering.solve()
+    print(f"Final List     [{len(my_list)}]    : {my_list}")
+    tempering.report_telemetry()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
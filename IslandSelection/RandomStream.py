@@ -0,0 +1,113 @@
+import json
+import zlib
+
+import numpy
+
+
+###########################################################################################
+#
+#   Buffered random number stream
+#
+class RandomStream:
+    """
+    A solver's own source of random numbers, in place of the global numpy.random functions
+        - each stream has its own numpy Generator, so a seeded solve is repeatable, and solves running side by side
+          don't share, or disturb, one another's sequence
+        - the search engines take a few random numbers per trial, one at a time, and every numpy.random call
+          pays numpy's dispatch overhead for a single value.  Instead, uniform values are drawn 'block_size' at a time
+          in one vectorized call, and handed out one by one from the buffer
+        - integers are made from the same uniform values, so there is only one buffer to keep track of
+        - spawn() makes independent child streams, e.g. one per tempering replica, with numpy's SeedSequence
+    """
+
+    def __init__(self, seed=None, key: str = '', block_size: int = 4096):
+        """
+        :param seed: int, numpy SeedSequence, or None for a fresh unpredictable seed
+        :param key: name of a sub-stream, e.g. a solve phase, so one seed gives each phase its own stream
+        :param block_size: number of values drawn at a time
+        """
+        if isinstance(seed, numpy.random.SeedSequence):
+            seed_sequence = seed
+        else:
+            spawn_key = (zlib.crc32(key.encode('utf-8')),) if key else ()
+            seed_sequence = numpy.random.SeedSequence(seed, spawn_key=spawn_key)
+
+        self.seed_sequence = seed_sequence
+        self.generator = numpy.random.Generator(numpy.random.PCG64(seed_sequence))
+        self.block_size = block_size
+
+        # uniform values in [0, 1), as a python list so handing them out is cheap, and the next one to hand out
+        self.buffer = []
+        self.position = 0
+
+    def refill(self):
+        self.buffer = self.generator.random(self.block_size).tolist()
+        self.position = 0
+
+    def random(self) -> float:
+        """
+        :return: uniform float in [0, 1)
+        """
+        if self.position >= len(self.buffer):
+            self.refill()
+        rv = self.buffer[self.position]
+        self.position += 1
+        return rv
+
+    def integers(self, low: int, high: int) -> int:
+        """
+        :return: uniform int in [low, high)
+        """
+        return low + int(self.random() * (high - low))
+
+    def spawn(self, count: int) -> list:
+        """
+        :return: list of independent child streams
+        """
+        return [RandomStream(child, block_size=self.block_size) for child in self.seed_sequence.spawn(count)]
+
+    def get_state(self) -> dict:
+        """
+        :return: everything needed to carry on exactly where this stream is, see set_state()
+        """
+        return {
+            'generator': json.dumps(self.generator.bit_generator.state),
+            'buffer': numpy.array(self.buffer, dtype=numpy.float64),
+            'position': self.position,
+        }
+
+    def set_state(self, state: dict):
+        self.generator.bit_generator.state = json.loads(str(state['generator']))
+        self.buffer = numpy.asarray(state['buffer'], dtype=numpy.float64).tolist()
+        self.position = int(state['position'])
+
+
+###########################################################################################
+#
+#
+def main():
+
+    stream = RandomStream(1234)
+    print(f"Floats          : {[round(stream.random(), 4) for _ in range(5)]}")
+    print(f"Ints [0, 10)    : {[stream.integers(0, 10) for _ in range(10)]}")
+
+    # the same seed gives the same sequence
+    again = RandomStream(1234)
+    print(f"Repeatable      : {[round(again.random(), 4) for _ in range(5)]}")
+
+    # child streams are independent of one another, and of the parent
+    children = stream.spawn(3)
+    for ndx, child in enumerate(children):
+        print(f"Child {ndx}         : {[child.integers(0, 100) for _ in range(5)]}")
+
+    # state round trip
+    state = stream.get_state()
+    first = [stream.random() for _ in range(3)]
+    stream.set_state(state)
+    print(f"Restored        : {first == [stream.random() for _ in range(3)]}")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
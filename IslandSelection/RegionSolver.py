@@ -0,0 +1,158 @@
+from RegionSpec import RegionSpec
+from SelectionProblem import *
+from CoverageBound import CoverageBound
+from CoverageMoves import CoverageMoves
+from Dominance import find_dominated, explain
+
+
+###########################################################################################
+#
+#
+class RegionSolver(SelectionProblem):
+    """
+    Solver for the islands of one region.
+    Find an optimum set of islands which provides all of the targeted fertilities
+    everything region specific comes from the island class's RegionSpec, so every region shares the same
+    scoring kernel, moves and bound.  Child classes set 'island_class'
+    """
+
+    island_class = None
+
+    def __init__(self):
+        # call parent ctor
+        super().__init__()
+
+        # input file
+        self.filename = ''
+
+        self.region: RegionSpec = self.island_class.region
+
+        # island slot counts, for the dominance test
+        self.slot_attributes = self.region.slot_attributes
+
+        # use this to target a subset of the fertilities in the solution, e.g. one population's
+        self.starting_fertilities = self.region.fertility_type(self.region.all_fertilities)
+
+        # solution tuning factors
+        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
+        self.max_trials = 1000      # max trials per annealing temperature
+        self.temperature = 1000.0    # black art = pick this to be ~150% of a typical score change
+        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
+
+        self.extra_island_reduction_rate = self.region.reduction_rate
+        self.extra_island_penalty = self.region.penalty
+
+    def set_filename(self, filename: str):
+        # set up a basic array of islands
+        self.filename = filename
+        self.load_islands()
+
+    def load_islands(self):
+        """
+        load island info from a CSV file
+        """
+
+        # ensure list starts empty
+        self.the_list = []
+
+        # walk the input file list
+        with open(self.filename, 'r') as file:
+            for line in file:
+                # Process each line here
+                if line[0] != '#':
+                    island = self.island_class.from_string(line.strip())
+                    self.the_list.append(island)
+
+    def set_coverage(self, starting_fertilities: int):
+        self.starting_fertilities = starting_fertilities
+
+    # define the virtual score() function
+    def score(self, candidate_list: list) -> float:
+
+        # orderings which share a covering prefix score the same, so check the cache first
+        if self.score_cache is not None:
+            key = self.cache_key(candidate_list)
+            rv = self.score_cache.get(key)
+            if rv is not None:
+                return rv
+
+        rv = self.region.score(candidate_list, self.starting_fertilities,
+                               self.extra_island_reduction_rate, self.extra_island_penalty)
+
+        if self.score_cache is not None:
+            self.score_cache.put(key, rv)
+        return rv
+
+    def item_key(self, island) -> str:
+        return island.island_name
+
+    def cache_key(self, candidate_list: list) -> tuple:
+        """
+        the score also depends on which fertilities are targeted
+        """
+        return (int(self.starting_fertilities),) + tuple(candidate_list[:self.prefix_length(candidate_list)])
+
+    def prefix_length(self, candidate_list: list) -> int:
+        """
+        number of islands, from the start of the list, needed to cover every targeted fertility
+        """
+        return self.region.prefix_length(candidate_list, self.starting_fertilities)
+
+    def readd_after_first(self) -> int:
+        """
+        targeted fertilities which are wanted again after the first island, even if it had them
+        """
+        return self.region.readd_after_first & int(self.starting_fertilities)
+
+    def dominated_items(self) -> list:
+        """
+        islands which some other island beats on every wanted fertility, slot count and size
+        :return: list of (island, reason) tuples
+        """
+        return [(island, explain(island, dominator, self.slot_attributes))
+                for island, dominator in find_dominated(self.the_list, self.starting_fertilities, self.slot_attributes)]
+
+    def make_moves(self) -> CoverageMoves:
+        """
+        moves which concentrate on the islands in the covering prefix
+        """
+        return CoverageMoves(self.the_list, self.starting_fertilities,
+                             readd_after_first=self.readd_after_first(), rng=self.rng)
+
+    def make_bound(self) -> CoverageBound:
+        """
+        upper bound on score(), from each island's score if all of its fertilities were still wanted
+        """
+        needed = self.starting_fertilities
+        max_scores = [island.calculate_score(needed) for island in self.the_list]
+        return CoverageBound(self.the_list, max_scores, needed,
+                             self.extra_island_reduction_rate, self.extra_island_penalty,
+                             readd_after_first=self.readd_after_first())
+
+    def report(self, candidate_list: list = None) -> list:
+        """
+        write results of the solve action to stdout
+
+        :param candidate_list: list to be reported, defaults to the current solution
+        :return: list of the islands in the solution
+        """
+        if candidate_list is None:
+            candidate_list = self.the_list
+
+        rv = candidate_list[:self.prefix_length(candidate_list)]
+        print(f"Islands: [{', '.join(island.island_name for island in rv)}] (Score = {self.score(candidate_list):.0f})")
+
+        # return a list of the solution islands
+        return rv
+
+    def report_alternatives(self, label: str):
+        """
+        write the contents of the elite archive, if there is one, to stdout
+        """
+        if self.elite_archive is None:
+            return
+
+        print(f"        {label} alternatives:")
+        for rank, (score, solution) in enumerate(self.elite_archive.solutions()):
+            print(f"        [{rank+1}] ", end = '')
+            self.report(solution)
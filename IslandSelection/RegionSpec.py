@@ -0,0 +1,351 @@
+import functools
+import os
+import tomllib
+from enum import IntFlag, IntEnum, auto
+
+import numpy
+
+
+###########################################################################################
+#
+#
+class IslandSize(IntEnum):
+    """
+    enum for island sizes
+    """
+    EXTRALARGE = auto()
+    LARGE = auto()
+    MEDIUM = auto()
+    SMALL = auto()
+
+
+# .csv size codes, anything else is read as SMALL
+SIZE_CODES = {
+    'XL': IslandSize.EXTRALARGE,
+    'L': IslandSize.LARGE,
+    'M': IslandSize.MEDIUM,
+    'S': IslandSize.SMALL,
+}
+
+# region spec files, regions/<name>.toml
+REGION_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regions')
+
+
+###########################################################################################
+#
+#   Declarative region definition, compiled into flat arrays and one scoring kernel
+#
+class RegionSpec:
+    """
+    Everything about how the islands of one region are read and scored, from a regions/<name>.toml file
+        - the fertilities, in .csv column order, each with its weight, and optionally the kind of slot its weight
+          is scaled by, e.g. sturgeon by river slots, since the weight assumes 'scale_base' slots
+        - the slot counts, in .csv column order, with the island attribute each is kept in and its weight per slot
+        - the weight for each island size
+        - fertilities still wanted after the first (main) island, even if it had them
+        - named coverages, i.e. subsets of the fertilities a solve can target, e.g. one population's
+        - the extra island reduction rate and penalty
+
+    The spec is compiled into flat numpy arrays, indexed by fertility bit position.  Each island is compiled once
+    against those into a row of (fertility bitmask, score for slots and size, ((bit, weight) for each fertility
+    the island has)), with the slot scaling already applied, so score() is the same short loop of integer bit tests
+    and additions for every region, with no per-region special cases
+    """
+
+    def __init__(self, spec: dict, fertility_type: type = None):
+        """
+        :param spec: parsed .toml file
+        :param fertility_type: IntFlag enum of the fertilities, which must match the spec's names and order,
+            or None to make one from the spec
+        """
+        self.name = spec.get('name', '')
+        try:
+            fertilities = spec['fertilities']
+            slots = spec['slots']
+            sizes = spec['sizes']
+            self.reduction_rate = float(spec['extra_island_reduction_rate'])
+            self.penalty = float(spec['extra_island_penalty'])
+            self.scale_base = float(spec.get('scale_base', 10))
+
+            self.fertility_names = [fertility['name'] for fertility in fertilities]
+            self.fertility_columns = [fertility['column'] for fertility in fertilities]
+            self.slot_attributes = tuple(slot['attribute'] for slot in slots)
+            self.slot_columns = [slot['column'] for slot in slots]
+
+            # flat arrays, indexed by fertility bit position
+            self.bits = [1 << ndx for ndx in range(len(fertilities))]
+            self.bit_array = numpy.array(self.bits, dtype=numpy.int64)
+            self.weights = numpy.array([fertility['weight'] for fertility in fertilities], dtype=numpy.float64)
+            self.slot_weights = numpy.array([slot['weight'] for slot in slots], dtype=numpy.float64)
+        except KeyError as error:
+            raise ValueError(f"region spec [{self.name}] is missing {error}")
+
+        # index of the slot count each weight is scaled by, with len(slots) for weights which aren't scaled
+        self.scale_slot = numpy.full(len(fertilities), len(slots), dtype=numpy.int64)
+        for ndx, fertility in enumerate(fertilities):
+            if 'scale_by' in fertility:
+                if fertility['scale_by'] not in self.slot_attributes:
+                    raise ValueError(f"region spec [{self.name}]: {fertility['name']} is scaled by [{fertility['scale_by']}], "
+                                     f"expected one of {list(self.slot_attributes)}")
+                self.scale_slot[ndx] = self.slot_attributes.index(fertility['scale_by'])
+        self.scaled = self.scale_slot < len(slots)
+
+        unknown = set(sizes) - set(SIZE_CODES)
+        if unknown or len(sizes) != len(SIZE_CODES):
+            raise ValueError(f"region spec [{self.name}] needs a weight for each size {list(SIZE_CODES)}")
+        self.size_weights = {SIZE_CODES[code]: float(weight) for code, weight in sizes.items()}
+
+        self.all_fertilities = sum(self.bits)
+        self.readd_after_first = self.mask(spec.get('wanted_after_first', []))
+        self.coverage = {'all': self.all_fertilities}
+        for coverage, names in spec.get('coverage', {}).items():
+            self.coverage[coverage] = self.mask(names)
+
+        if fertility_type is None:
+            fertility_type = IntFlag(f"{self.name.capitalize()}Fertility", self.fertility_names)
+        elif [f.name for f in fertility_type if f.value != 0] != self.fertility_names:
+            raise ValueError(f"region spec [{self.name}] fertilities don't match {fertility_type.__name__}")
+        self.fertility_type = fertility_type
+
+    @classmethod
+    def load(cls, filename: str, fertility_type: type = None) -> 'RegionSpec':
+        with open(filename, 'rb') as file:
+            return cls(tomllib.load(file), fertility_type)
+
+    def mask(self, names: list) -> int:
+        """
+        :return: bitmask of the named fertilities
+        """
+        rv = 0
+        for name in names:
+            if name not in self.fertility_names:
+                raise ValueError(f"region spec [{self.name}] has no fertility [{name}]")
+            rv |= self.bits[self.fertility_names.index(name)]
+        return rv
+
+    def columns(self) -> list:
+        """
+        :return: .csv columns after the name, in order
+        """
+        return self.fertility_columns + self.slot_columns + ['Size']
+
+    def header(self) -> str:
+        return '#Name,' + ','.join(self.columns())
+
+    def compile_island(self, fertilities: int, slots: tuple, island_size: IslandSize) -> tuple:
+        """
+        :param fertilities: the island's fertility bitmask
+        :param slots: the island's slot counts, in the order of slot_attributes
+        :param island_size: the island's size
+        :return: (fertility bitmask, slot and size score, tuple of (bit, weight) for each of the island's fertilities)
+        """
+        slots = numpy.append(numpy.array(slots, dtype=numpy.float64), self.scale_base)
+        weights = numpy.where(self.scaled, self.weights * slots[self.scale_slot] / self.scale_base, self.weights)
+        has = [fertilities & bit != 0 for bit in self.bits]
+
+        base = float(self.slot_weights @ slots[:-1]) + self.size_weights[island_size]
+        terms = tuple(zip(self.bit_array[has].tolist(), weights[has].tolist()))
+        return int(fertilities), base, terms
+
+    def island_score(self, island, needed: int) -> float:
+        """
+        :param island: a compiled island, see RegionIsland
+        :param needed: bitmask of the fertilities still wanted, the island's other fertilities don't count
+        :return: the island's score
+        """
+        mask, base, terms = island.compiled
+        rv = 0.0
+        for bit, weight in terms:
+            if needed & bit:
+                rv += weight
+        return rv + base
+
+    def score(self, candidate_list: list, needed: int, reduction_rate: float, penalty: float) -> float:
+        """
+        the scoring kernel, shared by every region
+        score the first N islands, where N is the number of islands required to provide one of every needed fertility
+            - order matters, so each island's score is reduced by reduction_rate ** ndx
+            - only the minimum number of islands is wanted, so there is a penalty for every island beyond the first
+            - each island only scores for the fertilities which haven't been covered by a previous island
+        :param candidate_list: list of compiled islands
+        :param needed: bitmask of the fertilities to cover
+        :return: score
+        """
+        rv = 0.0
+        needed = int(needed)
+        readd_after_first = self.readd_after_first & needed
+        for ndx, island in enumerate(candidate_list):
+            mask, base, terms = island.compiled
+            island_score = 0.0
+            for bit, weight in terms:
+                if needed & bit:
+                    island_score += weight
+            rv += (reduction_rate ** ndx) * (island_score + base)
+            rv -= ndx * penalty
+
+            needed &= ~mask
+            if ndx == 0:
+                needed |= readd_after_first
+            if needed == 0:
+                break
+
+        return rv
+
+    def prefix_length(self, candidate_list: list, needed: int) -> int:
+        """
+        :return: number of islands, from the start of the list, needed to cover every needed fertility
+        """
+        needed = int(needed)
+        readd_after_first = self.readd_after_first & needed
+        for ndx, island in enumerate(candidate_list):
+            needed &= ~island.compiled[0]
+            if ndx == 0:
+                needed |= readd_after_first
+            if needed == 0:
+                return ndx + 1
+
+        return len(candidate_list)
+
+
+@functools.cache
+def load_region(name: str, fertility_type: type = None) -> RegionSpec:
+    """
+    :return: the compiled spec from regions/<name>.toml
+    """
+    return RegionSpec.load(os.path.join(REGION_DIRECTORY, f"{name}.toml"), fertility_type)
+
+
+###########################################################################################
+#
+#
+class RegionIsland:
+    """
+    An island, read and scored according to its region's spec
+    child classes set 'region', and take each of the region's slot attributes as a ctor argument
+    """
+
+    region: RegionSpec = None
+
+    def __init__(self, island_name: str, fert_values: int, island_size: IslandSize, **slots):
+        self.island_name = island_name
+        self.fertilities = fert_values
+        for attribute, count in slots.items():
+            setattr(self, attribute, count)
+        self.island_size = island_size
+
+        # score row, see RegionSpec.compile_island(), kept up to date by the functions which change the island
+        self.compiled = None
+        self.compile()
+
+    @classmethod
+    def from_string(cls, island_string: str):
+        """
+        provides functionality similar to C++ overloaded ctor
+        allows contruction of an island from a string value taken from a .csv island file, with the columns
+        given by the region's header(), i.e.
+            0       Name
+            1-N     Fertilities, boolean [''|'1']
+            then    number of each kind of slot
+            then    Island size, ['XL'|'L'|'M'|'S']
+        any later columns are ignored
+        """
+        region = cls.region
+        fields = island_string.strip().split(',')
+        island_name = fields[0]
+
+        fertilities = 0
+        for ndx, bit in enumerate(region.bits):
+            if fields[ndx + 1] != '':
+                fertilities |= bit
+
+        offset = len(region.bits) + 1
+        slots = {attribute: int(fields[offset + ndx]) for ndx, attribute in enumerate(region.slot_attributes)}
+        size = SIZE_CODES.get(fields[offset + len(region.slot_attributes)], IslandSize.SMALL)
+
+        return cls(island_name, region.fertility_type(fertilities), island_size=size, **slots)
+
+    def compile(self):
+        slots = tuple(getattr(self, attribute) for attribute in self.region.slot_attributes)
+        self.compiled = self.region.compile_island(int(self.fertilities), slots, self.island_size)
+
+    def calculate_score(self, include_fertilities: int) -> float:
+        """
+        determine score based purely on this island's fertilities, slots and size,
+        and the associated weighting values from the region spec
+        :param include_fertilities: only these fertilities count, i.e. the ones not already on a previous island
+        :return:
+        score
+        """
+        return self.region.island_score(self, include_fertilities)
+
+    def add_fertility(self, fert_value: int):
+        """
+        Add a fertility to this island
+        """
+        self.fertilities |= fert_value
+        self.compile()
+
+    def remove_fertility(self, fert_value: int):
+        """
+        Remove a fertility from this island
+        """
+        self.fertilities &= ~fert_value
+        self.compile()
+
+    def has_fertility(self, fert_value: int) -> bool:
+        """
+        Does this island have this fertility?
+        :return:
+        True | False
+        """
+        return self.fertilities & fert_value == fert_value
+
+    def set_slots(self, attribute: str, slots: int):
+        setattr(self, attribute, slots)
+        self.compile()
+
+    def set_island_size(self, island_size: IslandSize):
+        self.island_size = island_size
+        self.compile()
+
+    def dump(self):
+        """
+        utility function to dump all class data to stdout
+        :return:
+        """
+        print(f"{vars(self)}")
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python RegionSpec.py [spec.toml ...]        check region specs, and show what they compile to
+    import argparse
+    parser = argparse.ArgumentParser(description='Check region specs, and show the weights they compile to')
+    parser.add_argument('filenames', nargs='*', help='region .toml files (default all of regions/)')
+    args = parser.parse_args()
+
+    filenames = args.filenames or sorted(os.path.join(REGION_DIRECTORY, name)
+                                         for name in os.listdir(REGION_DIRECTORY) if name.endswith('.toml'))
+    for filename in filenames:
+        region = RegionSpec.load(filename)
+        print(f"Region [{region.name}], {len(region.bits)} fertilities, from [{filename}]")
+        print(f"    .csv header:        {region.header()}")
+        for ndx, name in enumerate(region.fertility_names):
+            scaled = f" x {region.slot_attributes[region.scale_slot[ndx]]} / {region.scale_base:.0f}" if region.scaled[ndx] else ''
+            print(f"    {name:<16}{region.weights[ndx]:>6.0f}{scaled}")
+        for attribute, weight in zip(region.slot_attributes, region.slot_weights):
+            print(f"    {attribute:<16}{weight:>6.0f} per slot")
+        print(f"    sizes:              {', '.join(f'{size.name} {weight:.0f}' for size, weight in region.size_weights.items())}")
+        if region.readd_after_first:
+            print(f"    wanted after first: {region.fertility_type(region.readd_after_first)!r}")
+        for coverage, mask in region.coverage.items():
+            print(f"    coverage {coverage + ':':<11}{bin(mask).count('1')} fertilities")
+        print(f"    reduction rate {region.reduction_rate}, penalty {region.penalty:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,846 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+import zlib
+
+from AlbionIsland import AlbionIsland
+from AlbionSolver import AlbionSolver, AlbionFertility
+from LatiumIsland import LatiumIsland
+from LatiumSolver import LatiumSolver
+from LocalizationIndex import LocalizationIndex, localize_islands
+from SimulatedAnnealingSolver import SimulatedAnnealingSolver
+
+
+###########################################################################################
+#
+#   Savegame reader
+#
+#   Reads the island tables straight out of an Anno 117 savegame (.a8s), see savegame_structure.md:
+#       .a8s                RDA container (Resource File V2.2), read here
+#       data.a7s etc        4 inner files, each zlib compressed FileDB binary, decompressed here
+#       FileDB -> XML       FileDB has no published spec, so this step runs an external decoder such as
+#                           FileDBReader, given as a command line with {input} and {output} placeholders
+#       XML                 hex encoded XML, streamed here, never built into a DOM
+#
+#   Decoding is the slow step, so every inner file is hashed as stored in the container, and decoded
+#   XML is cached by that hash.  An autosave which only changed header.a7s costs a hash, not a decode.
+#
+#   The island tables are written in the same .csv layout as the hand-made ones.  What a savegame stores as
+#   GUIDs, and what it doesn't store at all, comes from a catalog .json file:
+#       fertilities     fertility GUID -> .csv column name, e.g. {"2206": "Mackerel"}
+#       islands         "{session GUID}:{area id}" -> {"Mountains": 7, "Rivers": 9, "Size": "L"}, the island's full slot counts
+#       buildings       building GUID -> the slot column it uses up, e.g. {"123456": "Mountains"} for a mine
+#   Mid-game the .csv slot counts are what's left: full counts, less the slots with a building (or blueprint) on them.
+#   'catalog' writes a skeleton catalog listing every fertility GUID and island found in a save, to fill in once per map.
+#
+#   Every session is read in the same pass, so both region tables come out of one scan with --region both.
+#   Each island is tagged by its AreaInfo OwnerProfile: free (no owner), own (one of the --player profiles), or
+#   taken (AI or another player).  Taken islands are left out unless --include-taken, and their buildings are
+#   never looked at.
+#
+#   python SavegameReader.py catalog save.a8s --decoder CMD --out catalog.json
+#   python SavegameReader.py islands save.a8s --decoder CMD --catalog catalog.json --region latium [--out islands.csv]
+#   python SavegameReader.py islands save.a8s --decoder CMD --catalog catalog.json --region both --out islands_{region}.csv
+#   python SavegameReader.py occupancy save.a8s --decoder CMD --catalog catalog.json --region latium
+#   python SavegameReader.py watch SAVE_DIRECTORY --decoder CMD --catalog catalog.json --region latium
+#
+
+RDA_MAGIC = b'Resource File V2.2'
+RDA_HEADER_SIZE = 792
+
+# flags, file count, directory size as stored, directory size decompressed, offset of the next block
+RDA_BLOCK = struct.Struct('<IIQQQ')
+
+# filename (utf-16), offset, size as stored, size decompressed, timestamp, unknown
+RDA_ENTRY = struct.Struct('<520sQQQQQ')
+
+BLOCK_COMPRESSED = 0x1
+BLOCK_ENCRYPTED = 0x2
+BLOCK_MEMORY_RESIDENT = 0x4
+BLOCK_DELETED = 0x8
+
+INNER_FILES = ('data.a7s', 'gamesetup.a7s', 'header.a7s', 'meta.a7s')
+
+# tags starting with a digit, e.g. <2ndPriority>, aren't valid XML
+DIGIT_TAG = re.compile(rb'<(/?)(\d)')
+
+REGIONS = {
+    'latium': {
+        'session': 3245,
+        'island': LatiumIsland,
+        'solver': LatiumSolver,
+        'columns': LatiumIsland.region.columns(),
+    },
+    'albion': {
+        'session': 6627,
+        'island': AlbionIsland,
+        'solver': AlbionSolver,
+        'columns': AlbionIsland.region.columns(),
+    },
+}
+
+# columns which aren't fertilities
+SLOT_COLUMNS = tuple(dict.fromkeys(LatiumIsland.region.slot_columns + AlbionIsland.region.slot_columns))
+
+COVERAGE = {
+    'all': AlbionFertility.all_fertilities,
+    'celtic': AlbionFertility.celtic,
+    'roman': AlbionFertility.roman,
+}
+
+# OwnerProfile of an island nobody has settled, and of the human player in a single player game
+UNOWNED = 0
+HUMAN_PLAYER = 41
+
+
+###########################################################################################
+#
+#   hex encoded leaf values, all little endian
+#
+def hex_int(value: str, signed: bool = True) -> int:
+    return int.from_bytes(bytes.fromhex(value.strip()), 'little', signed=signed)
+
+
+def hex_ints(value: str, size: int = 4) -> list:
+    """
+    :return: list of the ints in a packed array, e.g. FertilityGuids
+    """
+    data = bytes.fromhex(value.strip())
+    return [int.from_bytes(data[i:i + size], 'little', signed=True) for i in range(0, len(data), size)]
+
+
+def hex_floats(value: str) -> tuple:
+    """
+    :return: tuple of the float32s in a packed array, e.g. a Position
+    """
+    data = bytes.fromhex(value.strip())
+    return struct.unpack(f'<{len(data) // 4}f', data)
+
+
+def hex_utf16(value: str) -> str:
+    return bytes.fromhex(value.strip()).decode('utf-16-le')
+
+
+###########################################################################################
+#
+class RdaArchive:
+    """
+    Directory of a Resource File V2.2 container, e.g. a .a8s savegame
+    unencrypted blocks only, which savegames are, game data archives may not be
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+        # inner file name -> (offset, size as stored, whether compressed)
+        self.entries = {}
+
+        with open(filename, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+            header = file.read(RDA_HEADER_SIZE)
+            if not header.startswith(RDA_MAGIC):
+                raise ValueError(f"[{filename}] isn't a Resource File V2.2 container")
+            block_offset, = struct.unpack_from('<Q', header, RDA_HEADER_SIZE - 8)
+
+            while 0 < block_offset < file_size:
+                file.seek(block_offset)
+                flags, file_count, directory_size, decompressed_size, next_block = \
+                    RDA_BLOCK.unpack(file.read(RDA_BLOCK.size))
+                if not flags & BLOCK_DELETED:
+                    if flags & (BLOCK_ENCRYPTED | BLOCK_MEMORY_RESIDENT):
+                        raise ValueError(f"[{filename}] has encrypted or memory resident blocks, "
+                                         f"extract it with RDAConsole first")
+
+                    # the directory is stored just ahead of its block header
+                    file.seek(block_offset - directory_size)
+                    directory = file.read(directory_size)
+                    if flags & BLOCK_COMPRESSED:
+                        directory = zlib.decompress(directory)
+                    for i in range(file_count):
+                        name, offset, stored_size, size, timestamp, unknown = \
+                            RDA_ENTRY.unpack_from(directory, i * RDA_ENTRY.size)
+                        name = name.decode('utf-16-le').split('\0')[0]
+                        self.entries[os.path.basename(name.replace('\\', '/'))] = \
+                            (offset, stored_size, bool(flags & BLOCK_COMPRESSED))
+
+                if next_block <= block_offset:
+                    break
+                block_offset = next_block
+
+    def read(self, name: str) -> bytes:
+        """
+        :return: contents of an inner file
+        """
+        offset, stored_size, compressed = self.entries[name]
+        with open(self.filename, 'rb') as file:
+            file.seek(offset)
+            data = file.read(stored_size)
+        return zlib.decompress(data) if compressed else data
+
+
+###########################################################################################
+#
+class SavegameDecoder:
+    """
+    Turns inner files into XML files, caching the XML by a hash of the inner file
+    """
+
+    def __init__(self, command: str, cache_directory: str = None):
+        # decoder command line, with {input} (FileDB binary) and {output} (XML) placeholders
+        self.command = command
+        self.cache_directory = cache_directory or os.path.join(tempfile.gettempdir(), 'anno117_savegame_cache')
+        os.makedirs(self.cache_directory, exist_ok=True)
+
+        # number of decodes run, and avoided because the XML was cached
+        self.decodes = 0
+        self.cache_hits = 0
+
+    def hashes(self, archive: RdaArchive) -> dict:
+        """
+        :return: inner file name -> hash of its contents, for each inner file which is present
+        """
+        return {name: hashlib.sha256(archive.read(name)).hexdigest() for name in INNER_FILES if name in archive.entries}
+
+    def xml_file(self, archive: RdaArchive, name: str, digest: str = None) -> str:
+        """
+        :param digest: hash of the inner file, if already known
+        :return: filename of the decoded XML for one inner file
+        """
+        data = archive.read(name)
+        digest = digest or hashlib.sha256(data).hexdigest()
+        xml_filename = os.path.join(self.cache_directory, f"{digest}.xml")
+        if os.path.exists(xml_filename):
+            self.cache_hits += 1
+            return xml_filename
+
+        if not self.command:
+            raise ValueError("no --decoder command, which is needed to turn FileDB into XML")
+
+        bin_filename = os.path.join(self.cache_directory, f"{digest}.bin")
+        with open(bin_filename, 'wb') as file:
+            file.write(zlib.decompress(data))
+
+        # decode to a temporary name, so an interrupted decode never leaves a partial XML file in the cache
+        temp_filename = xml_filename + '.tmp'
+        command = [part.format(input=bin_filename, output=temp_filename) for part in shlex.split(self.command)]
+        try:
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            os.replace(temp_filename, xml_filename)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise ValueError(f"decoding {name} failed: {e}") from e
+        finally:
+            os.remove(bin_filename)
+        self.decodes += 1
+        return xml_filename
+
+    def discard(self, digest: str):
+        """
+        remove a decoded file from the cache, once no save refers to it any more
+        """
+        filename = os.path.join(self.cache_directory, f"{digest}.xml")
+        if os.path.exists(filename):
+            os.remove(filename)
+
+
+###########################################################################################
+#
+#   streaming extraction from the decoded XML
+#
+def xml_chunks(filename: str, chunk_size: int = 1 << 20):
+    """
+    read decoded XML in chunks, renaming tags which start with a digit, e.g. <2ndPriority> -> <_2ndPriority>
+    :return: generator of byte strings
+    """
+    pending = b''
+    with open(filename, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                if pending:
+                    yield DIGIT_TAG.sub(rb'<\1_\2', pending)
+                return
+            pending += chunk
+            # hold back from the last '<', it may be a tag split across chunks
+            split = pending.rfind(b'<')
+            if split <= 0:
+                continue
+            yield DIGIT_TAG.sub(rb'<\1_\2', pending[:split])
+            pending = pending[split:]
+
+
+class AreaRecord:
+    """
+    one island, from a session's AreaInfo, and what its AreaManager shows of the slots already in use
+    """
+
+    __slots__ = ('session_guid', 'area_id', 'owner', 'name_guid', 'fertility_guids', 'occupied', 'ownership')
+
+    def __init__(self, session_guid: int, area_id: int, owner: int, name_guid: int, fertility_guids: list):
+        self.session_guid = session_guid
+        self.area_id = area_id
+        self.owner = owner
+        self.name_guid = name_guid
+        self.fertility_guids = fertility_guids
+
+        # slot column, e.g. 'Mountains' -> number of those slots with a building on them
+        self.occupied = {}
+
+        # 'free', 'own' or 'taken', see ownership(), or None if the islands weren't tagged
+        self.ownership = None
+
+    @property
+    def key(self) -> str:
+        """
+        catalog key, area ids are only unique within a session
+        """
+        return f"{self.session_guid}:{self.area_id}"
+
+    @property
+    def name(self) -> str:
+        """
+        island name for the .csv tables, the LineId of its city name, see LocalizationIndex.py
+        """
+        return str(self.name_guid) if self.name_guid else f"Area{self.area_id}"
+
+
+def leaf(element: ElementTree.Element, path: str):
+    child = element.find(path)
+    if child is None or child.text is None or not child.text.strip():
+        return None
+    return child.text
+
+
+def ownership(owner: int, players: set) -> str:
+    """
+    :param owner: an island's OwnerProfile
+    :param players: OwnerProfiles which count as the player's own
+    :return: 'free', 'own' or 'taken', i.e. settled by AI or another player
+    """
+    if owner == UNOWNED:
+        return 'free'
+    return 'own' if owner in players else 'taken'
+
+
+def area_record(session_guid: int, area_id: int, element: ElementTree.Element) -> AreaRecord:
+    """
+    :param element: the data <None> of one AreaInfo pair
+    """
+    owner = leaf(element, 'OwnerProfile')
+    name_guid = leaf(element, 'CityNameGuid')
+    fertility_guids = []
+    fertility = element.find('Fertility')
+    if fertility is not None:
+        fertility_guids = [hex_int(child.text) for child in fertility if child.text and child.text.strip()]
+    return AreaRecord(session_guid, area_id,
+                      hex_int(owner) if owner is not None else 0,
+                      hex_int(name_guid) if name_guid is not None else 0,
+                      fertility_guids)
+
+
+class AreaScanner:
+    """
+    One streaming pass over a decoded data.a7s, collecting
+        - the AreaInfo islands, see area_record()
+        - from each AreaManager_{id}/AreaObjectManager/GameObject/objects, the buildings which use up
+          a mountain, river or marsh slot
+    Memory stays bounded however many objects there are: every element is dropped as soon as it closes,
+    objects included, after picking up the few fields needed.  Only the AreaInfo entries are kept until
+    they close, they're small and there is one per island.
+    Given the player's OwnerProfiles, each island is tagged with its ownership().  A session's AreaInfo comes ahead
+    of its AreaManagers, so islands which are taken, and left out, have their objects skipped altogether.
+    """
+
+    # object fields used to classify buildings
+    OBJECT_FIELDS = ('guid', 'Position', 'StateBits')
+
+    def __init__(self, session_guids: set = None, slot_buildings: dict = None, players: set = None,
+                 include_taken: bool = True):
+        # sessions to read, or None for every session
+        self.session_guids = session_guids
+
+        # building GUID -> slot column it uses up, e.g. {123456: 'Mountains'}
+        self.slot_buildings = slot_buildings or {}
+
+        # OwnerProfiles of the player, or None to leave the islands untagged, and whether to keep taken islands
+        self.players = players
+        self.include_taken = include_taken
+
+        self.records = []
+
+        # (session GUID, area id) of the islands left out, and how many of their AreaManagers were skipped
+        self.taken = set()
+        self.skipped_areas = 0
+
+        # (session GUID, area id) -> {slot column: set of slot positions in use}
+        self.slots_used = {}
+
+        # number of objects looked at, and how many of them use up a slot
+        self.objects = 0
+        self.slot_objects = 0
+
+        self.tags = []
+        self.elements = []
+
+        # GUID of the session being read, and the id half of the current AreaInfo id/data pair
+        self.session_guid = None
+        self.area_id = None
+        self.area_depth = None
+
+        # id of the AreaManager being read, and the depth and fields of the object being read
+        self.manager_id = None
+        self.object_depth = None
+        self.object_fields = {}
+
+    def wanted(self) -> bool:
+        return self.session_guids is None or self.session_guid in self.session_guids
+
+    def scan(self, xml_filename: str) -> list:
+        """
+        :return: list of AreaRecords, with their occupied slots filled in
+        """
+        parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        for chunk in xml_chunks(xml_filename):
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    self.start(element)
+                else:
+                    self.end(element)
+        parser.close()
+
+        for record in self.records:
+            used = self.slots_used.get((record.session_guid, record.area_id), {})
+            record.occupied = {column: len(positions) for column, positions in used.items()}
+        return self.records
+
+    def start(self, element: ElementTree.Element):
+        tags = self.tags
+        tags.append(element.tag)
+        self.elements.append(element)
+        depth = len(tags)
+
+        if element.tag != 'None' or depth < 3:
+            if element.tag.startswith('AreaManager_') and depth >= 2 and tags[-2] == 'AreaManagers':
+                manager_id = int(element.tag[len('AreaManager_'):])
+                if (self.session_guid, manager_id) in self.taken:
+                    self.skipped_areas += 1
+                else:
+                    self.manager_id = manager_id
+        elif self.area_depth is None and tags[-2] == 'AreaInfo' and tags[-3] == 'GameSessionManager':
+            self.area_depth = depth
+        elif (self.object_depth is None and self.manager_id is not None and depth >= 5 and tags[-2] == 'objects'
+              and tags[-3] == 'GameObject' and tags[-4] == 'AreaObjectManager'):
+            self.object_depth = depth
+            self.object_fields = {}
+
+    def end(self, element: ElementTree.Element):
+        tags = self.tags
+        depth = len(tags)
+
+        if element.tag == 'SessionGUID' and depth >= 2 and tags[-2] == 'SessionDesc':
+            self.session_guid = hex_int(element.text)
+
+        elif depth == self.area_depth:
+            self.area_depth = None
+            if len(element) == 0:
+                # the id half of the pair
+                self.area_id = hex_int(element.text) if element.text and element.text.strip() else None
+            elif self.area_id is not None:
+                if self.wanted():
+                    self.add_record(area_record(self.session_guid, self.area_id, element))
+                self.area_id = None
+
+        elif self.object_depth is not None:
+            if depth == self.object_depth + 1 and element.tag in self.OBJECT_FIELDS:
+                self.object_fields[element.tag] = element.text
+            elif depth == self.object_depth:
+                self.object_depth = None
+                self.end_object()
+
+        elif element.tag.startswith('AreaManager_'):
+            self.manager_id = None
+
+        tags.pop()
+        self.elements.pop()
+        # the element just closed is its parent's last child, unless it's part of an AreaInfo entry still being read
+        if self.elements and (self.area_depth is None or depth <= self.area_depth):
+            del self.elements[-1][-1]
+
+    def add_record(self, record: AreaRecord):
+        if self.players is not None:
+            record.ownership = ownership(record.owner, self.players)
+            if record.ownership == 'taken' and not self.include_taken:
+                self.taken.add((record.session_guid, record.area_id))
+                return
+        self.records.append(record)
+
+    def end_object(self):
+        self.objects += 1
+        fields = self.object_fields
+        if not self.slot_buildings or 'guid' not in fields or not self.wanted():
+            return
+        column = self.slot_buildings.get(hex_int(fields['guid']))
+        if column is None:
+            return
+
+        # a slot holds one building, so count slot positions rather than objects
+        # blueprints (StateBits 0x66) are counted too, the player has that slot spoken for
+        self.slot_objects += 1
+        if 'Position' in fields:
+            x, y, z = hex_floats(fields['Position'])[:3]
+            position = (round(x, 1), round(z, 1))
+        else:
+            position = ('object', self.slot_objects)
+        used = self.slots_used.setdefault((self.session_guid, self.manager_id), {})
+        used.setdefault(column, set()).add(position)
+
+
+def read_areas(xml_filename: str, session_guids: set = None, slot_buildings: dict = None, players: set = None,
+               include_taken: bool = True) -> list:
+    """
+    stream the islands out of a decoded data.a7s, see AreaScanner
+    :param session_guids: sessions to read, or None for every session
+    :param slot_buildings: building GUID -> slot column it uses up
+    :param players: OwnerProfiles of the player, to tag each island with its ownership(), or None
+    :param include_taken: False to leave out islands taken by AI or other players
+    :return: list of AreaRecords
+    """
+    return AreaScanner(session_guids, slot_buildings, players, include_taken).scan(xml_filename)
+
+
+def split_regions(records: list) -> dict:
+    """
+    :return: region name -> list of that region's AreaRecords, for every region
+    """
+    regions = {region['session']: name for name, region in REGIONS.items()}
+    rv = {name: [] for name in REGIONS}
+    for record in records:
+        if record.session_guid in regions:
+            rv[regions[record.session_guid]].append(record)
+    return rv
+
+
+###########################################################################################
+#
+#   island tables
+#
+def load_catalog(filename: str) -> dict:
+    if not filename or not os.path.exists(filename):
+        return {'fertilities': {}, 'islands': {}, 'buildings': {}}
+    with open(filename, 'r', encoding='utf-8') as file:
+        catalog = json.load(file)
+    catalog.setdefault('fertilities', {})
+    catalog.setdefault('islands', {})
+    catalog.setdefault('buildings', {})
+    return catalog
+
+
+def slot_buildings(catalog: dict) -> dict:
+    """
+    :return: building GUID -> slot column it uses up
+    """
+    return {int(guid): column for guid, column in catalog['buildings'].items() if column in SLOT_COLUMNS}
+
+
+def remaining_slots(record: AreaRecord, column: str, catalog: dict) -> int:
+    """
+    :return: number of the island's slots of one kind which are still free
+    """
+    capacity = int(catalog['islands'].get(record.key, {}).get(column, 0))
+    return max(capacity - record.occupied.get(column, 0), 0)
+
+
+def island_rows(records: list, region: str, catalog: dict) -> list:
+    """
+    :return: list of .csv lines, one per island, in the layout LatiumIsland/AlbionIsland.from_string() reads,
+        with the island's ownership as an extra last column if it was tagged, which from_string() ignores
+    """
+    columns = REGIONS[region]['columns']
+    rv = []
+    for record in records:
+        have = {catalog['fertilities'].get(str(guid)) for guid in record.fertility_guids}
+        details = catalog['islands'].get(record.key, {})
+        fields = [record.name]
+        for column in columns:
+            if column == 'Size':
+                fields.append(details.get('Size', 'L'))
+            elif column in SLOT_COLUMNS:
+                fields.append(str(remaining_slots(record, column, catalog)))
+            else:
+                fields.append('1' if column in have else '')
+        if record.ownership is not None:
+            fields.append(record.ownership)
+        rv.append(','.join(fields))
+    return rv
+
+
+def island_table(records: list, region: str, catalog: dict) -> str:
+    """
+    :return: text of a .csv island file
+    """
+    header = '#Name,' + ','.join(REGIONS[region]['columns'])
+    if any(record.ownership is not None for record in records):
+        header += ',Owner'
+    return '\n'.join([header] + island_rows(records, region, catalog)) + '\n'
+
+
+def skeleton_catalog(records: list, catalog: dict) -> dict:
+    """
+    :return: the catalog, with an entry added for every fertility GUID and island it doesn't cover yet
+    """
+    for record in records:
+        for guid in record.fertility_guids:
+            catalog['fertilities'].setdefault(str(guid), None)
+        details = catalog['islands'].setdefault(record.key, {})
+        region = next((name for name, region in REGIONS.items() if region['session'] == record.session_guid), None)
+        if region is not None:
+            for column in REGIONS[region]['columns']:
+                if column in SLOT_COLUMNS:
+                    details.setdefault(column, 0)
+            details.setdefault('Size', 'L')
+    return catalog
+
+
+def read_save(filename: str, decoder: SavegameDecoder, session_guids: set = None, buildings: dict = None,
+              players: set = None, include_taken: bool = True) -> list:
+    """
+    :param filename: .a8s savegame, or an already decoded data XML file
+    :param buildings: building GUID -> slot column it uses up, see slot_buildings()
+    :param players: see read_areas()
+    :param include_taken: see read_areas()
+    :return: list of AreaRecords
+    """
+    if not filename.lower().endswith('.xml'):
+        filename = decoder.xml_file(RdaArchive(filename), 'data.a7s')
+    return read_areas(filename, session_guids, buildings, players, include_taken)
+
+
+def occupancy_table(records: list, region: str, catalog: dict) -> str:
+    """
+    :return: text table of each island's slots: full count, in use, and free
+    """
+    columns = [column for column in REGIONS[region]['columns'] if column in SLOT_COLUMNS]
+    lines = [f"{'Island':<24}{'Owner':<8}" + ''.join(f"{column + ' (all/used/free)':>28}" for column in columns)]
+    for record in records:
+        details = catalog['islands'].get(record.key, {})
+        cells = [f"{int(details.get(column, 0))}/{record.occupied.get(column, 0)}/{remaining_slots(record, column, catalog)}"
+                 for column in columns]
+        lines.append(f"{record.name:<24}{record.ownership or '':<8}" + ''.join(f"{cell:>28}" for cell in cells))
+    return '\n'.join(lines) + '\n'
+
+
+###########################################################################################
+#
+class SavegameWatcher:
+    """
+    Polls a save directory, and re-solves whenever the newest save's islands change
+        - inner files whose hash hasn't changed aren't decoded again
+        - islands whose .csv row hasn't changed are reused as they are
+        - the solver warm starts from the previous recommendation, see SimulatedAnnealingSolver.warm_start()
+    """
+
+    def __init__(self, directory: str, region: str, decoder: SavegameDecoder, catalog: dict,
+                 coverage: str = 'all', names: LocalizationIndex = None, players: set = None):
+        self.directory = directory
+        self.region = region
+        self.decoder = decoder
+        self.catalog = catalog
+        self.coverage = coverage
+        self.names = names
+
+        # islands taken by AI or other players drop out of the candidates as soon as a save shows them settled
+        self.players = players if players is not None else {HUMAN_PLAYER}
+
+        # (path, size, modification time) of the last save looked at
+        self.last_save = None
+
+        # inner file name -> hash, for the last save
+        self.hashes = {}
+
+        # island .csv row -> island, and the previous recommendation
+        self.islands = {}
+        self.solution = None
+
+    def newest_save(self) -> str:
+        saves = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.lower().endswith('.a8s')]
+        return max(saves, key=os.path.getmtime) if saves else None
+
+    def poll(self) -> bool:
+        """
+        look at the newest save, and if its islands have changed, re-solve and print the recommendation
+        :return: True if there was a new recommendation
+        """
+        filename = self.newest_save()
+        if filename is None:
+            return False
+        stat = os.stat(filename)
+        save = (filename, stat.st_size, stat.st_mtime_ns)
+        if save == self.last_save:
+            return False
+
+        start = time.perf_counter()
+        try:
+            archive = RdaArchive(filename)
+            hashes = self.decoder.hashes(archive)
+        except (OSError, ValueError, KeyError, zlib.error, struct.error):
+            # most likely the game is still writing it, try again next poll
+            return False
+        self.last_save = save
+
+        changed_files = [name for name in INNER_FILES if hashes.get(name) != self.hashes.get(name)]
+        previous_data = self.hashes.get('data.a7s')
+        self.hashes = hashes
+        print(f"{time.strftime('%H:%M:%S')} [{os.path.basename(filename)}] changed: [{', '.join(changed_files)}]")
+        if 'data.a7s' not in changed_files:
+            return False
+
+        if previous_data is not None:
+            self.decoder.discard(previous_data)
+        try:
+            xml_filename = self.decoder.xml_file(archive, 'data.a7s', hashes['data.a7s'])
+            records = read_areas(xml_filename, {REGIONS[self.region]['session']}, slot_buildings(self.catalog),
+                                 self.players, include_taken=False)
+        except (OSError, ValueError, ElementTree.ParseError) as e:
+            # e.g. the decoder failed on a half-written save, forget it so the next poll tries again
+            print(f"    Error: {e}")
+            self.last_save = None
+            self.hashes = {}
+            return False
+
+        # only build islands for the rows which changed
+        island_class = REGIONS[self.region]['island']
+        islands = {}
+        for row in island_rows(records, self.region, self.catalog):
+            islands[row] = self.islands[row] if row in self.islands else island_class.from_string(row)
+        if islands.keys() == self.islands.keys():
+            print("    islands unchanged")
+            return False
+
+        self.solve(islands)
+        print(f"    answer in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def solve(self, islands: dict):
+        previous = {island.island_name: row for row, island in self.islands.items()}
+        self.islands = islands
+        if self.names is not None:
+            localize_islands(list(islands.values()), self.names)
+        current = {island.island_name: row for row, island in islands.items()}
+
+        problem = REGIONS[self.region]['solver']()
+        problem.the_list = list(islands.values())
+        if isinstance(problem, AlbionSolver):
+            problem.set_coverage(COVERAGE[self.coverage]())
+
+        engine = SimulatedAnnealingSolver(problem)
+        if self.solution is None:
+            solution = engine.solve()
+        else:
+            added = [name for name in current if name not in previous]
+            removed = [name for name in previous if name not in current]
+            changed = [name for name in current if name in previous and current[name] != previous[name]]
+            print(f"    islands added: {len(added)}, removed: {len(removed)}, changed: {len(changed)}")
+            solution = engine.warm_start(self.solution, added, removed, changed)
+        self.solution = solution
+
+        print(f"    {self.region.capitalize()} ", end='')
+        problem.report(solution)
+
+    def watch(self, interval: float = 2.0):
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python SavegameReader.py catalog SAVE [--decoder CMD] [--out catalog.json]
+    #       python SavegameReader.py islands SAVE [--decoder CMD] --catalog catalog.json --region latium|albion|both [--player ID] [--include-taken] [--out FILE]
+    #       python SavegameReader.py occupancy SAVE [--decoder CMD] --catalog catalog.json --region latium|albion|both [--player ID] [--include-taken]
+    #       python SavegameReader.py watch SAVE_DIRECTORY [--decoder CMD] --catalog catalog.json --region latium|albion [--player ID] [--interval SECONDS]
+    parser = argparse.ArgumentParser(description='Read Anno 117 island tables from savegames')
+    parser.add_argument('command', choices=['catalog', 'islands', 'occupancy', 'watch'])
+    parser.add_argument('save', help='.a8s savegame, or a decoded data XML file (a save directory for watch)')
+    parser.add_argument('--decoder', default=os.environ.get('ANNO_FILEDB_DECODER', ''), metavar='CMD',
+                        help='command which decodes FileDB {input} into XML {output}, default $ANNO_FILEDB_DECODER')
+    parser.add_argument('--cache', metavar='DIRECTORY', help='where decoded XML is kept between runs')
+    parser.add_argument('--catalog', metavar='FILE', help='catalog .json of fertility GUIDs and island slots')
+    parser.add_argument('--region', choices=list(REGIONS.keys()) + ['both'], default='latium',
+                        help='both: every region from the one pass over the save, not for watch')
+    parser.add_argument('--player', type=int, action='append', metavar='ID',
+                        help=f'OwnerProfile whose islands count as your own (repeatable, default {HUMAN_PLAYER})')
+    parser.add_argument('--include-taken', action='store_true',
+                        help='keep islands settled by AI or other players, tagged taken, rather than leaving them out')
+    parser.add_argument('--coverage', choices=list(COVERAGE.keys()), default='all',
+                        help='albion only: fertilities the islands must provide (default all)')
+    parser.add_argument('--names', metavar='INDEX', help='LineId index from LocalizationIndex.py, for in-game names')
+    parser.add_argument('--interval', type=float, default=2.0, metavar='SECONDS', help='watch poll interval (default 2)')
+    parser.add_argument('--out', metavar='FILE', help='file to write, default stdout (catalog: the --catalog file), '
+                                                      'with --region both a {region} placeholder is filled in for each')
+    args = parser.parse_args()
+
+    regions = list(REGIONS.keys()) if args.region == 'both' else [args.region]
+    if args.region == 'both' and args.command == 'watch':
+        parser.error("watch solves one region, pick latium or albion")
+    if args.out and len(regions) > 1 and args.command != 'catalog' and '{region}' not in args.out:
+        parser.error("--out needs a {region} placeholder with --region both, e.g. islands_{region}.csv")
+    players = set(args.player or [HUMAN_PLAYER])
+
+    decoder = SavegameDecoder(args.decoder, args.cache)
+    catalog = load_catalog(args.catalog)
+    try:
+        names = LocalizationIndex.open(args.names) if args.names else None
+
+        if args.command == 'watch':
+            watcher = SavegameWatcher(args.save, args.region, decoder, catalog, args.coverage, names, players)
+            print(f"Watching [{args.save}] for {args.region} saves, ctrl-c to stop")
+            try:
+                watcher.watch(args.interval)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        # list of (file to write, or None for stdout, text)
+        outputs = []
+        if args.command == 'catalog':
+            text = json.dumps(skeleton_catalog(read_save(args.save, decoder), catalog), indent=2) + '\n'
+            outputs.append((args.out or args.catalog, text))
+        else:
+            # every region's session in the one pass
+            records = read_save(args.save, decoder, {REGIONS[region]['session'] for region in regions},
+                                slot_buildings(catalog), players, args.include_taken)
+            table = occupancy_table if args.command == 'occupancy' else island_table
+            by_region = split_regions(records)
+            for region in regions:
+                out = args.out.replace('{region}', region) if args.out else None
+                outputs.append((out, table(by_region[region], region, catalog)))
+
+    except (OSError, ValueError, zlib.error, ElementTree.ParseError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for out, text in outputs:
+        if out:
+            with open(out, 'w', encoding='utf-8') as file:
+                file.write(text)
+            print(f"Wrote [{out}]")
+        else:
+            print(text, end='')
+
+
+if __name__ == '__main__':
+    main()
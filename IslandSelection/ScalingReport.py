@@ -0,0 +1,123 @@
+import argparse
+import time
+import tracemalloc
+import numpy
+
+from AlbionIsland import AlbionIsland, AlbionFertility
+from AlbionSolver import AlbionSolver
+from LatiumIsland import LatiumIsland
+from LatiumSolver import LatiumSolver
+from Engines import ENGINES
+from MapGenerator import fit_region
+from ParallelTemperingSolver import ParallelTemperingSolver
+from RandomStream import RandomStream
+
+
+###########################################################################################
+#
+#   Scaling report: solve time and memory against number of islands, for each search engine
+#
+#   Maps are generated with MapGenerator, so they have the same statistics as the real ones, just more islands.
+#   Memory is the peak python allocation during the solve, measured with tracemalloc, so the tempering engine
+#   runs its replicas in-process here, to be measured at all.  tracemalloc slows python down a lot, so time and
+#   memory come from two separate solves with the same random seed.
+#
+
+PROBLEMS = {
+    'latium': (LatiumSolver, LatiumIsland),
+    'albion': (AlbionSolver, AlbionIsland),
+}
+
+
+def make_problem(region: str, lines: list, max_anneals: int, seed: int = None):
+    """
+    build a problem from generated .csv lines
+    """
+    solver_class, island_class = PROBLEMS[region]
+    problem = solver_class()
+    problem.rng = RandomStream(seed)
+    problem.the_list = [island_class.from_string(line) for line in lines if line[0] != '#']
+    if region == 'albion':
+        problem.set_coverage(AlbionFertility.celtic())
+    problem.max_anneals = max_anneals
+    return problem
+
+
+def run_engine(problem, engine_name: str):
+    """
+    solve the problem with one engine
+    :return: the engine
+    """
+    if engine_name == ParallelTemperingSolver.name:
+        engine = ParallelTemperingSolver(problem, num_processes=1)
+    else:
+        engine = ENGINES[engine_name](problem)
+    engine.solve()
+    return engine
+
+
+def measure(region: str, lines: list, engine_name: str, max_anneals: int, seed: int, memory: bool = True) -> dict:
+    """
+    solve a generated map with one engine
+    :return: dictionary of time, peak memory (None if not measured), evaluations and best score
+    """
+    start = time.perf_counter()
+    engine = run_engine(make_problem(region, lines, max_anneals, seed), engine_name)
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        run_engine(make_problem(region, lines, max_anneals, seed), engine_name)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        'elapsed': elapsed,
+        'peak_memory': peak,
+        'best_score': engine.best_score,
+        'evaluations': engine.evaluations,
+    }
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python ScalingReport.py latium [--sizes 17,50,100,200] [--engines anneal,tabu] [--max-anneals N] [--seed N]
+    parser = argparse.ArgumentParser(description='Report solve time and memory against number of islands')
+    parser.add_argument('region', choices=list(PROBLEMS.keys()))
+    parser.add_argument('--sizes', default='17,50,100,200', help='comma separated island counts')
+    parser.add_argument('--engines', default=','.join(ENGINES.keys()), help='comma separated engine names')
+    parser.add_argument('--max-anneals', type=int, default=20,
+                        help='evaluation budget, as a number of anneals of 1000 trials (default 20, a full solve is 200)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the maps and the solves')
+    parser.add_argument('--no-memory', action='store_true', help="skip the memory measurement, which doubles the run time")
+    args = parser.parse_args()
+
+    engines = [name for name in args.engines.split(',') if name]
+    for name in engines:
+        if name not in ENGINES:
+            parser.error(f"unknown engine [{name}], expected one of {list(ENGINES.keys())}")
+
+    model = fit_region(args.region)
+    rng = numpy.random.default_rng(args.seed)
+
+    print(f"Scaling report, {args.region}, {args.max_anneals} anneals of 1000 trials per solve")
+    print(f"{'islands':>8} {'engine':>10} {'time (s)':>10} {'evals/s':>10} {'peak mem (KB)':>14} {'best score':>11}")
+    for num_islands in [int(size) for size in args.sizes.split(',')]:
+        lines = model.generate(num_islands, rng)
+        for name in engines:
+            result = measure(args.region, lines, name, args.max_anneals, args.seed, not args.no_memory)
+            peak_memory = f"{result['peak_memory'] / 1024:.0f}" if result['peak_memory'] is not None else '-'
+            print(f"{num_islands:>8} {name:>10} {result['elapsed']:>10.2f} "
+                  f"{result['evaluations'] / result['elapsed']:>10.0f} "
+                  f"{peak_memory:>14} {result['best_score']:>11.0f}")
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+###########################################################################################
+#
+#   Bounded LRU cache of scores
+#
+class ScoreCache:
+    """
+    Least-recently-used cache of scores, keyed by each solution's covering prefix
+        - only the items up to the point where coverage is complete affect the score, so many different
+          orderings share a prefix and score identically.  Late in a solve most trials revisit the same few prefixes
+        - keys come from the problem's cache_key(), i.e. a tuple of the prefix items plus anything else
+          the score depends on
+        - when full, the least recently used entry is evicted
+        - hits, misses and evictions are counted, to help pick a size
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: tuple):
+        """
+        :return: the cached score, or None if the key isn't in the cache
+        """
+        rv = self.entries.get(key)
+        if rv is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return rv
+
+    def put(self, key: tuple, score: float):
+        self.entries[key] = score
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+        }
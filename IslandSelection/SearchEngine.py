@@ -0,0 +1,129 @@
+import time
+
+
+###########################################################################################
+#
+#   Base class for search engines
+#
+class SearchEngine:
+    """
+    Base class for the search engines which solve a SelectionProblem
+    child classes should
+        - implement solve(), which returns the best list found
+        - spend no more than max_evaluations calls to problem.score()
+        - count every score() evaluation in self.evaluations, and pass every new solution through record()
+    which gives every engine the same budget and the same telemetry
+    """
+
+    # short name, used to select the engine from the command line
+    name = ''
+
+    def __init__(self, problem):
+        # the SelectionProblem being solved
+        self.problem = problem
+
+        # evaluation budget, the same for every engine
+        self.max_evaluations = problem.max_anneals * problem.max_trials
+
+        # telemetry
+        self.evaluations = 0
+        self.best_list = None
+        self.best_score = -float('inf')
+        self.start_time = None
+        self.elapsed = 0.0
+        self.time_to_best = 0.0
+        self.evaluations_to_best = 0
+
+        # history of improvements, list of (elapsed seconds, evaluations, best score)
+        self.best_history = []
+
+        # optional function, called every so often during a solve with a dictionary of progress values
+        self.progress_callback = None
+
+    def solve(self) -> list:
+        """
+        search for the best ordering of problem.the_list
+        :return: optimized list, which is also stored back into problem.the_list
+        """
+        raise NotImplementedError()
+
+    def start(self):
+        """
+        reset the telemetry at the start of a solve
+        """
+        self.evaluations = 0
+        self.best_list = None
+        self.best_score = -float('inf')
+        self.best_history = []
+        if self.problem.score_cache is not None:
+            self.problem.score_cache.reset_counters()
+        self.start_time = time.perf_counter()
+
+    def finish(self) -> list:
+        """
+        wrap up at the end of a solve, storing the best list back into the problem
+        :return: the best list
+        """
+        self.elapsed = time.perf_counter() - self.start_time
+        if self.best_list is not None:
+            self.problem.the_list = self.best_list
+        return self.problem.the_list
+
+    def record(self, candidate_list: list, candidate_score: float):
+        """
+        keep track of the best solution seen, and offer it to the problem's elite archive
+        engines call this with every solution they move to
+        """
+        if candidate_score > self.best_score:
+            self.best_score = candidate_score
+            self.best_list = candidate_list.copy()
+            self.time_to_best = time.perf_counter() - self.start_time
+            self.evaluations_to_best = self.evaluations
+            self.best_history.append((self.time_to_best, self.evaluations, candidate_score))
+
+        self.problem.offer_to_archive(candidate_list, candidate_score)
+
+    def report_progress(self):
+        """
+        pass current progress to the progress callback, if there is one
+        engines call this every so often during a solve, e.g. once per anneal
+        """
+        if self.progress_callback is not None:
+            self.progress_callback({
+                'engine': self.name,
+                'evaluations': self.evaluations,
+                'max_evaluations': self.max_evaluations,
+                'best_score': self.best_score,
+                'elapsed': time.perf_counter() - self.start_time,
+            })
+
+    def telemetry(self) -> dict:
+        """
+        :return: dictionary of statistics from the most recent solve
+        """
+        rv = {
+            'engine': self.name,
+            'evaluations': self.evaluations,
+            'max_evaluations': self.max_evaluations,
+            'best_score': self.best_score,
+            'elapsed': self.elapsed,
+            'time_to_best': self.time_to_best,
+            'evaluations_to_best': self.evaluations_to_best,
+            'evaluations_per_second': self.evaluations / self.elapsed if self.elapsed > 0 else 0.0,
+        }
+        if self.problem.score_cache is not None:
+            rv['score_cache'] = self.problem.score_cache.statistics()
+        return rv
+
+    def report_telemetry(self):
+        """
+        write statistics from the most recent solve to stdout
+        """
+        t = self.telemetry()
+        print(f"        Engine [{t['engine']}]: {t['evaluations']} evaluations in {t['elapsed']:.2f}s "
+              f"({t['evaluations_per_second']:.0f}/s), "
+              f"best score {t['best_score']:.0f} after {t['time_to_best']:.2f}s / {t['evaluations_to_best']} evaluations")
+        if 'score_cache' in t:
+            c = t['score_cache']
+            print(f"        Score cache: {c['hits']} hits, {c['misses']} misses ({c['hit_rate']:.1%} hit rate), "
+                  f"{c['evictions']} evictions, {c['size']}/{c['max_size']} entries")
@@ -0,0 +1,321 @@
+import argparse
+import datetime
+import multiprocessing
+import os
+import re
+import sqlite3
+
+from AlbionIsland import AlbionIsland, AlbionFertility
+from AlbionSolver import AlbionSolver
+from BranchAndBoundSolver import BranchAndBoundSolver
+from LatiumIsland import LatiumIsland
+from LatiumSolver import LatiumSolver
+from SimulatedAnnealingSolver import SimulatedAnnealingSolver
+
+
+###########################################################################################
+#
+#   Seed store: a local SQLite database of island maps, for screening many map seeds at once
+#
+#   Maps are imported from .csv files named {map type}_seed{seed}_{region}.csv, e.g. corners_seed4018_latium.csv
+#   Each map is scored for each of its region's coverages, cheapest methods first:
+#       bound       upper bound on the best possible score, see CoverageBound
+#       greedy      greedy solve
+#       exact       branch and bound solve, up to an evaluation budget, which proves optimality if it finishes
+#       anneal      full simulated annealing, only for the shortlist of best maps which weren't solved exactly,
+#                   and for any other map whose bound beats the shortlist's weakest score
+#   Scores are kept in the database, so a map is only ever screened once, however often the seeds are ranked.
+#
+
+DEFAULT_DATABASE = 'seeds.sqlite'
+
+FILENAME_PATTERN = re.compile(r'^(?P<map_type>[A-Za-z]+)_seed(?P<seed>\d+)_(?P<region>latium|albion)\.csv$')
+
+PROBLEMS = {
+    'latium': (LatiumSolver, LatiumIsland),
+    'albion': (AlbionSolver, AlbionIsland),
+}
+
+# coverages to screen for each region
+COVERAGES = {
+    'latium': {'all': None},
+    'albion': {'celtic': AlbionFertility.celtic, 'roman': AlbionFertility.roman},
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    map_id      INTEGER PRIMARY KEY,
+    map_type    TEXT NOT NULL,
+    seed        INTEGER NOT NULL,
+    region      TEXT NOT NULL,
+    filename    TEXT,
+    imported    TEXT,
+    UNIQUE (map_type, seed, region)
+);
+CREATE TABLE IF NOT EXISTS islands (
+    map_id      INTEGER NOT NULL REFERENCES maps (map_id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    line        TEXT NOT NULL,
+    PRIMARY KEY (map_id, position)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    map_id      INTEGER NOT NULL REFERENCES maps (map_id) ON DELETE CASCADE,
+    coverage    TEXT NOT NULL,
+    method      TEXT NOT NULL,
+    score       REAL NOT NULL,
+    optimal     INTEGER NOT NULL DEFAULT 0,
+    islands     TEXT,
+    PRIMARY KEY (map_id, coverage, method)
+);
+CREATE INDEX IF NOT EXISTS maps_by_region ON maps (region, map_type);
+CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (coverage, method, score DESC);
+"""
+
+
+###########################################################################################
+#
+#   screening, which runs in worker processes
+#
+
+def make_problem(region: str, coverage: str, lines: list):
+    """
+    build a problem from stored .csv lines
+    """
+    solver_class, island_class = PROBLEMS[region]
+    problem = solver_class()
+    problem.the_list = [island_class.from_string(line) for line in lines]
+    if COVERAGES[region][coverage] is not None:
+        problem.set_coverage(COVERAGES[region][coverage]())
+    return problem
+
+
+def prefix_names(problem, solution: list) -> str:
+    return ','.join(island.island_name for island in solution[:problem.prefix_length(solution)])
+
+
+def screen_map(task: tuple) -> list:
+    """
+    bound, greedy and exact scores for one map and coverage
+    :param task: tuple of (map id, region, coverage, list of .csv lines, exact evaluation budget)
+    :return: list of score rows, (map id, coverage, method, score, optimal, islands)
+    """
+    map_id, region, coverage, lines, exact_budget = task
+    problem = make_problem(region, coverage, lines)
+
+    bound = problem.make_bound()
+    rv = [(map_id, coverage, 'bound', bound.global_bound, 0, None)]
+
+    exact = BranchAndBoundSolver(problem)
+    exact.max_evaluations = exact_budget
+    solution = exact.solve()
+    rv.append((map_id, coverage, 'greedy', exact.greedy_score, 0, None))
+    rv.append((map_id, coverage, 'exact', exact.best_score, int(exact.optimal), prefix_names(problem, solution)))
+    return rv
+
+
+def anneal_map(task: tuple) -> list:
+    """
+    full annealing solve for one map and coverage
+    :param task: tuple of (map id, region, coverage, list of .csv lines)
+    :return: list of score rows
+    """
+    map_id, region, coverage, lines = task
+    problem = make_problem(region, coverage, lines)
+    engine = SimulatedAnnealingSolver(problem)
+    solution = engine.solve()
+    return [(map_id, coverage, 'anneal', engine.best_score, int(engine.optimal), prefix_names(problem, solution))]
+
+
+###########################################################################################
+#
+#   The store
+#
+class SeedStore:
+    """
+    SQLite database of imported island maps and their scores
+    """
+
+    def __init__(self, filename: str = DEFAULT_DATABASE):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def import_file(self, filename: str) -> int:
+        """
+        import (or re-import) an island .csv file, any previous scores for the map are discarded
+        :return: the map id
+        """
+        match = FILENAME_PATTERN.match(os.path.basename(filename))
+        if match is None:
+            raise ValueError(f"[{filename}] isn't named like {{map type}}_seed{{seed}}_{{region}}.csv")
+
+        with open(filename, 'r') as file:
+            lines = [line.strip() for line in file if line[0] != '#' and line.strip()]
+
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM maps WHERE map_type = ? AND seed = ? AND region = ?',
+                (match['map_type'], int(match['seed']), match['region']))
+            cursor = self.connection.execute(
+                'INSERT INTO maps (map_type, seed, region, filename, imported) VALUES (?, ?, ?, ?, ?)',
+                (match['map_type'], int(match['seed']), match['region'], os.path.abspath(filename),
+                 datetime.datetime.now().isoformat(timespec='seconds')))
+            map_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO islands (map_id, position, line) VALUES (?, ?, ?)',
+                [(map_id, position, line) for position, line in enumerate(lines)])
+
+        return map_id
+
+    def lines(self, map_id: int) -> list:
+        return [line for line, in self.connection.execute(
+            'SELECT line FROM islands WHERE map_id = ? ORDER BY position', (map_id,))]
+
+    def maps_without(self, method: str, region: str, coverage: str, map_ids: list = None) -> list:
+        """
+        :return: list of map ids in the region which don't yet have a score from this method
+        """
+        rows = self.connection.execute(
+            'SELECT map_id FROM maps WHERE region = ? AND NOT EXISTS '
+            '(SELECT 1 FROM scores WHERE scores.map_id = maps.map_id AND coverage = ? AND method = ?)',
+            (region, coverage, method))
+        rv = [map_id for map_id, in rows]
+        if map_ids is not None:
+            wanted = set(map_ids)
+            rv = [map_id for map_id in rv if map_id in wanted]
+        return rv
+
+    def save_scores(self, rows: list):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO scores (map_id, coverage, method, score, optimal, islands) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def run(self, function, tasks: list, workers: int = None):
+        """
+        run screening tasks on a pool of worker processes, saving the scores as they arrive
+        """
+        if not tasks:
+            return
+        with multiprocessing.Pool(workers) as pool:
+            for count, rows in enumerate(pool.imap_unordered(function, tasks)):
+                self.save_scores(rows)
+                print(f"    {count + 1}/{len(tasks)}", end='\r')
+        print('')
+
+    def screen(self, region: str, coverage: str, exact_budget: int = 50000, workers: int = None):
+        """
+        bound, greedy and exact solve every map which hasn't been screened yet
+        """
+        tasks = [(map_id, region, coverage, self.lines(map_id), exact_budget)
+                 for map_id in self.maps_without('exact', region, coverage)]
+        if tasks:
+            print(f"Screening {len(tasks)} {region} maps, {coverage} coverage")
+        self.run(screen_map, tasks, workers)
+
+    def ranking(self, region: str, coverage: str, map_type: str = None, limit: int = None) -> list:
+        """
+        maps ranked by best known score
+        :return: list of dictionaries, best first
+        """
+        query = ('SELECT m.map_id, m.map_type, m.seed, '
+                 "MAX(CASE WHEN s.method != 'bound' THEN s.score END) AS best, "
+                 "MAX(CASE WHEN s.method = 'bound' THEN s.score END) AS bound, "
+                 'MAX(s.optimal) AS optimal, '
+                 "(SELECT islands FROM scores b WHERE b.map_id = m.map_id AND b.coverage = s.coverage "
+                 "AND b.method != 'bound' ORDER BY b.score DESC LIMIT 1) AS islands "
+                 'FROM maps m JOIN scores s ON s.map_id = m.map_id '
+                 'WHERE m.region = ? AND s.coverage = ?')
+        parameters = [region, coverage]
+        if map_type is not None:
+            query += ' AND m.map_type = ?'
+            parameters.append(map_type)
+        query += ' GROUP BY m.map_id ORDER BY best DESC, m.seed'
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+
+        columns = ['map_id', 'map_type', 'seed', 'best', 'bound', 'optimal', 'islands']
+        return [dict(zip(columns, row)) for row in self.connection.execute(query, parameters)]
+
+    def refine(self, region: str, coverage: str, shortlist: int, map_type: str = None, workers: int = None):
+        """
+        full anneal of the best 'shortlist' maps, other than any already solved exactly
+        maps further down the ranking are annealed too if their upper bound beats the shortlist's weakest score,
+        since their greedy or budget-limited exact score may be well short of their best, the rest never are
+        """
+        ranked = self.ranking(region, coverage, map_type)
+        if not ranked:
+            return
+        cutoff = ranked[min(shortlist, len(ranked)) - 1]['best']
+        candidates = [row['map_id'] for ndx, row in enumerate(ranked)
+                      if not row['optimal'] and (ndx < shortlist or row['bound'] > cutoff)]
+        tasks = [(map_id, region, coverage, self.lines(map_id))
+                 for map_id in self.maps_without('anneal', region, coverage, candidates)]
+        if tasks:
+            print(f"Annealing {len(tasks)} shortlisted {region} maps, {coverage} coverage")
+        self.run(anneal_map, tasks, workers)
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python SeedStore.py [--db FILE] import file.csv [file.csv ...]
+    #       python SeedStore.py [--db FILE] rank latium [--coverage C] [--map-type T] [--top N] [--shortlist K]
+    parser = argparse.ArgumentParser(description='Store island maps by seed, and rank seeds by best achievable score')
+    parser.add_argument('--db', default=DEFAULT_DATABASE, help=f"database file (default {DEFAULT_DATABASE})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='import island .csv files')
+    import_parser.add_argument('filenames', nargs='+', help='files named {map type}_seed{seed}_{region}.csv')
+
+    rank_parser = commands.add_parser('rank', help='screen any new maps, and rank them')
+    rank_parser.add_argument('region', choices=list(PROBLEMS.keys()))
+    rank_parser.add_argument('--coverage', help='albion: celtic or roman (default celtic)')
+    rank_parser.add_argument('--map-type', help='only rank maps of this type, e.g. corners')
+    rank_parser.add_argument('--top', type=int, default=20, help='number of maps to list (default 20)')
+    rank_parser.add_argument('--shortlist', type=int, default=5,
+                             help='number of best maps to refine with a full anneal (default 5)')
+    rank_parser.add_argument('--exact-budget', type=int, default=50000,
+                             help='max score evaluations for each exact solve (default 50000)')
+    rank_parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per cpu)')
+
+    args = parser.parse_args()
+    store = SeedStore(args.db)
+
+    if args.command == 'import':
+        for filename in args.filenames:
+            try:
+                store.import_file(filename)
+                print(f"Imported [{filename}]")
+            except (ValueError, OSError) as e:
+                print(f"Skipped: {e}")
+
+    else:
+        coverage = args.coverage or next(iter(COVERAGES[args.region]))
+        if coverage not in COVERAGES[args.region]:
+            parser.error(f"coverage for {args.region} must be one of {list(COVERAGES[args.region].keys())}")
+
+        store.screen(args.region, coverage, args.exact_budget, args.workers)
+        store.refine(args.region, coverage, args.shortlist, args.map_type, args.workers)
+
+        print(f"Best {args.region} maps, {coverage} coverage:")
+        print(f"    {'map type':<14} {'seed':>6} {'score':>7} {'bound':>7}  islands")
+        for row in store.ranking(args.region, coverage, args.map_type, args.top):
+            proven = '*' if row['optimal'] else ' '
+            print(f"    {row['map_type']:<14} {row['seed']:>6} {row['best']:>7.0f}{proven}{row['bound']:>7.0f}  "
+                  f"[{row['islands']}]")
+        print("    * = proven optimal")
+
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
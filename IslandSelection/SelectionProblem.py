@@ -0,0 +1,194 @@
+from InPlaceMoves import InPlaceMoves
+from RandomStream import RandomStream
+
+
+###########################################################################################
+#
+#   General purpose selection problem, i.e. find the best ordering of a list of items
+#
+class SelectionProblem:
+    """
+    Base class for problem definitions, which are solved by one of the search engines in Engines.py
+    child classes should
+        - define the array to be sorted
+        - specify the score() virtual function for a particular sequence of list members
+        - note that the search engines find high scores, i.e. maximums
+    list members should be distinct objects, since some engines identify them by id()
+    """
+
+    def __init__(self):
+        # the list of items to be sorted
+        self.the_list = list()
+
+        # search tuning parameters
+        # every engine spends the same budget of max_anneals * max_trials score() evaluations
+        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
+        self.max_trials = 1000      # max trials per annealing temperature
+        self.temperature = 500.0    # black art = pick this to be ~150% of a typical score change
+        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
+
+        # optional EliteArchive, to collect the best distinct solutions seen along the way
+        self.elite_archive = None
+
+        # optional ScoreCache, for child classes whose score() only depends on a prefix of the list
+        self.score_cache = None
+
+        # number of items at the start of the list which are locked in place, see pin()
+        self.pinned = 0
+
+        # source of random numbers for the search engines and the moves, replace with a seeded one for a repeatable solve
+        self.rng = RandomStream()
+
+    def score(self, candidate_list: list) -> float:
+        """
+        function to define the value or score of this particular list arrangement
+        """
+        raise NotImplementedError()
+
+    def item_key(self, item) -> str:
+        """
+        stable name for a list member, used to check a saved ordering still matches the list
+        """
+        return str(item)
+
+    def pin(self, keys: list, exclude: list = ()):
+        """
+        lock items in place at the start of the list, e.g. islands which have already been settled,
+        so the search engines only arrange the remaining items
+        :param keys: item_key() of the items to pin, in order
+        :param exclude: item_key() of items to leave out of the list altogether
+        """
+        by_key = {self.item_key(item): item for item in self.the_list}
+        for key in keys:
+            if key not in by_key:
+                raise ValueError(f"can't pin [{key}], it isn't in the list")
+
+        pinned = [by_key[key] for key in keys]
+        left_out = set(keys) | set(exclude)
+        self.the_list = pinned + [item for item in self.the_list if self.item_key(item) not in left_out]
+        self.pinned = len(pinned)
+
+    def perturb(self, the_list: list) -> list:
+        """
+        perturb_list(), leaving any pinned items alone
+        """
+        if self.pinned == 0:
+            return self.perturb_list(the_list)
+        if len(the_list) - self.pinned < 2:
+            return the_list
+        return the_list[:self.pinned] + self.perturb_list(the_list[self.pinned:])
+
+    def prefix_length(self, candidate_list: list) -> int:
+        """
+        number of leading list members which contribute to the score
+        child classes whose score() only looks at the start of the list should override this
+        """
+        return len(candidate_list)
+
+    def cache_key(self, candidate_list: list) -> tuple:
+        """
+        key for the score cache, which must identify everything score() depends on
+        by default, the items in the prefix which contribute to the score
+        """
+        return tuple(candidate_list[:self.prefix_length(candidate_list)])
+
+    def dominated_items(self) -> list:
+        """
+        list members which are dominated by another member, and so can be left out of the search
+        :return: list of (item, reason) tuples
+        """
+        return []
+
+    def make_moves(self) -> InPlaceMoves:
+        """
+        move generator used by the annealing engine, which changes the list in place rather than copying it
+        child classes which override perturb_list() should return a matching move generator
+        """
+        return InPlaceMoves(self.rng)
+
+    def make_bound(self):
+        """
+        optional bounding layer, used by the annealing engine to skip score() evaluations which can't be accepted
+        child classes which can cheaply bound their score() should return an object with
+            - upper_bound(candidate_list), never less than score(candidate_list)
+            - global_bound, never less than the score of any ordering
+        :return: the bound, or None if there isn't one
+        """
+        return None
+
+    def offer_to_archive(self, candidate_list: list, candidate_score: float):
+        """
+        offer a solution to the elite archive, if there is one
+        """
+        if self.elite_archive is not None and candidate_score > self.elite_archive.threshold():
+            prefix = candidate_list[:self.prefix_length(candidate_list)]
+            self.elite_archive.offer(candidate_score, prefix, candidate_list)
+
+    def perturb_list(self, the_list: list) -> list:
+        """
+        Take an existing list, and perturb it by
+            - taking a segment of list members beginning at a random list position,
+            - of random length,
+            - and inserting the segment back into the list at a new random position
+        :param the_list: the original list
+        :return: the perturbed list
+        """
+
+        # print("---")
+        # print(f"Initial List    : {the_list}")
+        # print(f"Length          : {len(the_list)}")
+
+        # pick a random segment to remove from current list, in range [0, my_list_len)
+        segment_start = self.rng.integers(0, len(the_list))
+        segment_length = self.rng.integers(1, len(the_list) - segment_start + 1)
+
+        # get the segment using slice syntax, and then remove it from original list
+        segment = the_list[segment_start:segment_start+segment_length]
+        del the_list[segment_start:segment_start+segment_length]
+
+        # print("---")
+        # print(f"Segment start   : {segment_start}")
+        # print(f"Segment length  : {segment_length}")
+        # print(f"Segment         : {segment}")
+        # print(f"Segment length  : {len(segment)}")
+        # print(f"Modified List   : {the_list}")
+        # print(f"Length          : {len(the_list)}")
+
+        # ensure new segment start isn't the old one, which would just put the segment back where it came from
+        new_segment_start = self.rng.integers(0, len(the_list) + 1)
+
+        # insert segment back into list in the new position
+        the_list = the_list[:new_segment_start] + segment + the_list[new_segment_start:]
+
+        # print("---")
+        # print(f"New Seg start   : {new_segment_start}")
+        # print(f"Modified List   : {the_list}")
+        # print(f"Length          : {len(the_list)}")
+
+        return the_list
+
+###########################################################################################
+#
+#
+class SimpleArraySolver(SelectionProblem):
+    """
+    Proof of concept problem
+    """
+    def __init__(self):
+        # call parent ctor
+        super().__init__()
+
+        # set up a basic array of numbers
+        # [0, 10, 20, ... 230, 240]
+        for i in range(25):
+            self.the_list.append(10 * i)
+
+    # define the virtual score() function
+    # this one simply defines the score as a weighted sum of the first 3 list values
+    # the perfect sorted order be [240, 230, 220, ...the rest doesn't matter]
+    def score(self, candidate_list: list) -> float:
+        rv = candidate_list[0] + 0.9 * candidate_list[1] + 0.8 * candidate_list[2]
+        return rv
+
+    def prefix_length(self, candidate_list: list) -> int:
+        return 3
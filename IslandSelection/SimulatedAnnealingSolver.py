@@ -1,37 +1,68 @@
 import math
+import os
+import time
 import numpy
 
+from SearchEngine import SearchEngine
+from SelectionProblem import SimpleArraySolver
+
 
 ###########################################################################################
 #
 #   General purpose Simulated Annealing solver
 #
-class SimulatedAnnealingSolver:
+class SimulatedAnnealingSolver(SearchEngine):
     """
-    Base class for Simulated Annealing Solver derived classes
-    child classes should
-        - define the array to be sorted
-        - specify the score() virtual function for a particular sequence of list members
+    Simulated Annealing search engine
+        - solves any SelectionProblem, using its score() function and the move generator from its make_moves()
+        - annealing schedule (temperature, cooling_rate, max_anneals, max_trials) comes from the problem
+        - pinned items at the start of the list (see SelectionProblem.pin()) are never moved
+        - if the problem has a bound (see SelectionProblem.make_bound()), trials which can't possibly be accepted
+          are rejected without calling score(), and the solve stops early if it reaches the global bound
         - note that this solver logic finds high scores, i.e. maximums
     """
 
-    def __init__(self):
-        # the list of items to be sorted
-        self.the_list = list()
+    name = 'anneal'
 
-        # simulated annealing solver tuning parameters
-        self.max_anneals = 200      # black art = set as approx log(.01/Temperature)/(log(coolingrate))
-        self.max_trials = 1000      # max trials per annealing temperature
-        self.temperature = 500.0    # black art = pick this to be ~150% of a typical score change
-        self.cooling_rate = 0.95    # a slower rate allows solution to better avoid local maxima to find a true maxima
+    def __init__(self, problem):
+        super().__init__(problem)
 
-    def score(self, candidate_list: list) -> float:
-        """
-        function to define the value or score of this particular list arrangement
-        """
-        raise NotImplementedError()
+        # annealing schedule, normally the problem's, but a warm start runs a shorter, cooler one
+        self.cooling_rate = problem.cooling_rate
+        self.max_anneals = problem.max_anneals
+
+        # current annealing temperature, and number of completed anneals
+        self.temperature = problem.temperature
+        self.anneal_counter = 0
+
+        # optional checkpoint file, written every 'checkpoint_interval' seconds and at the end of the solve
+        self.checkpoint_file = None
+        self.checkpoint_interval = 60.0
+
+        # the problem's random numbers, move generator and optional bounding layer, set up at the start of each solve
+        self.rng = None
+        self.moves = None
+        self.bound = None
+        self.global_bound = float('inf')
+
+        # number of trials rejected by the bound without being scored, and whether the solution is known to be optimal
+        self.pruned = 0
+        self.optimal = False
+
+        # number of scored trials which left the score unchanged, i.e. wasted evaluations
+        self.unchanged = 0
+
+    def start(self):
+        super().start()
+        self.rng = self.problem.rng
+        self.moves = self.problem.make_moves()
+        self.bound = self.problem.make_bound()
+        self.global_bound = self.bound.global_bound if self.bound is not None else float('inf')
+        self.pruned = 0
+        self.optimal = False
+        self.unchanged = 0
 
-    def solve(self) -> list:
+    def solve(self, resume: bool = False) -> list:
         """
         Simulated Annealing basic algorithm
             - start with initial random solution, and a high initial temperature T
@@ -42,112 +73,311 @@ class SimulatedAnnealingSolver:
             -           if new solution is better, accept it
             -           if new solution is worse, accept it based on probability P = exp(-DeltaE/T)
             -       cool the temperature according to a schedule, T_new = cooling_rate * T_old
+        :param resume: if True and the checkpoint file exists, continue from the checkpoint rather than starting over
         :return: optimized list
         """
-        current_score = self.score(self.the_list)
-
-        for anneal_counter in range(self.max_anneals):
-
-            # print(f"Outer loop: [{anneal_counter}] Temperature: [{self.temperature}]------------------------------------")
-            # print(f"{anneal_counter} ", end = '')
-            for trial_counter in range(self.max_trials):
-                perturbed_list = self.perturb_list(self.the_list.copy())
-                perturbed_score = self.score(perturbed_list)
-
-                accept = False
-                # if perturbed_score is better, accept the change
-                if perturbed_score > current_score:
-                    accept = True
-
-                # if perturbed_score is worse, maybe accept the change
-                elif perturbed_score < current_score:
-                    # this delta will be a negative value, which is needed
-                    delta_score = perturbed_score - current_score
-                    prob_acceptance = math.exp(delta_score / self.temperature)
-                    # print(f"prob: [{prob_acceptance}]")
-                    if numpy.random.rand() < prob_acceptance:
-                        accept = True
-
-                # if perturbed_score is unchanged, do not accept the change
-
-                # if accepted...
-                if accept:
-                    self.the_list = perturbed_list
-                    current_score = perturbed_score
-                    # print(f"New score: [{current_score}]")
+        problem = self.problem
+        self.start()
+        self.set_schedule(problem.temperature, problem.cooling_rate, problem.max_anneals)
 
-            # cool off the annealing process
-            self.temperature *= self.cooling_rate
+        # the problem's list at the start of the solve, checkpoints store orderings as indices into this list
+        base_list = problem.the_list
 
-        return self.the_list
+        if resume and self.checkpoint_file is not None and os.path.exists(self.checkpoint_file):
+            candidate_list, current_score = self.load_checkpoint(base_list)
+        else:
+            candidate_list = base_list
+            current_score = problem.score(candidate_list)
+            self.evaluations += 1
+            self.record(candidate_list, current_score)
 
-    @staticmethod
-    def perturb_list(the_list: list) -> list:
+        return self.anneal(base_list, candidate_list, current_score)
+
+    def warm_start(self, previous_list: list, added: list = (), removed: list = (), changed: list = (),
+                   temperature_fraction: float = 0.1, budget_fraction: float = 0.25) -> list:
         """
-        Take an existing list, and perturb it by
-            - taking a segment of list members beginning at a random list position,
-            - of random length,
-            - and inserting the segment back into the list at a new random position
-        :param the_list: the original list
-        :return: the perturbed list
+        re-solve after the set of items has changed, e.g. an island has been taken or corrected,
+        starting from the previous solution rather than from scratch
+            - the problem's the_list must already hold the new set of items
+            - repair the previous ordering: drop removed items, and insert added and changed items
+              wherever in the prefix they score best
+            - anneal from a fraction of the problem's initial temperature, down to the same final temperature
+              as a full solve, in a fraction of the anneals
+        :param previous_list: the previous solution
+        :param added: item_key() of the items which are new
+        :param removed: item_key() of the items which have gone
+        :param changed: item_key() of the items whose details have changed
+        :param temperature_fraction: starting temperature, as a fraction of the problem's initial temperature
+        :param budget_fraction: number of anneals, as a fraction of the problem's max_anneals
+        :return: optimized list
         """
+        problem = self.problem
+        self.start()
 
-        # print("---")
-        # print(f"Initial List    : {the_list}")
-        # print(f"Length          : {len(the_list)}")
+        anneals = max(int(problem.max_anneals * budget_fraction), 1)
+        initial_temperature = problem.temperature * temperature_fraction
+        final_temperature = problem.temperature * (problem.cooling_rate ** problem.max_anneals)
+        cooling_rate = (final_temperature / initial_temperature) ** (1.0 / anneals)
+        self.set_schedule(initial_temperature, min(cooling_rate, 1.0), anneals)
 
-        # pick a random segment to remove from current list, in range [0, my_list_len)
-        segment_start = numpy.random.randint(0, len(the_list))
-        segment_length = numpy.random.randint(1, len(the_list) - segment_start + 1)
+        base_list = problem.the_list
+        candidate_list, current_score = self.repair(previous_list, list(added) + list(changed), set(removed))
+        self.record(candidate_list, current_score)
 
-        # get the segment using slice syntax, and then remove it from original list
-        segment = the_list[segment_start:segment_start+segment_length]
-        del the_list[segment_start:segment_start+segment_length]
+        return self.anneal(base_list, candidate_list, current_score)
+
+    def repair(self, previous_list: list, reinsert: list, removed: set) -> tuple:
+        """
+        turn the previous solution into a good starting point for the problem's current list
+        :param previous_list: the previous solution
+        :param reinsert: item_key() of items to be placed wherever they score best
+        :param removed: item_key() of items to leave out
+        :return: tuple of (repaired list, its score)
+        """
+        problem = self.problem
+        current = {problem.item_key(item): item for item in problem.the_list}
+        reinsert = [key for key in reinsert if key in current]
+        skip = removed | set(reinsert)
+
+        # previous order, then anything the diff didn't mention
+        candidate_list = problem.the_list[:problem.pinned]
+        placed = {problem.item_key(item) for item in candidate_list}
+        for item in previous_list:
+            key = problem.item_key(item)
+            if key in current and key not in skip and key not in placed:
+                candidate_list.append(current[key])
+                placed.add(key)
+        candidate_list += [item for key, item in current.items() if key not in placed and key not in reinsert]
+
+        current_score = problem.score(candidate_list)
+        self.evaluations += 1
+
+        # greedy insertion, at each position up to the end of the covering prefix
+        for key in reinsert:
+            item = current[key]
+            best_list = None
+            best_score = -float('inf')
+            last_position = min(problem.prefix_length(candidate_list) + 1, len(candidate_list))
+            for position in range(problem.pinned, last_position + 1):
+                trial_list = candidate_list[:position] + [item] + candidate_list[position:]
+                trial_score = problem.score(trial_list)
+                self.evaluations += 1
+                if trial_score > best_score:
+                    best_list = trial_list
+                    best_score = trial_score
+            candidate_list = best_list
+            current_score = best_score
+
+        return candidate_list, current_score
+
+    def set_schedule(self, temperature: float, cooling_rate: float, max_anneals: int):
+        self.temperature = temperature
+        self.cooling_rate = cooling_rate
+        self.max_anneals = max_anneals
+        self.anneal_counter = 0
+
+    def anneal(self, base_list: list, candidate_list: list, current_score: float) -> list:
+        """
+        the anneal_counter loop, following the current schedule
+        :param base_list: the problem's list at the start of the solve, for checkpoints
+        :return: optimized list
+        """
+        problem = self.problem
+        last_checkpoint = time.perf_counter()
+        while self.anneal_counter < self.max_anneals and not self.optimal:
 
-        # print("---")
-        # print(f"Segment start   : {segment_start}")
-        # print(f"Segment length  : {segment_length}")
-        # print(f"Segment         : {segment}")
-        # print(f"Segment length  : {len(segment)}")
-        # print(f"Modified List   : {the_list}")
-        # print(f"Length          : {len(the_list)}")
+            # print(f"Outer loop: [{self.anneal_counter}] Temperature: [{self.temperature}]------------------------------------")
+            # print(f"{self.anneal_counter} ", end = '')
+            candidate_list, current_score, accepted = self.metropolis(candidate_list, current_score,
+                                                                      self.temperature, problem.max_trials)
 
-        # ensure new segment start isn't the old one, which would just put the segment back where it came from
-        new_segment_start = numpy.random.randint(0, len(the_list) + 1)
+            # cool off the annealing process
+            self.temperature *= self.cooling_rate
+            self.anneal_counter += 1
+            self.report_progress()
 
-        # insert segment back into list in the new position
-        the_list = the_list[:new_segment_start] + segment + the_list[new_segment_start:]
+            if self.checkpoint_file is not None and time.perf_counter() - last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint(base_list, candidate_list, current_score)
+                last_checkpoint = time.perf_counter()
 
-        # print("---")
-        # print(f"New Seg start   : {new_segment_start}")
-        # print(f"Modified List   : {the_list}")
-        # print(f"Length          : {len(the_list)}")
+        # final checkpoint, so resuming a finished solve just picks up the answer
+        if self.checkpoint_file is not None:
+            self.save_checkpoint(base_list, candidate_list, current_score)
 
-        return the_list
+        return self.finish()
 
-###########################################################################################
-#
-#
-class SimpleArraySolver(SimulatedAnnealingSolver):
-    """
-    Proof of concept solver
-    """
-    def __init__(self):
-        # call parent ctor
-        super().__init__()
-
-        # set up a basic array of numbers
-        # [0, 10, 20, ... 230, 240]
-        for i in range(25):
-            self.the_list.append(10 * i)
-
-    # define the virtual score() function
-    # this one simply defines the score as a weighted sum of the first 3 list values
-    # the perfect sorted order be [240, 230, 220, ...the rest doesn't matter]
-    def score(self, candidate_list: list) -> float:
-        rv = candidate_list[0] + 0.9 * candidate_list[1] + 0.8 * candidate_list[2]
+    def telemetry(self) -> dict:
+        rv = super().telemetry()
+        rv['pruned'] = self.pruned
+        rv['optimal'] = self.optimal
+        rv['unchanged'] = self.unchanged
         return rv
 
+    def report_telemetry(self):
+        super().report_telemetry()
+        if self.evaluations > 0:
+            print(f"        Moves: {self.unchanged / self.evaluations:.1%} of scored trials left the score unchanged")
+        if self.bound is not None:
+            print(f"        Bound: {self.pruned} trials rejected without scoring, global bound {self.global_bound:.0f}"
+                  f"{' reached, solution is optimal' if self.optimal else ''}")
+
+    def save_checkpoint(self, base_list: list, candidate_list: list, current_score: float):
+        """
+        write the full solver state to the checkpoint file
+            - current and best orderings, as indices into base_list
+            - temperature, anneal counter and evaluation count
+            - random number stream state, see RandomStream.get_state()
+            - elite archive contents
+        checkpoints are only taken between anneals, i.e. the trial counter is always 0
+        the file is written to a temporary name and then renamed, so an interruption never leaves a half-written checkpoint
+        """
+        problem = self.problem
+        position = {id(item): ndx for ndx, item in enumerate(base_list)}
+
+        def indices(the_list: list) -> numpy.ndarray:
+            return numpy.array([position[id(item)] for item in the_list], dtype=numpy.int32)
+
+        archive_solutions = []
+        archive_scores = []
+        if problem.elite_archive is not None:
+            for archive_score, solution in problem.elite_archive.solutions():
+                archive_scores.append(archive_score)
+                archive_solutions.append(indices(solution))
+
+        state = {
+            'item_keys': numpy.array([problem.item_key(item) for item in base_list]),
+            'current': indices(candidate_list),
+            'current_score': current_score,
+            'best': indices(self.best_list),
+            'best_score': self.best_score,
+            'temperature': self.temperature,
+            'cooling_rate': self.cooling_rate,
+            'max_anneals': self.max_anneals,
+            'anneal_counter': self.anneal_counter,
+            'trial_counter': 0,
+            'evaluations': self.evaluations,
+            'evaluations_to_best': self.evaluations_to_best,
+            'pruned': self.pruned,
+            'unchanged': self.unchanged,
+            'elapsed': time.perf_counter() - self.start_time,
+            'time_to_best': self.time_to_best,
+            **{f"rng_{name}": value for name, value in self.rng.get_state().items()},
+            'archive_scores': numpy.array(archive_scores, dtype=numpy.float64),
+            'archive_solutions': numpy.array(archive_solutions, dtype=numpy.int32).reshape(-1, len(base_list)),
+        }
+
+        # numpy appends .npz to any name which doesn't already end in it
+        temp_file = self.checkpoint_file + '.tmp.npz'
+        numpy.savez_compressed(temp_file, **state)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def load_checkpoint(self, base_list: list) -> tuple:
+        """
+        restore the full solver state from the checkpoint file
+        :param base_list: the problem's list at the start of the solve, must match the one the checkpoint was written from
+        :return: tuple of (current list, current score)
+        """
+        problem = self.problem
+        with numpy.load(self.checkpoint_file) as state:
+
+            item_keys = [problem.item_key(item) for item in base_list]
+            if list(state['item_keys']) != item_keys:
+                raise ValueError(f"checkpoint [{self.checkpoint_file}] was written for a different list of items")
+            if 'rng_generator' not in state:
+                raise ValueError(f"checkpoint [{self.checkpoint_file}] was written by an older version, start over without --resume")
+
+            candidate_list = [base_list[ndx] for ndx in state['current']]
+            current_score = float(state['current_score'])
+
+            self.best_list = [base_list[ndx] for ndx in state['best']]
+            self.best_score = float(state['best_score'])
+            self.temperature = float(state['temperature'])
+            self.cooling_rate = float(state['cooling_rate'])
+            self.max_anneals = int(state['max_anneals'])
+            self.anneal_counter = int(state['anneal_counter'])
+            self.evaluations = int(state['evaluations'])
+            self.evaluations_to_best = int(state['evaluations_to_best'])
+            self.pruned = int(state['pruned'])
+            self.unchanged = int(state['unchanged'])
+            self.time_to_best = float(state['time_to_best'])
+            self.start_time = time.perf_counter() - float(state['elapsed'])
+
+            self.rng.set_state({'generator': state['rng_generator'], 'buffer': state['rng_buffer'],
+                                'position': state['rng_position']})
+
+            if problem.elite_archive is not None:
+                for archive_score, solution in zip(state['archive_scores'], state['archive_solutions']):
+                    solution = [base_list[ndx] for ndx in solution]
+                    problem.offer_to_archive(solution, float(archive_score))
+
+        return candidate_list, current_score
+
+    def metropolis(self, candidate_list: list, current_score: float, temperature: float, trials: int) -> tuple:
+        """
+        run a fixed number of trials at a single temperature
+            -   trial_counter loop
+            -       determine a neighboring, perturbed solution
+            -       if new solution is better, accept it
+            -       if new solution is worse, accept it based on probability P = exp(-DeltaE/T)
+        The random number for the acceptance test is drawn before scoring, which turns the test into a threshold:
+        the new solution is accepted if its score beats current_score + T * ln(random).  If the problem's bound
+        shows the new solution can't beat the threshold, it is rejected without being scored.
+        Moves are made in place on a working copy of the list, and undone if the trial is rejected.
+        :param candidate_list: starting list, which isn't changed
+        :param current_score: score of the starting list
+        :param temperature: temperature T
+        :param trials: number of trials
+        :return: tuple of (resulting list, its score, number of accepted trials)
+        """
+        problem = self.problem
+        rng = self.rng
+        moves = self.moves
+        bound = self.bound
+        accepted = 0
+        scored = 0
+
+        # working list, which the moves change in place
+        candidate_list = candidate_list.copy()
+
+        for trial_counter in range(trials):
+            moves.apply(candidate_list, problem.pinned)
+
+            # the perturbed score has to beat this to be accepted
+            # better scores always do, worse ones do with probability P = exp(DeltaE/T)
+            u = rng.random()
+            threshold = current_score + temperature * math.log(u) if u > 0.0 else -float('inf')
+
+            # skip the full score if the perturbed list can't possibly beat the threshold
+            if bound is not None and bound.upper_bound(candidate_list) <= threshold:
+                moves.undo(candidate_list)
+                self.pruned += 1
+                continue
+
+            perturbed_score = problem.score(candidate_list)
+            scored += 1
+
+            # if perturbed_score is unchanged, do not accept the change
+            if perturbed_score == current_score:
+                moves.undo(candidate_list)
+                self.unchanged += 1
+            elif perturbed_score <= threshold:
+                moves.undo(candidate_list)
+            else:
+                current_score = perturbed_score
+                accepted += 1
+                if current_score > self.best_score or problem.elite_archive is not None:
+                    self.evaluations += scored
+                    scored = 0
+                    self.record(candidate_list, current_score)
+
+                # nothing can beat the global bound, so stop here
+                if current_score >= self.global_bound:
+                    self.optimal = True
+                    break
+
+        self.evaluations += scored
+        return candidate_list, current_score, accepted
+
 
 ###########################################################################################
 #
@@ -158,13 +388,20 @@ def main():
     my_list = simple_solver.the_list
     print(f"Initial List   [{len(my_list)}]    : {my_list}")
 
-    my_list = simple_solver.solve()
+    annealing = SimulatedAnnealingSolver(simple_solver)
+    my_list = annealing.solve()
     print(f"Final List     [{len(my_list)}]    : {my_list}")
+    annealing.report_telemetry()
 
+    # what if the best member was no longer available
+    simple_solver.the_list = [item for item in my_list if item != 240]
+    my_list = annealing.warm_start(my_list, removed=['240'])
+    print(f"Without 240    [{len(my_list)}]    : {my_list}")
+    annealing.report_telemetry()
 
     print("Done")
 
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,457 @@
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy
+
+from AlbionSolver import AlbionSolver, AlbionFertility
+from EliteArchive import EliteArchive
+from Engines import ENGINES
+from LatiumSolver import LatiumSolver
+from ParallelTemperingSolver import ParallelTemperingSolver
+from RandomStream import RandomStream
+
+
+###########################################################################################
+#
+#   Long-lived local solver service
+#
+#   Keeps parsed island maps in memory and runs solver jobs on a pool of worker processes which
+#   are started once, so repeated queries pay neither the python/numpy startup cost nor the .csv parsing cost.
+#   Listens on localhost only.
+#
+#   POST /solve         submit a job, and stream its progress and result back in the same response
+#   POST /jobs          submit a job, returns {"job_id": N}
+#   GET  /jobs/N        stream the progress and result of a job
+#   GET  /status        service statistics
+#
+#   Job requests are JSON objects:
+#       region      'latium' or 'albion'
+#       filename    island .csv file, as seen from the service
+#       coverage    albion only: 'all', 'celtic' or 'roman', default 'all'
+#       engine      search engine name, default 'anneal'
+#       exclude     list of island names to leave out, e.g. islands already taken by someone else
+#       pin         list of island names already settled, which are kept first, in this order
+#       top         number of alternative island sets to report, default 0
+#       seed        random seed, for a repeatable answer, default: a stream of its own from the service's seed
+#
+#   Responses are streamed as one JSON object per line, each with an 'event' field of 'progress', 'result' or 'error'
+#
+#   Only the most recent finished jobs are kept, DEFAULT_KEEP_JOBS unless 'serve --keep-jobs N' says otherwise, so
+#   a long running service doesn't grow without limit.  GET /jobs/N for a job which has been dropped returns 404
+#
+
+REGIONS = {
+    'latium': LatiumSolver,
+    'albion': AlbionSolver,
+}
+
+COVERAGE = {
+    'all': AlbionFertility.all_fertilities,
+    'celtic': AlbionFertility.celtic,
+    'roman': AlbionFertility.roman,
+}
+
+# number of finished jobs, with their events, kept for GET /jobs/N
+DEFAULT_KEEP_JOBS = 100
+
+
+###########################################################################################
+#
+#   worker process side
+#
+
+# queue for progress events, (job id, event dictionary), shared by all worker processes
+_progress_queue = None
+
+
+def _init_worker(progress_queue: multiprocessing.Queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    # ctrl-c is for the service process, which shuts the workers down cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_job(job_id: int, request: dict, islands: list, seed) -> dict:
+    """
+    solve one job, in a worker process
+    :param seed: int or numpy SeedSequence for the job's random numbers
+    :return: result event dictionary
+    """
+    problem = REGIONS[request['region']]()
+    problem.rng = RandomStream(seed)
+    problem.filename = request['filename']
+    excluded = set(request.get('exclude', []))
+    problem.the_list = [island for island in islands if island.island_name not in excluded]
+    if isinstance(problem, AlbionSolver):
+        problem.set_coverage(COVERAGE[request.get('coverage', 'all')]())
+    problem.pin(request.get('pin', []))
+
+    top = int_field(request, 'top', 0)
+    if top > 0:
+        problem.elite_archive = EliteArchive(top)
+
+    # worker processes can't start pools of their own, so tempering replicas run in this process
+    engine_name = request.get('engine', 'anneal')
+    if engine_name == ParallelTemperingSolver.name:
+        engine = ParallelTemperingSolver(problem, num_processes=1)
+    else:
+        engine = ENGINES[engine_name](problem)
+
+    def progress(fields: dict):
+        fields['event'] = 'progress'
+        _progress_queue.put((job_id, fields))
+    engine.progress_callback = progress
+
+    solution = engine.solve()
+    prefix = solution[:problem.prefix_length(solution)]
+
+    rv = {
+        'event': 'result',
+        'islands': [island.island_name for island in prefix],
+        'score': problem.score(solution),
+        'ordering': [island.island_name for island in solution],
+        'telemetry': engine.telemetry(),
+    }
+    if problem.elite_archive is not None:
+        rv['alternatives'] = [
+            {'islands': [island.island_name for island in alternative[:problem.prefix_length(alternative)]],
+             'score': alternative_score}
+            for alternative_score, alternative in problem.elite_archive.solutions()
+        ]
+    return rv
+
+
+###########################################################################################
+#
+#   Cache of parsed island maps
+#
+class MapCache:
+    """
+    Parsed island lists, keyed by (region, filename)
+    a map is re-read only if its file has been modified since it was last loaded
+    """
+
+    def __init__(self):
+        # (region, filename) -> (file modification time, list of islands)
+        self.maps = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, region: str, filename: str) -> list:
+        filename = os.path.abspath(filename)
+        mtime = os.path.getmtime(filename)
+        key = (region, filename)
+
+        with self.lock:
+            cached = self.maps.get(key)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+
+            self.misses += 1
+            problem = REGIONS[region]()
+            problem.set_filename(filename)
+            self.maps[key] = (mtime, problem.the_list)
+            return problem.the_list
+
+
+###########################################################################################
+#
+#   A submitted job, and the events it has produced so far
+#
+class Job:
+
+    def __init__(self, job_id: int, request: dict):
+        self.job_id = job_id
+        self.request = request
+        self.events = []
+        self.done = False
+        self.condition = threading.Condition()
+
+    def add_event(self, event: dict, done: bool = False):
+        with self.condition:
+            self.events.append(event)
+            self.done = self.done or done
+            self.condition.notify_all()
+
+    def stream(self):
+        """
+        generator of events, blocks until new events arrive, finishes after the result or error event
+        """
+        sent = 0
+        while True:
+            with self.condition:
+                while sent == len(self.events) and not self.done:
+                    self.condition.wait()
+                new_events = self.events[sent:]
+                done = self.done
+            for event in new_events:
+                yield event
+            sent += len(new_events)
+            if done and sent == len(self.events):
+                return
+
+
+###########################################################################################
+#
+#   The service
+#
+class SolverService:
+    """
+    Owns the map cache, the worker pool and the list of jobs
+    """
+
+    def __init__(self, num_workers: int = None, seed: int = None, keep_jobs: int = DEFAULT_KEEP_JOBS):
+        self.map_cache = MapCache()
+
+        # jobs without a seed of their own each get an independent child stream of this one
+        self.seed_sequence = numpy.random.SeedSequence(seed)
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+        # ids of finished jobs, oldest first, the oldest are dropped from self.jobs beyond keep_jobs
+        self.finished = collections.deque()
+        self.keep_jobs = keep_jobs
+
+        self.progress_queue = multiprocessing.Queue()
+        self.pool = multiprocessing.Pool(num_workers, initializer=_init_worker, initargs=(self.progress_queue,))
+
+        # route progress events from the worker processes to their jobs
+        self.dispatcher = threading.Thread(target=self._dispatch_progress, daemon=True)
+        self.dispatcher.start()
+
+    def _dispatch_progress(self):
+        while True:
+            item = self.progress_queue.get()
+            if item is None:
+                return
+            job_id, event = item
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.add_event(event)
+
+    def submit(self, request: dict) -> Job:
+        """
+        validate a job request, and queue it onto the worker pool
+        """
+        region = request.get('region')
+        if region not in REGIONS:
+            raise ValueError(f"unknown region [{region}], expected one of {list(REGIONS.keys())}")
+        if request.get('engine', 'anneal') not in ENGINES:
+            raise ValueError(f"unknown engine [{request.get('engine')}], expected one of {list(ENGINES.keys())}")
+        if request.get('coverage', 'all') not in COVERAGE:
+            raise ValueError(f"unknown coverage [{request.get('coverage')}], expected one of {list(COVERAGE.keys())}")
+        # check everything before the job is registered, so a rejected request never shows up as running
+        seed = int_field(request, 'seed')
+        int_field(request, 'top', 0)
+
+        islands = self.map_cache.get(region, request['filename'])
+
+        with self.lock:
+            job = Job(next(self.job_ids), request)
+            self.jobs[job.job_id] = job
+            if seed is None:
+                seed = self.seed_sequence.spawn(1)[0]
+
+        self.pool.apply_async(_run_job, (job.job_id, request, islands, seed),
+                              callback=lambda result: self._finish(job, result),
+                              error_callback=lambda error: self._finish(job, {'event': 'error', 'error': str(error)}))
+        return job
+
+    def _finish(self, job: Job, event: dict):
+        """
+        record a job's last event, and drop the oldest finished jobs beyond keep_jobs
+        anyone already streaming a dropped job still gets all of its events
+        """
+        job.add_event(event, done=True)
+        with self.lock:
+            self.finished.append(job.job_id)
+            while len(self.finished) > self.keep_jobs:
+                self.jobs.pop(self.finished.popleft(), None)
+
+    def status(self) -> dict:
+        with self.lock:
+            running = sum(1 for job in self.jobs.values() if not job.done)
+            return {
+                'jobs': len(self.jobs),
+                'running': running,
+                'maps': [{'region': region, 'filename': filename} for region, filename in self.map_cache.maps],
+                'map_cache_hits': self.map_cache.hits,
+                'map_cache_misses': self.map_cache.misses,
+            }
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.progress_queue.put(None)
+
+
+def int_field(request: dict, name: str, default: int = None) -> int:
+    """
+    :return: the request's integer field, or the default if it is missing or null
+    :raises ValueError: if the field isn't an integer
+    """
+    value = request.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"[{name}] must be an integer, got [{value}]") from None
+
+
+class SolverRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP front end for the SolverService
+    """
+
+    # set by serve()
+    service: SolverService = None
+
+    def _send_json(self, code: int, body: dict):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, job: Job):
+        # HTTP/1.0 style response, the end of the stream is marked by closing the connection
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        for event in job.stream():
+            self.wfile.write((json.dumps(event) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+    def _read_request(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        if self.path not in ('/solve', '/jobs'):
+            self._send_json(404, {'event': 'error', 'error': f"unknown path [{self.path}]"})
+            return
+
+        try:
+            job = self.service.submit(self._read_request())
+        except (ValueError, KeyError, OSError) as e:
+            self._send_json(400, {'event': 'error', 'error': str(e)})
+            return
+
+        if self.path == '/solve':
+            self._stream(job)
+        else:
+            self._send_json(200, {'job_id': job.job_id})
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._send_json(200, self.service.status())
+        elif self.path.startswith('/jobs/'):
+            job = self.service.jobs.get(int(self.path[len('/jobs/'):])) if self.path[len('/jobs/'):].isdigit() else None
+            if job is None:
+                self._send_json(404, {'event': 'error', 'error': f"unknown job [{self.path}]"})
+            else:
+                self._stream(job)
+        else:
+            self._send_json(404, {'event': 'error', 'error': f"unknown path [{self.path}]"})
+
+    def log_message(self, format, *args):
+        # keep stdout quiet, one line per request is plenty
+        pass
+
+
+def serve(port: int, num_workers: int = None, seed: int = None, keep_jobs: int = DEFAULT_KEEP_JOBS):
+    service = SolverService(num_workers, seed, keep_jobs)
+    SolverRequestHandler.service = service
+    server = ThreadingHTTPServer(('127.0.0.1', port), SolverRequestHandler)
+    print(f"Solver service listening on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def submit(port: int, request: dict):
+    """
+    client side: send a job to a running service, and print its progress and result
+    """
+    data = json.dumps(request).encode('utf-8')
+    http_request = urllib.request.Request(f"http://127.0.0.1:{port}/solve", data=data,
+                                          headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(http_request) as response:
+        for line in response:
+            event = json.loads(line)
+            if event['event'] == 'progress':
+                print(f"    {event['evaluations']}/{event['max_evaluations']} evaluations, "
+                      f"best score {event['best_score']:.0f}", end='\r')
+            elif event['event'] == 'result':
+                print(f"\nIslands: [{', '.join(event['islands'])}] (Score = {event['score']:.0f})")
+                for rank, alternative in enumerate(event.get('alternatives', [])):
+                    print(f"    [{rank+1}] Islands: [{', '.join(alternative['islands'])}] (Score = {alternative['score']:.0f})")
+            else:
+                print(f"\nError: {event['error']}")
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python SolverService.py serve [--port P] [--workers N] [--seed N] [--keep-jobs N]
+    #       python SolverService.py solve latium inputfile.csv [--engine E] [--coverage C] [--exclude A,B] [--pin C,D] [--top K] [--seed N]
+    parser = argparse.ArgumentParser(description='Local island solver service')
+    parser.add_argument('--port', type=int, default=8117, help='localhost port (default 8117)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='run the service')
+    serve_parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per cpu)')
+    serve_parser.add_argument('--seed', type=int, default=None,
+                              help='seed for the streams of jobs which have no seed of their own (default: unseeded)')
+    serve_parser.add_argument('--keep-jobs', type=int, default=DEFAULT_KEEP_JOBS,
+                              help=f'number of finished jobs kept for GET /jobs/N (default {DEFAULT_KEEP_JOBS})')
+
+    solve_parser = commands.add_parser('solve', help='send a job to a running service')
+    solve_parser.add_argument('region', choices=list(REGIONS.keys()))
+    solve_parser.add_argument('filename', help='island .csv file')
+    solve_parser.add_argument('--engine', choices=list(ENGINES.keys()), default='anneal')
+    solve_parser.add_argument('--coverage', choices=list(COVERAGE.keys()), default='all')
+    solve_parser.add_argument('--exclude', default='', help='comma separated island names to leave out')
+    solve_parser.add_argument('--pin', default='', help='comma separated island names already settled, kept first')
+    solve_parser.add_argument('--top', type=int, default=0)
+    solve_parser.add_argument('--seed', type=int, default=None, help='random seed, for a repeatable answer')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args.port, args.workers, args.seed, args.keep_jobs)
+    else:
+        submit(args.port, {
+            'region': args.region,
+            'filename': os.path.abspath(args.filename),
+            'engine': args.engine,
+            'coverage': args.coverage,
+            'exclude': [name for name in args.exclude.split(',') if name],
+            'pin': [name for name in args.pin.split(',') if name],
+            'top': args.top,
+            'seed': args.seed,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+from SearchEngine import SearchEngine
+from SelectionProblem import SelectionProblem, SimpleArraySolver
+
+
+###########################################################################################
+#
+#   Tabu Search solver
+#
+class TabuSearchSolver(SearchEngine):
+    """
+    Tabu Search engine
+        - solves any SelectionProblem, using its score(), perturb() and prefix_length() functions
+        - each iteration samples 'neighborhood_size' perturbed neighbors of the current solution,
+          and always moves to the best of them, even if it is worse than the current solution
+        - recently visited solutions are tabu for 'tabu_tenure' iterations, which stops the search from cycling
+          straight back up the hill it just came down.  Solutions are identified by their covering prefix
+        - a tabu solution is still allowed if it beats the best solution seen so far (aspiration)
+    """
+
+    name = 'tabu'
+
+    def __init__(self, problem: SelectionProblem, neighborhood_size: int = 50, tabu_tenure: int = 25):
+        super().__init__(problem)
+        self.neighborhood_size = neighborhood_size
+        self.tabu_tenure = tabu_tenure
+
+        # number of iterations, so the whole search fits in the evaluation budget
+        self.max_iterations = max((self.max_evaluations - 1) // self.neighborhood_size, 1)
+
+        # count of neighbors skipped because they were tabu
+        self.tabu_rejections = 0
+
+    def prefix_key(self, candidate_list: list) -> tuple:
+        return tuple(candidate_list[:self.problem.prefix_length(candidate_list)])
+
+    def solve(self) -> list:
+        """
+        Tabu Search basic algorithm
+            - start with the initial solution
+            -   iteration loop
+            -       sample a neighborhood of perturbed solutions
+            -       move to the best one which isn't tabu, or which is tabu but beats the best seen so far
+            -       make the new solution tabu for the next 'tabu_tenure' iterations
+        :return: optimized list
+        """
+        problem = self.problem
+        self.start()
+        self.tabu_rejections = 0
+
+        current_list = problem.the_list
+        current_score = problem.score(current_list)
+        self.evaluations += 1
+        self.record(current_list, current_score)
+
+        # key -> iteration at which the tabu expires
+        tabu_until = {self.prefix_key(current_list): self.tabu_tenure}
+
+        for iteration in range(self.max_iterations):
+
+            best_neighbor = None
+            best_neighbor_score = -float('inf')
+            best_neighbor_key = None
+
+            for trial_counter in range(self.neighborhood_size):
+                neighbor = problem.perturb(current_list.copy())
+                neighbor_score = problem.score(neighbor)
+
+                if neighbor_score > best_neighbor_score:
+                    key = self.prefix_key(neighbor)
+                    if tabu_until.get(key, -1) > iteration and neighbor_score <= self.best_score:
+                        self.tabu_rejections += 1
+                        continue
+                    best_neighbor = neighbor
+                    best_neighbor_score = neighbor_score
+                    best_neighbor_key = key
+
+            self.evaluations += self.neighborhood_size
+            if iteration % 20 == 0:
+                self.report_progress()
+
+            # every neighbor was tabu
+            if best_neighbor is None:
+                continue
+
+            current_list = best_neighbor
+            current_score = best_neighbor_score
+            tabu_until[best_neighbor_key] = iteration + self.tabu_tenure
+            self.record(current_list, current_score)
+
+            # forget expired entries every so often, so the tabu list doesn't grow without bound
+            if len(tabu_until) > 4 * self.tabu_tenure:
+                tabu_until = {key: expiry for key, expiry in tabu_until.items() if expiry > iteration}
+
+        return self.finish()
+
+    def telemetry(self) -> dict:
+        rv = super().telemetry()
+        rv['tabu_rejections'] = self.tabu_rejections
+        return rv
+
+
+###########################################################################################
+#
+#
+def main():
+
+    simple_solver = SimpleArraySolver()
+    my_list = simple_solver.the_list
+    print(f"Initial List   [{len(my_list)}]    : {my_list}")
+
+    tabu = TabuSearchSolver(simple_solver)
+    my_list = tabu.solve()
+    print(f"Final List     [{len(my_list)}]    : {my_list}")
+    tabu.report_telemetry()
+
+    print("Done")
+
+
+if __name__ == '__main__':
+    main()
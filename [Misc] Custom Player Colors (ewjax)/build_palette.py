@@ -0,0 +1,440 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from xml.sax.saxutils import escape
+
+
+###########################################################################################
+#
+#   Build the mod files from the palette spec, palette.json
+#
+#   Generated:
+#       data/base/config/export/assets.xml      ParticipantColor assets, their registration under GUID 2002447,
+#                                               and the NPC DefaultColor merges
+#       data/base/config/gui/texts_english.xml  color names
+#       modinfo.json                            the "Options" section, everything else in the file is left alone
+#
+#   The Portraits from 1800 mod started as a copy of this one and still ships its own copy of the color
+#   assets, that copy isn't generated from palette.json, so it won't pick up palette changes.
+#
+#   Each output is only rewritten if its content has changed, by comparing content hashes, so file
+#   timestamps only move when something really changed.  Writes go to a temp file which is then renamed
+#   over the old one, so an interrupted build never leaves a half-written file behind.
+#
+#   palette.json:
+#       {
+#         "groups": [
+#           {"title": "custom colors from ewjax", "colors": [
+#             {"guid": 2000101000, "text": "Bright Red", "name": "ParticipantColorCustomBrightRed",
+#              "id": "PARTICIPANT_CUSTOM_COLOR_BRIGHT_RED", "ui": "#FF0000", "in_game": "#CC0000"}
+#           ]}
+#         ],
+#         "npcs": [
+#           {"guid": 2000101100, "name": "Custom Diana Colour", "participant": 32777, "ui": "#AAAAAA", "in_game": "#CF8C9A"}
+#         ],
+#         "options": {}
+#       }
+#   colors are "#RRGGBB", "#RRGGBBAA" or the signed ARGB int the game uses
+#   "ui" and "in_game" may also be a dictionary of colors by vision mode, e.g. {"None": "#FF0000", "Protanopia": "#FFAA00"},
+#   any vision mode which isn't given uses the "None" color
+#   "in_game" defaults to the "ui" color, "text", "id" and "comment" are optional
+#   "ui_comment" and "in_game_comment" are optional notes written just before the <ParticipantUIColor> and
+#   <ParticipantInGameColor> blocks, e.g. which parts of the game use them
+#   "locked" is the dictionary of <Locked> values, e.g. {"Scope": "Account"}, false for no <Locked> block,
+#   it defaults to DEFAULT_LOCKED
+#   "options" is copied into modinfo.json as-is, except that an option "default" which looks like a color is
+#   converted to the int string the mod loader expects.  The palette's "default" is only the starting value, an
+#   option which modinfo.json already has keeps its default, so the ones set by custom_colour_picker.py survive
+#   a rebuild.  If "options" is empty the "Options" section in modinfo.json is left alone
+#
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PALETTE_PATH = os.path.join(BASE_DIR, 'palette.json')
+ASSETS_PATH = os.path.join(BASE_DIR, 'data', 'base', 'config', 'export', 'assets.xml')
+TEXTS_PATH = os.path.join(BASE_DIR, 'data', 'base', 'config', 'gui', 'texts_english.xml')
+MODINFO_PATH = os.path.join(BASE_DIR, 'modinfo.json')
+
+# the asset which holds the list of participant colors
+COLOR_LIST_GUID = 2002447
+COLOR_LIST_PATH = '/Values/ParticipantRepresentationFeature/ParticipantColors'
+
+VISION_MODES = ('Deuteranopia', 'Protanopia', 'Tritanopia', 'None')
+
+# <Locked> values for colors which don't give their own
+DEFAULT_LOCKED = {'DefaultLockedState': 0, 'Scope': 'Account', 'VisibleWhenLocked': 1}
+
+HEX_COLOR = re.compile(r'^#?([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})?$')
+
+
+def to_int(color) -> int:
+    """
+    convert a color to the signed ARGB int used in assets.xml, the same as hex2int() in colorpicker.html
+    :param color: "#RRGGBB", "#RRGGBBAA", or an int, which is passed through
+    """
+    if isinstance(color, int):
+        return color
+    match = HEX_COLOR.match(str(color).strip())
+    if match is None:
+        raise ValueError(f"[{color}] is not a color, expected #RRGGBB, #RRGGBBAA or an int")
+    r, g, b = (int(match[ndx], 16) for ndx in (1, 2, 3))
+    a = int(match[4], 16) if match[4] else 255
+    value = (a << 24) | (r << 16) | (g << 8) | b
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def to_hex(value: int) -> str:
+    """
+    convert a signed ARGB int to "#RRGGBB", or "#RRGGBBAA" if it isn't opaque
+    """
+    value &= 0xFFFFFFFF
+    rv = f"#{value & 0xFFFFFF:06X}"
+    alpha = value >> 24
+    return rv if alpha == 0xFF else f"{rv}{alpha:02X}"
+
+
+def vision_colors(color) -> dict:
+    """
+    :param color: a color, or a dictionary of colors by vision mode
+    :return: vision mode -> signed ARGB int, for every vision mode
+    """
+    if not isinstance(color, dict):
+        return {mode: to_int(color) for mode in VISION_MODES}
+    unknown = set(color) - set(VISION_MODES)
+    if unknown:
+        raise ValueError(f"unknown vision modes {sorted(unknown)}, expected {list(VISION_MODES)}")
+    if 'None' not in color:
+        raise ValueError(f"vision mode colors {color} must include 'None'")
+    return {mode: to_int(color.get(mode, color['None'])) for mode in VISION_MODES}
+
+
+def load_palette(filename: str = PALETTE_PATH) -> dict:
+    """
+    read and check the palette spec
+    """
+    with open(filename, 'r', encoding='utf-8') as file:
+        palette = json.load(file)
+
+    palette.setdefault('groups', [])
+    palette.setdefault('npcs', [])
+    palette.setdefault('options', {})
+
+    seen = set()
+    for color in all_colors(palette):
+        for field in ('guid', 'name', 'ui'):
+            if field not in color:
+                raise ValueError(f"color {color} has no [{field}]")
+        if color['guid'] in seen:
+            raise ValueError(f"GUID [{color['guid']}] is used more than once")
+        seen.add(color['guid'])
+        # check the colors now, rather than part way through writing the outputs
+        vision_colors(color['ui'])
+        vision_colors(color.get('in_game', color['ui']))
+        locked = color.get('locked', DEFAULT_LOCKED)
+        if locked is not False and not isinstance(locked, dict):
+            raise ValueError(f"color [{color['guid']}] has [locked] {color['locked']}, expected a dictionary or false")
+    for color in palette['npcs']:
+        if 'participant' not in color:
+            raise ValueError(f"NPC color [{color['guid']}] has no [participant]")
+
+    return palette
+
+
+def palette_text(palette: dict) -> str:
+    """
+    :return: contents of palette.json, one color per line
+    """
+    groups = []
+    for group in palette['groups']:
+        colors = ',\n'.join(f"      {json.dumps(color, ensure_ascii=False)}" for color in group['colors'])
+        groups.append(f"    {{\"title\": {json.dumps(group['title'], ensure_ascii=False)}, \"colors\": [\n{colors}\n    ]}}")
+    npcs = ',\n'.join(f"    {json.dumps(color, ensure_ascii=False)}" for color in palette['npcs'])
+    options = json.dumps(palette['options'], indent=2, ensure_ascii=False).replace('\n', '\n  ')
+
+    lines = ['{',
+             '  "groups": [',
+             ',\n'.join(groups),
+             '  ],',
+             '  "npcs": [',
+             npcs,
+             '  ],',
+             f'  "options": {options}',
+             '}']
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+def save_palette(palette: dict, filename: str = PALETTE_PATH) -> bool:
+    """
+    write the palette spec back out, e.g. after adding generated colors
+    :return: True if the file changed
+    """
+    return write_if_changed(filename, palette_text(palette))
+
+
+def all_colors(palette: dict) -> list:
+    """
+    :return: list of every color in the palette, player colors first
+    """
+    return [color for group in palette['groups'] for color in group['colors']] + palette['npcs']
+
+
+###########################################################################################
+#
+#   output generation
+#
+
+def comment_text(text: str) -> str:
+    """
+    text made safe for an xml comment, which may not contain '--'
+    """
+    text = escape(text)
+    while '--' in text:
+        text = text.replace('--', '-')
+    return text
+
+
+def color_asset(color: dict, indent: str, player: bool) -> list:
+    """
+    :return: list of lines for one ParticipantColor asset
+    """
+    ui = vision_colors(color['ui'])
+    in_game = vision_colors(color.get('in_game', color['ui']))
+
+    rv = [f"<!-- {comment_text(color.get('comment', 'Custom color ' + color.get('text', color['name'])))} -->",
+          '<Asset>',
+          '    <Template>ParticipantColor</Template>',
+          '    <Values>',
+          '        <Standard>',
+          f"            <GUID>{color['guid']}</GUID>",
+          f"            <Name>{escape(color['name'])}</Name>"]
+    if 'id' in color:
+        rv.append(f"            <ID>{escape(color['id'])}</ID>")
+    rv += ['        </Standard>',
+           '        <ParticipantColor>']
+    if 'ui_comment' in color:
+        rv.append(f"            <!-- {comment_text(color['ui_comment'])} -->")
+    rv.append('            <ParticipantUIColor>')
+    rv += [f"                <{mode}>{ui[mode]}</{mode}>" for mode in VISION_MODES]
+    rv.append('            </ParticipantUIColor>')
+    if 'in_game_comment' in color:
+        rv.append(f"            <!-- {comment_text(color['in_game_comment'])} -->")
+    rv.append('            <ParticipantInGameColor>')
+    rv += [f"                <{mode}>{in_game[mode]}</{mode}>" for mode in VISION_MODES]
+    rv.append('            </ParticipantInGameColor>')
+    if player:
+        rv.append('            <IsPlayerColor>1</IsPlayerColor>')
+    rv.append('        </ParticipantColor>')
+    locked = color.get('locked', DEFAULT_LOCKED)
+    if locked:
+        rv.append('        <Locked>')
+        rv += [f"            <{key}>{escape(str(value))}</{key}>" for key, value in locked.items()]
+        rv.append('        </Locked>')
+    if 'text' in color:
+        rv += ['        <Text>',
+               f"            <OasisId>{color['guid']}</OasisId>",
+               '        </Text>']
+    else:
+        rv.append('        <Text />')
+    rv += ['    </Values>',
+           '</Asset>']
+    return [indent + line for line in rv]
+
+
+def build_assets(palette: dict) -> str:
+    """
+    :return: contents of assets.xml
+    """
+    lines = ['<ModOps>',
+             '',
+             '    <!-- START: ============================ Register custom colors ========================= -->',
+             f'    <ModOp Type="add" GUID="{COLOR_LIST_GUID}"',
+             f'        Path="{COLOR_LIST_PATH}">']
+    for group in palette['groups']:
+        lines.append(f"        <!-- =================== {comment_text(group['title'])} =================== -->")
+        for color in group['colors']:
+            lines += ['        <Item>', f"            <Color>{color['guid']}</Color>", '        </Item>']
+        lines.append('')
+    if palette['npcs']:
+        lines.append('        <!-- =================== custom NPC colors =================== -->')
+        for color in palette['npcs']:
+            lines += ['        <Item>', f"            <Color>{color['guid']}</Color>", '        </Item>']
+        lines.append('')
+    lines += ['    </ModOp>',
+              '    <!-- END: ============================ Register custom colors ========================= -->',
+              '',
+              '',
+              '    <!-- =================== Define the custom colors =================== -->',
+              f'    <ModOp GUID="{COLOR_LIST_GUID}" Type="addNextSibling">',
+              '']
+    for group in palette['groups']:
+        lines.append(f"        <!-- START: =================== {comment_text(group['title'])} =================== -->")
+        for color in group['colors']:
+            lines += color_asset(color, '        ', player=True)
+            lines.append('')
+        lines.append(f"        <!-- END: =================== {comment_text(group['title'])} =================== -->")
+        lines.append('')
+    lines += ['    </ModOp>', '']
+
+    if palette['npcs']:
+        lines += ['    <!-- START: =================== NPC colors =================== -->', '']
+        for color in palette['npcs']:
+            lines += color_asset(color, '    ', player=False)
+            lines.append(f'    <ModOp Merge="@{color["participant"]}/Participant/DefaultColor">{color["guid"]}</ModOp>')
+            lines.append('')
+        lines += ['    <!-- END: =================== NPC colors =================== -->', '']
+
+    lines.append('</ModOps>')
+    return '\n'.join(lines) + '\n'
+
+
+def build_texts(palette: dict) -> str:
+    """
+    :return: contents of texts_english.xml
+    """
+    lines = ['<ModOps>',
+             '    <ModOp Add="//TextExport/Texts">',
+             '']
+    for group in palette['groups']:
+        lines.append(f"        <!-- START: =================== {comment_text(group['title'])} =================== -->")
+        for color in group['colors']:
+            if 'text' in color:
+                lines += ['        <Text>',
+                          f"            <LineId>{color['guid']}</LineId>",
+                          f"            <Text>{escape(color['text'])}</Text>",
+                          '        </Text>']
+        lines.append(f"        <!-- END: =================== {comment_text(group['title'])} =================== -->")
+        lines.append('')
+    lines += ['    </ModOp>',
+              '</ModOps>']
+    return '\n'.join(lines) + '\n'
+
+
+def build_modinfo(palette: dict, modinfo_text: str) -> str:
+    """
+    :param modinfo_text: current contents of modinfo.json
+    :return: contents of modinfo.json, with the "Options" section from the palette, but keeping the default of
+             any option which modinfo.json already has, e.g. one set by custom_colour_picker.py
+    """
+    # no options in the palette, so leave any hand-written ones alone
+    if not palette['options']:
+        return modinfo_text
+
+    modinfo = json.loads(modinfo_text)
+
+    current = modinfo.get('Options', {})
+    options = {}
+    for key, option in palette['options'].items():
+        option = dict(option)
+        if 'default' in current.get(key, {}):
+            option['default'] = current[key]['default']
+        elif 'default' in option and isinstance(option['default'], str) and HEX_COLOR.match(option['default']):
+            option['default'] = str(to_int(option['default']))
+        options[key] = option
+
+    # leave the file exactly as it is if the options haven't changed
+    if modinfo.get('Options', {}) == options:
+        return modinfo_text
+
+    modinfo['Options'] = options
+    return modinfo_json(modinfo)
+
+
+def modinfo_json(modinfo: dict) -> str:
+    """
+    :return: modinfo.json contents, laid out the same way by everything which writes the file
+    """
+    return json.dumps(modinfo, indent=2, ensure_ascii=False) + '\n'
+
+
+###########################################################################################
+#
+#   incremental writes
+#
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(filename: str) -> str:
+    """
+    :return: hash of the file's contents, or '' if there is no such file
+    """
+    try:
+        with open(filename, 'rb') as file:
+            return content_hash(file.read())
+    except FileNotFoundError:
+        return ''
+
+
+def write_if_changed(filename: str, text: str, dry_run: bool = False) -> bool:
+    """
+    write the file, atomically, but only if its contents would change
+    :return: True if the file changed
+    """
+    data = text.encode('utf-8')
+    if content_hash(data) == file_hash(filename):
+        return False
+    if dry_run:
+        return True
+
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_filename, filename)
+    return True
+
+
+def build(palette_filename: str = PALETTE_PATH, dry_run: bool = False) -> dict:
+    """
+    build every output from the palette
+    :return: output filename -> True if it changed
+    """
+    palette = load_palette(palette_filename)
+    with open(MODINFO_PATH, 'r', encoding='utf-8') as file:
+        modinfo_text = file.read()
+
+    outputs = {
+        ASSETS_PATH: build_assets(palette),
+        TEXTS_PATH: build_texts(palette),
+        MODINFO_PATH: build_modinfo(palette, modinfo_text),
+    }
+    return {filename: write_if_changed(filename, text, dry_run) for filename, text in outputs.items()}
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python build_palette.py [--palette FILE] [--check]
+    parser = argparse.ArgumentParser(description='Build assets.xml, texts_english.xml and the modinfo.json options from palette.json')
+    parser.add_argument('--palette', default=PALETTE_PATH, help='palette spec (default: palette.json)')
+    parser.add_argument('--check', action='store_true',
+                        help="don't write anything, just report what would change, and exit 1 if anything would")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        changed = build(args.palette, dry_run=args.check)
+    except (ValueError, KeyError) as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    elapsed = time.perf_counter() - start
+
+    for filename, did_change in changed.items():
+        status = ('out of date' if args.check else 'written') if did_change else 'unchanged'
+        print(f"{os.path.relpath(filename, BASE_DIR)}: {status}")
+    print(f"Built in {elapsed * 1000:.1f} ms")
+
+    if args.check and any(changed.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
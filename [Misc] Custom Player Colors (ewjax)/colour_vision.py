@@ -0,0 +1,434 @@
+import argparse
+import sys
+import time
+import numpy
+
+from build_palette import PALETTE_PATH, VISION_MODES, all_colors, build, load_palette, save_palette, to_hex, to_int, vision_colors
+
+
+###########################################################################################
+#
+#   Colour vision deficiency variants for the palette, and a perceptual duplicate check
+#
+#   Every ParticipantColor has a color for each of the game's vision modes, None, Deuteranopia, Protanopia and
+#   Tritanopia, but the palette only picks the None color, so colour-blind players see colors which may be hard
+#   to tell apart.  This works on whole arrays of colors at once:
+#       - signed ARGB ints, as used in assets.xml (see rgba2int() in colorpicker.html), to and from sRGB
+#       - simulate each deficiency, using the Machado, Oliveira & Fernandes (2009) matrices at full severity
+#       - adapt each color for each deficiency (daltonize): the part of the color the viewer can't see is shifted
+#         into channels they can, keeping the color's lightness, then any color which still looks like another one is nudged away from it, by
+#         at most a small step in lightness and hue
+#       - compare colors in OKLab, where distance roughly matches how different two colors look, and
+#         flag colors which are too close to another palette color, for normal vision and as each deficiency sees them
+#
+#   python colour_vision.py                             report palette colors which are hard to tell apart
+#   python colour_vision.py --write                     store adapted colors in palette.json, and rebuild the mod
+#                                                       check them in game before committing the result
+#   python colour_vision.py --candidates "#FF8000,#..."  check new colors against the palette before adding them
+#
+
+DEFICIENCIES = ('Deuteranopia', 'Protanopia', 'Tritanopia')
+
+# linear RGB simulation matrices, Machado et al. 2009, severity 1.0
+SIMULATION = {
+    'Protanopia': numpy.array([[0.152286, 1.052583, -0.204868],
+                               [0.114503, 0.786281, 0.099216],
+                               [-0.003882, -0.048116, 1.051998]]),
+    'Deuteranopia': numpy.array([[0.367322, 0.860646, -0.227968],
+                                 [0.280085, 0.672501, 0.047413],
+                                 [-0.011820, 0.042940, 0.968881]]),
+    'Tritanopia': numpy.array([[1.255528, -0.076749, -0.178779],
+                               [-0.078411, 0.930809, 0.147602],
+                               [0.004733, 0.691367, 0.303900]]),
+}
+
+# where each deficiency's lost color difference is moved to, Fidaner et al.
+# red-green deficiencies move it into green and blue, tritanopia moves it into red and green
+ERROR_SHIFT = {
+    'Protanopia': numpy.array([[0.0, 0.0, 0.0], [0.7, 1.0, 0.0], [0.7, 0.0, 1.0]]),
+    'Deuteranopia': numpy.array([[0.0, 0.0, 0.0], [0.7, 1.0, 0.0], [0.7, 0.0, 1.0]]),
+    'Tritanopia': numpy.array([[1.0, 0.0, 0.7], [0.0, 1.0, 0.7], [0.0, 0.0, 0.0]]),
+}
+
+# OKLab, Björn Ottosson 2020
+LINEAR_TO_LMS = numpy.array([[0.4122214708, 0.5363325363, 0.0514459929],
+                             [0.2119034982, 0.6806995451, 0.1073969566],
+                             [0.0883024619, 0.2817188376, 0.6299787005]])
+LMS_TO_OKLAB = numpy.array([[0.2104542553, 0.7936177850, -0.0040720468],
+                            [1.9779984951, -2.4285922050, 0.4505937099],
+                            [0.0259040371, 0.7827717662, -0.8086757660]])
+
+OKLAB_TO_LMS = numpy.linalg.inv(LMS_TO_OKLAB)
+LMS_TO_LINEAR = numpy.linalg.inv(LINEAR_TO_LMS)
+
+# OKLab offsets tried when nudging an adapted color away from colors it still looks like:
+# lightness steps, and small steps in the two color axes
+SEPARATION_STEPS = numpy.array([(dl, da, db)
+                                for dl in (-0.12, -0.06, 0.0, 0.06, 0.12)
+                                for da in (-0.06, 0.0, 0.06)
+                                for db in (-0.06, 0.0, 0.06)])
+
+# chroma scales tried, largest first, when an adapted color at its original lightness is outside sRGB
+CHROMA_STEPS = numpy.linspace(1.0, 0.0, 21)
+
+# OKLab distance below which two colors are hard to tell apart at a glance, e.g. small map symbols
+DEFAULT_THRESHOLD = 0.08
+
+
+###########################################################################################
+#
+#   conversions, each takes and returns arrays of colors
+#
+
+def argb_to_rgb(values) -> tuple:
+    """
+    :param values: signed ARGB ints
+    :return: (alpha, as uint8 array, sRGB, as float array of shape (n, 3) in 0..1)
+    """
+    values = numpy.asarray(values, dtype=numpy.int64) & 0xFFFFFFFF
+    alpha = (values >> 24).astype(numpy.uint8)
+    rgb = numpy.stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF], axis=-1) / 255.0
+    return alpha, rgb
+
+
+def rgb_to_argb(alpha, rgb) -> numpy.ndarray:
+    """
+    :return: signed ARGB ints, as int64 array
+    """
+    channels = numpy.clip(numpy.rint(numpy.asarray(rgb) * 255.0), 0, 255).astype(numpy.int64)
+    values = (numpy.asarray(alpha, dtype=numpy.int64) << 24) | (channels[..., 0] << 16) | (channels[..., 1] << 8) | channels[..., 2]
+    return numpy.where(values >= (1 << 31), values - (1 << 32), values)
+
+
+def srgb_to_linear(rgb) -> numpy.ndarray:
+    rgb = numpy.asarray(rgb)
+    return numpy.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(linear) -> numpy.ndarray:
+    linear = numpy.clip(linear, 0.0, 1.0)
+    return numpy.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1.0 / 2.4) - 0.055)
+
+
+def rgb_to_oklab(rgb) -> numpy.ndarray:
+    """
+    :param rgb: sRGB, shape (n, 3)
+    :return: OKLab, shape (n, 3)
+    """
+    lms = srgb_to_linear(rgb) @ LINEAR_TO_LMS.T
+    return numpy.cbrt(lms) @ LMS_TO_OKLAB.T
+
+
+def oklab_to_rgb(lab) -> numpy.ndarray:
+    """
+    :return: sRGB, clipped to the sRGB gamut
+    """
+    lms = (numpy.asarray(lab) @ OKLAB_TO_LMS.T) ** 3
+    return linear_to_srgb(lms @ LMS_TO_LINEAR.T)
+
+
+def simulate(rgb, deficiency: str) -> numpy.ndarray:
+    """
+    :return: sRGB colors as seen with the deficiency
+    """
+    return linear_to_srgb(srgb_to_linear(rgb) @ SIMULATION[deficiency].T)
+
+
+def in_gamut(lab) -> numpy.ndarray:
+    """
+    :return: bool array, True for OKLab colors which are inside the sRGB gamut
+    """
+    lms = (numpy.asarray(lab) @ OKLAB_TO_LMS.T) ** 3
+    linear = lms @ LMS_TO_LINEAR.T
+    return ((linear >= -1e-6) & (linear <= 1.0 + 1e-6)).all(axis=-1)
+
+
+def adapt(rgb, deficiency: str) -> numpy.ndarray:
+    """
+    daltonize: shift the difference the deficiency can't see into channels it can
+    only the hue and chroma move, each color keeps its OKLab lightness so bright colors stay bright; if that
+    puts it outside sRGB its chroma is pulled in, in CHROMA_STEPS, until it fits
+    :return: adapted sRGB colors
+    """
+    rgb = numpy.asarray(rgb)
+    error = rgb - simulate(rgb, deficiency)
+    shifted = rgb_to_oklab(numpy.clip(rgb + error @ ERROR_SHIFT[deficiency].T, 0.0, 1.0))
+    lightness = rgb_to_oklab(rgb)[..., :1]
+
+    # every scale at once, shape (n, steps, 3), then the largest scale which fits, a grey always does
+    candidates = numpy.concatenate([numpy.broadcast_to(lightness[..., None, :], shifted.shape[:-1] + (len(CHROMA_STEPS), 1)),
+                                    shifted[..., None, 1:] * CHROMA_STEPS[:, None]], axis=-1)
+    best = in_gamut(candidates).argmax(axis=-1)
+    lab = numpy.take_along_axis(candidates, best[..., None, None], axis=-2)[..., 0, :]
+    return oklab_to_rgb(lab)
+
+
+###########################################################################################
+#
+#   nearest neighbour search in OKLab
+#
+
+class PerceptualIndex:
+    """
+    Exact nearest neighbour index over a set of colors in OKLab
+    Queries are answered in blocks with numpy, so thousands of colors take a single pass each way
+    """
+
+    # number of query colors compared against the whole index at once, bounds the temporary distance matrix
+    BLOCK_SIZE = 1024
+
+    def __init__(self, lab):
+        self.lab = numpy.asarray(lab, dtype=float).reshape(-1, 3)
+        self.squared_norms = (self.lab ** 2).sum(axis=1)
+
+    def nearest(self, lab, exclude_self: bool = False) -> tuple:
+        """
+        :param lab: query colors in OKLab, shape (n, 3)
+        :param exclude_self: the queries are the indexed colors themselves, so don't match each one to itself
+        :return: (index of the nearest indexed color, distance to it), as arrays of length n
+        """
+        lab = numpy.asarray(lab, dtype=float).reshape(-1, 3)
+        indices = numpy.zeros(len(lab), dtype=numpy.int64)
+        distances = numpy.full(len(lab), numpy.inf)
+        if len(self.lab) == 0:
+            return indices, distances
+
+        for start in range(0, len(lab), self.BLOCK_SIZE):
+            block = lab[start:start + self.BLOCK_SIZE]
+            # |a - b|^2 = |a|^2 - 2 a.b + |b|^2
+            squared = (block ** 2).sum(axis=1)[:, None] - 2.0 * block @ self.lab.T + self.squared_norms[None, :]
+            if exclude_self:
+                rows = numpy.arange(len(block))
+                squared[rows, start + rows] = numpy.inf
+            best = squared.argmin(axis=1)
+            indices[start:start + len(block)] = best
+            distances[start:start + len(block)] = numpy.sqrt(numpy.maximum(squared[numpy.arange(len(block)), best], 0.0))
+
+        return indices, distances
+
+
+def separate(rgb, deficiency: str, threshold: float, rounds: int = 3) -> numpy.ndarray:
+    """
+    nudge colors which the deficiency still sees as too close to another color, trying each of SEPARATION_STEPS
+    from the starting color and keeping whichever leaves it furthest from every other color, as the deficiency sees them
+    each color moves at most one step from where it started, so it stays recognisably the same color
+    :param rgb: sRGB colors, e.g. from adapt(), which should all be different colors to start with
+    :return: separated sRGB colors
+    """
+    rgb = numpy.array(rgb, dtype=float).reshape(-1, 3)
+    start_lab = rgb_to_oklab(rgb)
+    seen = rgb_to_oklab(simulate(rgb, deficiency))
+
+    for _ in range(rounds):
+        indices, distances = PerceptualIndex(seen).nearest(seen, exclude_self=True)
+        flagged = numpy.flatnonzero(distances < threshold)
+        if len(flagged) == 0:
+            break
+
+        # candidate moves for every flagged color at once
+        candidates = oklab_to_rgb(start_lab[flagged][:, None, :] + SEPARATION_STEPS[None, :, :])
+        candidates_seen = rgb_to_oklab(simulate(candidates, deficiency))
+
+        # then one color at a time, so each move takes the earlier moves into account
+        # squared distances as |a|^2 - 2 a.b + |b|^2, keeping |b|^2 up to date as colors move
+        squared_norms = (seen ** 2).sum(axis=1)
+        moved = False
+        for ndx, color_candidates, color_candidates_seen in zip(flagged, candidates, candidates_seen):
+            current = squared_norms - 2.0 * seen @ seen[ndx] + squared_norms[ndx]
+            current[ndx] = numpy.inf
+            current = current.min()
+            if current >= threshold ** 2:
+                continue
+            candidate_distances = ((color_candidates_seen ** 2).sum(axis=1)[:, None]
+                                   - 2.0 * color_candidates_seen @ seen.T + squared_norms[None, :])
+            candidate_distances[:, ndx] = numpy.inf
+            candidate_distances = candidate_distances.min(axis=1)
+            best = candidate_distances.argmax()
+            if candidate_distances[best] > current:
+                rgb[ndx] = color_candidates[best]
+                seen[ndx] = color_candidates_seen[best]
+                squared_norms[ndx] = (seen[ndx] ** 2).sum()
+                moved = True
+        if not moved:
+            break
+
+    return rgb
+
+
+###########################################################################################
+#
+#   palette operations
+#
+
+def palette_arrays(colors: list, field: str) -> tuple:
+    """
+    :param colors: palette color entries
+    :param field: 'ui' or 'in_game'
+    :return: (alpha, sRGB) arrays of the None vision mode colors
+    """
+    values = [vision_colors(color.get(field, color['ui']))['None'] for color in colors]
+    return argb_to_rgb(values)
+
+
+def adapted_variants(colors: list, field: str, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """
+    :return: vision mode -> signed ARGB ints, the None colors and their adapted variants for each deficiency
+    """
+    alpha, rgb = palette_arrays(colors, field)
+    return variants_of(alpha, rgb, threshold)
+
+
+def variants_of(alpha, rgb, threshold: float) -> dict:
+    """
+    adapt and separate a set of colors for each deficiency
+    colors which appear more than once, e.g. the NPC UI greys, are adapted once and share their variant
+    :return: vision mode -> signed ARGB ints
+    """
+    rv = {'None': rgb_to_argb(alpha, rgb)}
+    unique_rgb, inverse = numpy.unique(rgb, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    for deficiency in DEFICIENCIES:
+        adapted = separate(adapt(unique_rgb, deficiency), deficiency, threshold)
+        rv[deficiency] = rgb_to_argb(alpha, adapted[inverse])
+    return rv
+
+
+def seen_as(variants: dict) -> dict:
+    """
+    :param variants: vision mode -> signed ARGB ints shown in that mode
+    :return: vision mode -> OKLab colors as the viewer with that vision sees them
+    """
+    rv = {}
+    for mode, values in variants.items():
+        alpha, rgb = argb_to_rgb(values)
+        rv[mode] = rgb_to_oklab(rgb if mode == 'None' else simulate(rgb, mode))
+    return rv
+
+
+def close_pairs(lab, threshold: float) -> list:
+    """
+    :return: list of (i, j, distance), for colors whose nearest other color is closer than the threshold
+    """
+    indices, distances = PerceptualIndex(lab).nearest(lab, exclude_self=True)
+    pairs = {}
+    for i in numpy.flatnonzero(distances < threshold):
+        j = int(indices[i])
+        pairs[(min(i, j), max(i, j))] = float(distances[i])
+    return [(i, j, distance) for (i, j), distance in sorted(pairs.items())]
+
+
+def color_label(color: dict) -> str:
+    return f"{color.get('text', color['name'])} ({color['guid']})"
+
+
+def report_palette(colors: list, field: str, threshold: float, adapted: bool):
+    """
+    write the pairs of colors which are hard to tell apart, for each vision mode, to stdout
+    :param adapted: compare the adapted variants rather than the palette's own colors
+    """
+    if adapted:
+        variants = adapted_variants(colors, field, threshold)
+    else:
+        variants = {mode: numpy.array([vision_colors(color.get(field, color['ui']))[mode] for color in colors])
+                    for mode in VISION_MODES}
+
+    for mode, lab in seen_as(variants).items():
+        pairs = close_pairs(lab, threshold)
+        print(f"    {mode:>12}: {len(pairs)} pairs closer than {threshold}")
+        for i, j, distance in pairs:
+            print(f"        {color_label(colors[i])} ~ {color_label(colors[j])}, distance {distance:.3f}")
+
+
+def check_candidates(candidates: list, colors: list, threshold: float) -> list:
+    """
+    flag candidate colors which look like an existing palette color, or an earlier candidate,
+    for normal vision or for any deficiency, comparing the adapted variants
+    :param candidates: list of colors, "#RRGGBB", "#RRGGBBAA" or ints
+    :return: list of (candidate ndx, vision mode, palette color or None for another candidate, distance)
+    """
+    existing = seen_as(adapted_variants(colors, 'ui', threshold))
+    alpha, rgb = argb_to_rgb([to_int(candidate) for candidate in candidates])
+    proposed = {'None': rgb_to_argb(alpha, rgb)}
+    for deficiency in DEFICIENCIES:
+        proposed[deficiency] = rgb_to_argb(alpha, adapt(rgb, deficiency))
+
+    rv = {}
+    for mode, lab in seen_as(proposed).items():
+        indices, distances = PerceptualIndex(existing[mode]).nearest(lab)
+        for ndx in numpy.flatnonzero(distances < threshold):
+            rv.setdefault(int(ndx), (mode, colors[indices[ndx]], float(distances[ndx])))
+        for i, j, distance in close_pairs(lab, threshold):
+            rv.setdefault(j, (mode, None, distance))
+
+    return [(ndx,) + rv[ndx] for ndx in sorted(rv)]
+
+
+def write_variants(palette: dict, threshold: float = DEFAULT_THRESHOLD):
+    """
+    store the adapted variants in the palette, for both the UI and in-game colors
+    """
+    colors = all_colors(palette)
+    for field in ('ui', 'in_game'):
+        variants = adapted_variants(colors, field, threshold)
+        for ndx, color in enumerate(colors):
+            by_mode = {mode: to_hex(int(variants[mode][ndx])) for mode in VISION_MODES}
+            # e.g. greys, which every vision mode sees the same
+            color[field] = by_mode['None'] if len(set(by_mode.values())) == 1 else by_mode
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python colour_vision.py [--palette FILE] [--threshold D] [--write] [--candidates "#FF8000,#00FF80"]
+    parser = argparse.ArgumentParser(description='Colour vision deficiency variants and perceptual duplicate check for the palette')
+    parser.add_argument('--palette', default=PALETTE_PATH, help='palette spec (default: palette.json)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'OKLab distance below which colors count as indistinguishable (default {DEFAULT_THRESHOLD})')
+    parser.add_argument('--write', action='store_true',
+                        help='store the adapted variants in the palette, and rebuild the mod files')
+    parser.add_argument('--candidates', metavar='COLORS',
+                        help='comma separated colors, or @file with one color per line, to check before adding them')
+    args = parser.parse_args()
+
+    palette = load_palette(args.palette)
+    colors = all_colors(palette)
+    start = time.perf_counter()
+
+    if args.candidates:
+        if args.candidates.startswith('@'):
+            with open(args.candidates[1:], 'r') as file:
+                candidates = [line.strip() for line in file if line.strip() and not line.startswith('//')]
+        else:
+            candidates = [candidate.strip() for candidate in args.candidates.split(',') if candidate.strip()]
+        try:
+            flagged = check_candidates(candidates, colors, args.threshold)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(2)
+        for ndx, mode, color, distance in flagged:
+            like = color_label(color) if color is not None else 'another candidate'
+            print(f"{candidates[ndx]}: looks like {like} with {mode} vision, distance {distance:.3f}")
+        print(f"{len(flagged)} of {len(candidates)} candidates flagged, in {(time.perf_counter() - start) * 1000:.1f} ms")
+        sys.exit(1 if flagged else 0)
+
+    for field in ('ui', 'in_game'):
+        print(f"{field} colors, as in the palette:")
+        report_palette(colors, field, args.threshold, adapted=False)
+        print(f"{field} colors, adapted:")
+        report_palette(colors, field, args.threshold, adapted=True)
+
+    if args.write:
+        write_variants(palette, args.threshold)
+        if save_palette(palette, args.palette):
+            print(f"Adapted variants written to {args.palette}")
+        changed = build(args.palette)
+        print(f"Rebuilt: {', '.join(name for name, did_change in changed.items() if did_change) or 'nothing changed'}")
+
+    print(f"Done in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
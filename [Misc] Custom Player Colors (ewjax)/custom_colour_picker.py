@@ -1,16 +1,86 @@
-import sys
+import argparse
 import json
 import os
-import webview
+import re
+import sys
+
+from build_palette import modinfo_json, to_int, write_if_changed
+
+# webview is only imported when the picker window is opened, so the command line updates start instantly
+# and don't need it installed
 
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
 else:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-MODINFO_PATH = os.path.join(os.path.dirname(sys.executable if sys.frozen else __file__), "modinfo.json")
+MOD_DIR = os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__))
+MODINFO_PATH = os.path.join(MOD_DIR, "modinfo.json")
+ASSETS_PATH = os.path.join(MOD_DIR, "data", "base", "config", "export", "assets.xml")
 COLORPICKER_PATH = os.path.join(BASE_DIR, "colorpicker.html")
 
+# option set by the Save button in the picker window
+PICKER_OPTION = "customcolour"
+
+STANDARD_GUID = re.compile(r'<Standard>\s*<GUID>\s*(\d+)\s*</GUID>')
+
+
+def parse_color(value) -> int:
+    """
+    :param value: signed ARGB int, or a string of one, as the picker produces, or "#RRGGBB" / "#RRGGBBAA"
+    :return: signed ARGB int
+    """
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return to_int(value)
+
+
+def asset_guids(assets_path: str = ASSETS_PATH) -> set:
+    """
+    :return: set of the asset GUIDs defined in assets.xml
+    """
+    with open(assets_path, "r", encoding="utf-8") as f:
+        return {int(guid) for guid in STANDARD_GUID.findall(f.read())}
+
+
+def update_options(colors: dict = None, guids: dict = None, modinfo_path: str = MODINFO_PATH,
+                   valid_guids: set = None) -> bool:
+    """
+    Set the defaults of several modinfo.json options in one read-modify-write.
+    Everything is checked before anything is written, and the file is replaced atomically, so it is
+    never left half written or half updated.
+    :param colors: option name -> color, see parse_color()
+    :param guids: option name -> asset GUID, e.g. one of the ParticipantColor GUIDs
+    :param valid_guids: if given, every GUID must be in this set, see asset_guids()
+    :return: True if modinfo.json changed
+    """
+    colors = colors or {}
+    guids = guids or {}
+
+    with open(modinfo_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    options = data.get("Options", {})
+    for name in list(colors) + list(guids):
+        if name not in options:
+            raise ValueError(f"modinfo.json has no option [{name}], expected one of {sorted(options)}")
+
+    defaults = {name: str(parse_color(value)) for name, value in colors.items()}
+    for name, guid in guids.items():
+        guid = int(guid)
+        if valid_guids is not None and guid not in valid_guids:
+            raise ValueError(f"GUID [{guid}] for option [{name}] isn't an asset in assets.xml")
+        defaults[name] = str(guid)
+
+    for name, default in defaults.items():
+        options[name]["default"] = default
+
+    return write_if_changed(modinfo_path, modinfo_json(data))
+
+
 class Api:
     def save_color(self, int_color):
         """
@@ -18,14 +88,7 @@ class Api:
         Saves the Int Color into modinfo.json
         """
         try:
-            with open(MODINFO_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            data["Options"]["customcolour"]["default"] = str(int_color)
-
-            with open(MODINFO_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-
+            update_options({PICKER_OPTION: int_color})
             return f"Saved Int Color {int_color} to modinfo.json"
 
         except Exception as e:
@@ -62,7 +125,12 @@ def inject_js(window):
     window.evaluate_js(js)
 
 
-if __name__ == "__main__":
+def run_picker():
+    """
+    open the color picker window
+    """
+    import webview
+
     api = Api()
 
     window = webview.create_window(
@@ -73,4 +141,63 @@ if __name__ == "__main__":
         height=600,
     )
 
-    webview.start(inject_js, window)
\ No newline at end of file
+    webview.start(inject_js, window)
+
+
+def parse_assignments(assignments: list, parser: argparse.ArgumentParser) -> dict:
+    """
+    :param assignments: list of "NAME=VALUE" strings
+    :return: name -> value
+    """
+    rv = {}
+    for assignment in assignments:
+        name, sep, value = assignment.partition("=")
+        if not sep or not name:
+            parser.error(f"expected NAME=VALUE, got [{assignment}]")
+        rv[name.strip()] = value.strip()
+    return rv
+
+
+def main():
+
+    # command line
+    #       python custom_colour_picker.py                      open the picker window
+    #       python custom_colour_picker.py --set customcolour=#FF8000 [--set-guid slot=2000101000] [--batch FILE] [--validate]
+    parser = argparse.ArgumentParser(description="Pick a custom player colour, or set modinfo.json option defaults without the window")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=COLOR",
+                        help="set an option default to a colour, #RRGGBB, #RRGGBBAA or a signed ARGB int (repeatable)")
+    parser.add_argument("--set-guid", action="append", default=[], metavar="NAME=GUID",
+                        help="set an option default to an asset GUID, e.g. a ParticipantColor (repeatable)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help='JSON file of {"colors": {NAME: COLOR, ...}, "guids": {NAME: GUID, ...}}')
+    parser.add_argument("--validate", action="store_true",
+                        help="check every --set-guid GUID is an asset defined in assets.xml")
+    parser.add_argument("--modinfo", default=MODINFO_PATH, help="modinfo.json to update")
+    args = parser.parse_args()
+
+    colors = parse_assignments(args.set, parser)
+    guids = parse_assignments(args.set_guid, parser)
+    if args.batch:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            batch = json.load(f)
+        colors = {**batch.get("colors", {}), **colors}
+        guids = {**batch.get("guids", {}), **guids}
+
+    if not colors and not guids:
+        run_picker()
+        return
+
+    try:
+        valid_guids = asset_guids() if args.validate else None
+        changed = update_options(colors, guids, args.modinfo, valid_guids)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    count = len(colors) + len(guids)
+    print(f"Updated {count} option{'s' if count != 1 else ''} in {args.modinfo}" if changed
+          else f"{args.modinfo} already up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+import xml.parsers.expat
+from collections import defaultdict
+
+
+###########################################################################################
+#
+#   Conflict check across mod folders
+#
+#   Scans every assets.xml and texts_*.xml under a mods directory, and indexes:
+#       - asset GUIDs, from <Asset>/<Values>/<Standard>/<GUID>
+#       - text LineIds, per language, from <Text>/<LineId>
+#       - ModOp targets, i.e. GUID and Path, and for ModOps which add, what each one adds
+#   then reports anything defined more than once:
+#       - the same asset GUID defined twice
+#       - the same LineId given a text twice, in the same language
+#       - the same thing added twice to the same target, e.g. the same <Item><Color> registered by two mods
+#       - two different mods replacing, merging into or removing from the same target
+#
+#   Each file is parsed with expat, one pass, no DOM, and everything is kept in hash tables, so the check takes
+#   time in proportion to the total size of the mods.  The game tolerates '--' inside comments, which strict
+#   XML parsers don't, so comments are blanked out before parsing, keeping the line numbers.
+#
+#   python check_mod_conflicts.py [mods directory]
+#   exits with status 1 if there are conflicts, for use in a packaging step
+#
+
+TEXTS_FILENAME = re.compile(r'^texts_(?P<language>\w+)\.xml$')
+
+COMMENT = re.compile(rb'<!--.*?-->', re.DOTALL)
+
+# ModOp types which add content, and so can add the same thing twice
+ADD_TYPES = {'add', 'addnextsibling', 'addprevsibling', 'append', 'prepend'}
+
+# short form ModOps give the type as the attribute name and the path as its value, e.g. Merge="@27079/Participant/DefaultColor"
+SHORT_FORM_TYPES = {'add', 'addnextsibling', 'addprevsibling', 'append', 'prepend', 'merge', 'replace', 'remove'}
+
+SHORT_FORM_GUID = re.compile(r'^@(?P<guid>\d+)(?P<path>/.*)?$')
+
+
+class Location:
+    """
+    where something was found
+    """
+
+    __slots__ = ('mod', 'filename', 'line')
+
+    def __init__(self, mod: str, filename: str, line: int):
+        self.mod = mod
+        self.filename = filename
+        self.line = line
+
+    def __str__(self):
+        return f"{self.mod}: {self.filename}:{self.line}"
+
+
+class ConflictIndex:
+    """
+    Hash index of everything the scanned mods define or change
+    """
+
+    def __init__(self):
+        # asset GUID -> list of Locations
+        self.assets = defaultdict(list)
+
+        # (language, LineId) -> list of Locations
+        self.line_ids = defaultdict(list)
+
+        # (target GUID, path, what's added) -> list of Locations
+        self.adds = defaultdict(list)
+
+        # (target GUID, path) -> list of (ModOp type, Location), for ModOps which change existing content
+        self.changes = defaultdict(list)
+
+        # content hash -> list of (mod, filename)
+        self.file_hashes = defaultdict(list)
+
+        self.files = 0
+        self.lines = 0
+
+    def scan_directory(self, mods_directory: str):
+        """
+        scan every mod below the directory, each top level folder is taken to be one mod
+        """
+        for dirpath, dirnames, filenames in os.walk(mods_directory):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+            relative = os.path.relpath(dirpath, mods_directory)
+            mod = relative.split(os.sep)[0] if relative != '.' else '.'
+            for filename in sorted(filenames):
+                if filename == 'assets.xml' or TEXTS_FILENAME.match(filename):
+                    path = os.path.join(dirpath, filename)
+                    self.scan_file(path, mod, os.path.relpath(path, os.path.join(mods_directory, mod)))
+
+    def scan_file(self, path: str, mod: str, filename: str):
+        """
+        index one assets.xml or texts_*.xml file
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        self.files += 1
+        self.lines += data.count(b'\n') + 1
+        self.file_hashes[hashlib.sha256(data).hexdigest()].append((mod, filename))
+
+        # blank out comments, keeping their line breaks so line numbers still match the file
+        data = COMMENT.sub(lambda match: b'\n' * match.group().count(b'\n'), data)
+
+        match = TEXTS_FILENAME.match(os.path.basename(path))
+        scanner = FileScanner(self, mod, filename, match['language'] if match else None)
+        try:
+            scanner.parser.Parse(data, True)
+        except xml.parsers.expat.ExpatError as e:
+            raise ValueError(f"{mod}: {filename}: {e}") from e
+
+    def conflicts(self) -> dict:
+        """
+        :return: dictionary of conflict kind -> list of (description, list of Locations)
+        """
+        rv = {
+            'Duplicate asset GUIDs': [
+                (f"GUID {guid}", locations)
+                for guid, locations in self.assets.items() if len(locations) > 1],
+            'Duplicate LineIds': [
+                (f"LineId {line_id} ({language})", locations)
+                for (language, line_id), locations in self.line_ids.items() if len(locations) > 1],
+            'Duplicate adds': [
+                (f"{describe_target(guid, path)} adds {added}", locations)
+                for (guid, path, added), locations in self.adds.items() if len(locations) > 1],
+            'Competing changes': [],
+        }
+
+        for (guid, path), changes in self.changes.items():
+            # one mod changing the same target several times is its own business
+            if len({location.mod for modop_type, location in changes}) > 1:
+                types = ', '.join(sorted({modop_type for modop_type, location in changes}))
+                rv['Competing changes'].append((f"{describe_target(guid, path)} ({types})",
+                                                [location for modop_type, location in changes]))
+        return rv
+
+    def identical_files(self) -> list:
+        """
+        :return: list of lists of (mod, filename) with exactly the same contents
+        """
+        return [files for files in self.file_hashes.values() if len(files) > 1]
+
+
+def describe_target(guid: str, path: str) -> str:
+    if guid and path:
+        return f"GUID {guid} {path}"
+    return f"GUID {guid}" if guid else path
+
+
+class FileScanner:
+    """
+    expat handlers for one file
+    """
+
+    def __init__(self, index: ConflictIndex, mod: str, filename: str, language: str = None):
+        self.index = index
+        self.mod = mod
+        self.filename = filename
+        self.language = language
+
+        self.parser = xml.parsers.expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+        self.parser.CharacterDataHandler = self.character_data
+
+        # open elements, and whether each one has child elements
+        self.stack = []
+        self.has_children = []
+        self.text = []
+
+        # innermost ModOp which adds content: (depth, target GUID, path), and the leaves of the child being added
+        self.add_modop = None
+        self.added_leaves = []
+        self.added_line = 0
+
+    def location(self) -> Location:
+        return Location(self.mod, self.filename, self.parser.CurrentLineNumber)
+
+    def start_element(self, name: str, attributes: dict):
+        if self.has_children:
+            self.has_children[-1] = True
+        self.stack.append(name)
+        self.has_children.append(False)
+        self.text = []
+
+        if name == 'ModOp':
+            self.start_modop(attributes)
+        elif self.add_modop is not None and len(self.stack) == self.add_modop[0] + 1:
+            self.added_leaves = []
+            self.added_line = self.parser.CurrentLineNumber
+
+    def start_modop(self, attributes: dict):
+        modop_type = attributes.get('Type', '').lower()
+        guid = attributes.get('GUID', '')
+        path = attributes.get('Path', '')
+
+        # short form, e.g. <ModOp Merge="@27079/Participant/DefaultColor">
+        if not modop_type:
+            for attribute, value in attributes.items():
+                if attribute.lower() in SHORT_FORM_TYPES:
+                    modop_type = attribute.lower()
+                    path = value
+                    break
+            match = SHORT_FORM_GUID.match(path)
+            if match is not None:
+                guid = match['guid']
+                path = match['path'] or ''
+
+        if modop_type in ADD_TYPES:
+            self.add_modop = (len(self.stack), guid, path)
+        elif modop_type:
+            self.index.changes[(guid, path)].append((modop_type, self.location()))
+
+    def end_element(self, name: str):
+        text = ''.join(self.text).strip()
+        depth = len(self.stack)
+        leaf = not self.has_children[-1]
+        parent = self.stack[-2] if depth > 1 else ''
+
+        if name == 'GUID' and parent == 'Standard' and 'Asset' in self.stack:
+            self.index.assets[text].append(self.location())
+        elif name == 'LineId' and parent == 'Text' and self.language is not None:
+            self.index.line_ids[(self.language, text)].append(self.location())
+
+        if self.add_modop is not None:
+            modop_depth, guid, path = self.add_modop
+            if depth == modop_depth:
+                self.add_modop = None
+            elif depth > modop_depth and leaf:
+                self.added_leaves.append(f"{'/'.join(self.stack[modop_depth:])}={text}")
+                if depth == modop_depth + 1:
+                    self.record_add(guid, path, name)
+            elif depth == modop_depth + 1:
+                self.record_add(guid, path, name)
+
+        self.stack.pop()
+        self.has_children.pop()
+        self.text = []
+
+    def record_add(self, guid: str, path: str, name: str):
+        # assets and texts are already indexed by their own GUID or LineId
+        if name != 'Asset' and self.language is None and self.added_leaves:
+            added = ', '.join(self.added_leaves)
+            self.index.adds[(guid, path, added)].append(Location(self.mod, self.filename, self.added_line))
+        self.added_leaves = []
+
+    def character_data(self, data: str):
+        self.text.append(data)
+
+
+###########################################################################################
+#
+#
+def main():
+
+    # command line
+    #       python check_mod_conflicts.py [mods directory] [--limit N]
+    parser = argparse.ArgumentParser(description='Report GUID, LineId and ModOp conflicts between mods')
+    parser.add_argument('mods_directory', nargs='?', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='directory holding one folder per mod (default: this repository)')
+    parser.add_argument('--limit', type=int, default=10, metavar='N',
+                        help='max conflicts listed of each kind, 0 for all (default 10)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = ConflictIndex()
+    try:
+        index.scan_directory(args.mods_directory)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    conflicts = index.conflicts()
+    elapsed = time.perf_counter() - start
+
+    print(f"Scanned {index.files} files, {index.lines} lines, in {elapsed:.2f}s: "
+          f"{len(index.assets)} asset GUIDs, {len(index.line_ids)} LineIds, {len(index.adds)} added items")
+
+    # identical files explain a lot of duplicates at once, so show them first
+    for files in index.identical_files():
+        names = [f"{mod}: {filename}" for mod, filename in files]
+        if 0 < args.limit < len(names):
+            names = names[:args.limit] + [f"and {len(files) - args.limit} more"]
+        print(f"Identical files, {len(files)} copies:")
+        for name in names:
+            print(f"    {name}")
+
+    for kind, found in conflicts.items():
+        if not found:
+            continue
+        print(f"{kind}: {len(found)}")
+        shown = found if args.limit <= 0 else found[:args.limit]
+        for description, locations in shown:
+            print(f"    {description}")
+            for location in locations:
+                print(f"        {location}")
+        if len(shown) < len(found):
+            print(f"    ... and {len(found) - len(shown)} more, use --limit 0 to list them all")
+
+    if any(conflicts.values()):
+        sys.exit(1)
+    print("No conflicts")
+
+
+if __name__ == '__main__':
+    main()